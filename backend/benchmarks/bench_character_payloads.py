@@ -0,0 +1,156 @@
+"""
+Requests per second for GET /character, serialized per request against the
+stored character payloads.
+
+    python -m backend.benchmarks.bench_character_payloads [--characters N]
+        [--requests R]
+
+Seeds a temporary database file with N characters and their public_json, then
+sends R sequential requests for a page of 50 and of 200 characters to:
+  model_dump: Character rows loaded by the ORM and model_dump()ed one by one
+              into the stdlib json JSONResponse, as the handler first did
+  before:     the paged handler, every column read into dicts and dumped
+              with the stdlib json JSONResponse
+  after:      GET /character, the stored payloads joined into the body
+The response cache is off, so every request builds its page.
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from typing import AsyncGenerator
+
+from fastapi import APIRouter, FastAPI, Query
+from fastapi.responses import JSONResponse
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlmodel import SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.session import db_dependency, get_session
+from backend.db.db_crud import count_records, read_page
+from backend.db.db_models import Character, User
+from backend.db.payloads import backfill_sql
+from backend.main import app
+from backend.services.auth import get_valid_user
+from backend.utils.cache import response_cache
+from backend.utils.conditional import ConditionalRoute
+
+before_router = APIRouter(route_class=ConditionalRoute)
+
+
+@before_router.get("/character")
+async def get_all_characters(
+    session: db_dependency, limit: int = Query(default=50)
+) -> JSONResponse:
+    characters, more = await read_page(
+        session, Character, limit, hidden=("public_json",)
+    )
+    headers = {"X-Total-Count": str(await count_records(session, Character))}
+    if more:
+        headers["X-Next-Cursor"] = str(characters[-1]["id"])
+    return JSONResponse(content={"characters": characters}, headers=headers)
+
+
+@before_router.get("/model_dump/character")
+async def get_all_characters_dumped(
+    session: db_dependency, limit: int = Query(default=50)
+) -> JSONResponse:
+    result = await session.exec(
+        select(Character).order_by(col(Character.id)).limit(limit)
+    )
+    characters = [character.model_dump() for character in result.all()]
+    headers = {"X-Total-Count": str(await count_records(session, Character))}
+    return JSONResponse(content={"characters": characters}, headers=headers)
+
+
+before_app = FastAPI()
+before_app.include_router(before_router)
+
+
+def seed(path: str, characters: int) -> None:
+    SQLModel.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "INSERT INTO user (username, email, role, status) "
+        "VALUES ('flash', 'flash@mongo.com', 'user', 'active')"
+    )
+    connection.executemany(
+        "INSERT INTO character (image_prompt, image_url, image_status, generated_by,"
+        " name, planet_name, planet_description, personality_traits, speech_style,"
+        " quirks, human_relationship) VALUES (?, 'PENDING', 'READY', 1, ?, 'Mongo',"
+        " ?, 'Proud and vain', 'Regal', 'Laughs a lot', 'Curious')",
+        [
+            (
+                f"Alien {n}, a retro emperor in a 1950s pulp illustration style",
+                f"Alien {n}",
+                f"World {n}, frozen ice palaces under a violet sky",
+            )
+            for n in range(characters)
+        ],
+    )
+    connection.execute(backfill_sql())
+    connection.commit()
+    connection.close()
+
+
+async def run(path: str, requests: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+
+    async def get_bench_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessions() as session:
+            yield session
+
+    async def get_bench_user() -> User:
+        return User(id=1, username="flash", email="flash@mongo.com", role="user")
+
+    for target in (app, before_app):
+        target.dependency_overrides[get_session] = get_bench_session
+        target.dependency_overrides[get_valid_user] = get_bench_user
+    response_cache.enabled = False
+
+    for limit in (50, 200):
+        for name, target, path in (
+            ("model_dump", before_app, "/model_dump/character"),
+            ("before", before_app, "/character"),
+            ("after", app, "/character"),
+        ):
+            # Uncompressed, to time the serialization alone
+            async with AsyncClient(
+                transport=ASGITransport(app=target),
+                base_url="http://test",
+                headers={"Accept-Encoding": "identity"},
+            ) as client:
+                url = f"{path}?limit={limit}"
+                size = len((await client.get(url)).content)
+                start = time.perf_counter()
+                for _ in range(requests):
+                    await client.get(url)
+                seconds = time.perf_counter() - start
+            print(
+                f"limit {limit:>3} {name:>10}: {requests / seconds:7.0f} req/s"
+                f"  {size / 1024:6.1f} KiB"
+            )
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--characters", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path, args.characters)
+        asyncio.run(run(path, args.requests))
+
+
+if __name__ == "__main__":
+    main()
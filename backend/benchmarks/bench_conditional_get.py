@@ -0,0 +1,140 @@
+"""
+Bytes on the wire for the JSON reads, plain, compressed and revalidated.
+
+    python -m backend.benchmarks.bench_conditional_get [--characters N]
+        [--messages M] [--repeat R]
+
+Seeds a temporary database file with N characters and a thread of M messages,
+then requests a character list page, a single character and a history page
+with each Accept-Encoding (br only when the brotli package is installed),
+and once more with the ETag of the last response. Reports the median time
+and the bytes the server sent for each.
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import AsyncGenerator, Dict, Tuple
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.session import get_session
+from backend.db.db_models import User
+from backend.main import app
+from backend.services.auth import get_valid_user
+from backend.utils import conditional
+
+
+def seed(path: str, characters: int, messages: int) -> None:
+    SQLModel.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "INSERT INTO user (username, email, role, status) "
+        "VALUES ('flash', 'flash@mongo.com', 'user', 'active')"
+    )
+    connection.executemany(
+        "INSERT INTO character (image_prompt, image_url, image_status, generated_by,"
+        " name, planet_name, planet_description, personality_traits, speech_style,"
+        " quirks, human_relationship) VALUES (?, 'PENDING', 'READY', 1, ?, 'Mongo',"
+        " ?, 'Proud and vain', 'Regal', 'Laughs a lot', 'Curious')",
+        [
+            (
+                "A retro alien emperor in a 1950s pulp illustration style " * 4,
+                f"Alien {n}",
+                "A frozen world of ice palaces under a violet sky " * 3,
+            )
+            for n in range(characters)
+        ],
+    )
+    connection.execute(
+        "INSERT INTO thread (user_id, character_id, created_at, message_count)"
+        " VALUES (1, 1, 0, ?)",
+        (messages,),
+    )
+    connection.executemany(
+        "INSERT INTO message (thread_id, role, content, created_at)"
+        " VALUES (1, ?, ?, ?)",
+        [
+            (
+                "user" if n % 2 else "assistant",
+                f"Message {n}: greetings from the planet Mongo, Earthling! " * 3,
+                n,
+            )
+            for n in range(messages)
+        ],
+    )
+    connection.commit()
+    connection.close()
+
+
+async def timed(
+    client: AsyncClient, url: str, headers: Dict[str, str], repeat: int
+) -> Tuple[float, int, str]:
+    times = []
+    size = 0
+    etag = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        times.append(time.perf_counter() - start)
+        size = response.num_bytes_downloaded
+        etag = response.headers.get("etag", "")
+    return statistics.median(times), size, etag
+
+
+async def run(path: str, repeat: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+
+    async def get_bench_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessions() as session:
+            yield session
+
+    async def get_bench_user() -> User:
+        return User(id=1, username="flash", email="flash@mongo.com", role="user")
+
+    app.dependency_overrides[get_session] = get_bench_session
+    app.dependency_overrides[get_valid_user] = get_bench_user
+    # Repeats are served by the response cache, so the times are mostly the
+    # hashing and compression
+    client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    encodings = ["identity", "gzip"] + (["br"] if conditional.brotli else [])
+    for url in ("/character?limit=200", "/character/1", "/chat/history/1?limit=200"):
+        print(url)
+        for encoding in encodings:
+            headers = {"Accept-Encoding": encoding}
+            seconds, size, etag = await timed(client, url, headers, repeat)
+            print(f"  {encoding:>8}: {seconds * 1000:7.2f} ms  {size:8d} B")
+        headers["If-None-Match"] = etag
+        seconds, size, _ = await timed(client, url, headers, repeat)
+        print(f"  {'304':>8}: {seconds * 1000:7.2f} ms  {size:8d} B")
+
+    await client.aclose()
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--characters", type=int, default=1_000)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path, args.characters, args.messages)
+        asyncio.run(run(path, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
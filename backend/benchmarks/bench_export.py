@@ -0,0 +1,133 @@
+"""
+Peak memory of the NDJSON conversation export against loading it all at once.
+
+    python -m backend.benchmarks.bench_export [--messages N] [--threads T]
+
+Seeds a temporary database file with N messages spread over T threads, then
+exports them in a fresh process per mode and reports the time, the output
+size and the process's peak RSS:
+  stream:       export_conversations, what /export/conversations sends
+  stream gzip:  the same with ?gzip=true
+  list:         every message loaded into a list and dumped in one go, like
+                the history routes used to do for a single thread
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sqlite3
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.db.db_models import Message
+from backend.services.export import export_conversations
+
+SEED_BATCH = 50_000
+
+
+def seed(path: str, messages: int, threads: int) -> None:
+    SQLModel.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "INSERT INTO user (username, email, role, status) "
+        "VALUES ('flash', 'flash@mongo.com', 'user', 'active')"
+    )
+    connection.executemany(
+        "INSERT INTO character (image_prompt, image_url, image_status, generated_by,"
+        " name, planet_name, planet_description, personality_traits, speech_style,"
+        " quirks, human_relationship) VALUES ('A retro alien', 'PENDING', 'READY',"
+        " 1, ?, 'Mongo', 'Cold', 'Proud', 'Regal', 'Laughs a lot', 'Curious')",
+        [(f"Alien {n}",) for n in range(threads)],
+    )
+    connection.executemany(
+        "INSERT INTO thread (user_id, character_id, created_at, message_count)"
+        " VALUES (1, ?, 0, 0)",
+        [(n,) for n in range(1, threads + 1)],
+    )
+    for start in range(0, messages, SEED_BATCH):
+        connection.executemany(
+            "INSERT INTO message (thread_id, role, content, created_at)"
+            " VALUES (?, ?, ?, ?)",
+            [
+                (
+                    n % threads + 1,
+                    "user" if n % 2 else "assistant",
+                    f"Message {n}: greetings from the planet Mongo, Earthling!",
+                    n,
+                )
+                for n in range(start, min(start + SEED_BATCH, messages))
+            ],
+        )
+    connection.commit()
+    connection.close()
+
+
+async def export(path: str, mode: str) -> int:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+
+    @asynccontextmanager
+    async def session_factory() -> AsyncGenerator[AsyncSession, None]:
+        async with sessions() as session:
+            yield session
+
+    size = 0
+    if mode == "list":
+        async with sessions() as session:
+            messages = list((await session.exec(select(Message))).all())
+            body = json.dumps([message.model_dump() for message in messages])
+            size = len(body.encode())
+    else:
+        async for chunk in export_conversations(
+            compress=mode == "stream gzip", session_factory=session_factory
+        ):
+            size += len(chunk)
+    await engine.dispose()
+    return size
+
+
+def measure(path: str, mode: str, results: "multiprocessing.Queue[str]") -> None:
+    start = time.perf_counter()
+    size = asyncio.run(export(path, mode))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    results.put(
+        f"{mode:>12}: {seconds:6.1f}s  {size / 1024**2:7.1f} MiB out"
+        f"  peak RSS {peak:6.0f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path, args.messages, args.threads)
+        print(f"messages: {args.messages}, threads: {args.threads}")
+
+        # A fresh process per mode, so each peak RSS is its own
+        results: "multiprocessing.Queue[str]" = multiprocessing.Queue()
+        for mode in ("stream", "stream gzip", "list"):
+            process = multiprocessing.Process(
+                target=measure, args=(path, mode, results)
+            )
+            process.start()
+            print(results.get())
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
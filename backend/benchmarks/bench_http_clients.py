@@ -0,0 +1,89 @@
+"""
+Per-call latency of a fresh httpx.AsyncClient versus the shared registry client.
+
+    python -m backend.benchmarks.bench_http_clients [--url URL] [--calls N]
+
+Without --url a local keep-alive HTTP server is used, which only shows the TCP
+setup cost. Point it at a real HTTPS host to include DNS and TLS setup.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from backend.config.clients import http_clients
+
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: 2\r\n"
+    b"Connection: keep-alive\r\n\r\n{}"
+)
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while await reader.readuntil(b"\r\n\r\n"):
+            writer.write(RESPONSE)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def fresh_client_call(url: str) -> float:
+    start = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        await client.get(url)
+    return time.perf_counter() - start
+
+
+async def shared_client_call(url: str) -> float:
+    start = time.perf_counter()
+    await http_clients.get("leonardo").get(url)
+    return time.perf_counter() - start
+
+
+def report(label: str, samples: list[float]) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(
+        f"{label:<14} mean {statistics.mean(ms):7.2f} ms"
+        f"  p50 {statistics.median(ms):7.2f} ms  p95 {p95:7.2f} ms"
+    )
+
+
+async def main(url: str | None, calls: int) -> None:
+    server = None
+    if url is None:
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        url = f"http://127.0.0.1:{port}/"
+
+    fresh = [await fresh_client_call(url) for _ in range(calls)]
+    # First shared call opens the pooled connection, leave it out
+    await shared_client_call(url)
+    shared = [await shared_client_call(url) for _ in range(calls)]
+    await http_clients.aclose()
+
+    print(f"{calls} sequential GETs against {url}")
+    report("fresh client", fresh)
+    report("shared client", shared)
+    saved = statistics.mean(fresh) - statistics.mean(shared)
+    print(f"saved per call {saved * 1000:.2f} ms")
+
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.calls))
@@ -0,0 +1,90 @@
+"""
+Enqueue and dequeue throughput of the SQLite job queue.
+
+    python -m backend.benchmarks.bench_job_queue [--jobs N] [--workers W]
+
+Jobs have a no-op handler, so the numbers are the queue's own overhead: one
+INSERT per enqueue, then one UPDATE ... RETURNING lease plus one DELETE per
+completed job, on a temporary database file.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any
+
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.services.job_queue import JobQueue
+
+
+async def noop(payload: dict[str, Any]) -> None:
+    pass
+
+
+async def run(jobs: int, workers: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        sessions = async_sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        queues = []
+        for n in range(workers):
+            queue = JobQueue(
+                concurrency=1,
+                lease_seconds=30.0,
+                poll_interval=1.0,
+                max_attempts=3,
+                retry_delay=0.0,
+                session_factory=sessions,
+            )
+            queue.worker_id = f"bench-{n}"
+            queue.register("noop", noop)
+            queues.append(queue)
+
+        start = time.perf_counter()
+        for n in range(jobs):
+            await queues[0].enqueue("noop", {"n": n})
+        enqueue_seconds = time.perf_counter() - start
+
+        async def drain(queue: JobQueue) -> None:
+            while await queue.run_once():
+                pass
+
+        start = time.perf_counter()
+        await asyncio.gather(*(drain(queue) for queue in queues))
+        dequeue_seconds = time.perf_counter() - start
+
+        completed = sum(queue.completed for queue in queues)
+        await engine.dispose()
+
+    print(f"jobs: {jobs}, workers: {workers}")
+    print(
+        f"enqueue: {jobs / enqueue_seconds:8.0f} jobs/s "
+        f"({enqueue_seconds * 1000 / jobs:.2f} ms/job)"
+    )
+    print(
+        f"dequeue: {completed / dequeue_seconds:8.0f} jobs/s "
+        f"({dequeue_seconds * 1000 / completed:.2f} ms/job, lease + finish)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.jobs, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Latency and payload size of GET /character, whole table against a page.
+
+    python -m backend.benchmarks.bench_list_endpoints [--rows N] [--repeat R]
+
+Seeds a temporary database file with N characters and reports the median
+time and the response size of:
+  read_all:   every character loaded and dumped, what GET /character used to do
+  page:       the first page, with every column and the total count
+  page after: a page from the middle of the table, through the cursor
+  projected:  the first page with ?fields=name,image_url
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Tuple
+
+from fastapi.responses import JSONResponse
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.session import get_session
+from backend.db.db_crud import read_all
+from backend.db.db_models import Character, User
+from backend.main import app
+from backend.services.auth import get_valid_user
+
+
+def seed(path: str, rows: int) -> None:
+    SQLModel.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "INSERT INTO user (username, email, role, status) "
+        "VALUES ('flash', 'flash@mongo.com', 'user', 'active')"
+    )
+    connection.executemany(
+        "INSERT INTO character (image_prompt, image_url, image_status, generated_by,"
+        " name, planet_name, planet_description, personality_traits, speech_style,"
+        " quirks, human_relationship) VALUES (?, 'PENDING', 'READY', 1, ?, 'Mongo',"
+        " ?, 'Proud and vain', 'Regal', 'Laughs a lot', 'Curious')",
+        [
+            (
+                "A retro alien emperor in a 1950s pulp illustration style " * 4,
+                f"Alien {n}",
+                "A frozen world of ice palaces under a violet sky " * 3,
+            )
+            for n in range(rows)
+        ],
+    )
+    connection.commit()
+    connection.close()
+
+
+async def timed(call: Callable[[], Awaitable[int]], repeat: int) -> Tuple[float, int]:
+    times = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = await call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), size
+
+
+async def run(path: str, rows: int, repeat: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+
+    async def get_bench_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessions() as session:
+            yield session
+
+    async def get_bench_user() -> User:
+        return User(id=1, username="flash", email="flash@mongo.com", role="user")
+
+    app.dependency_overrides[get_session] = get_bench_session
+    app.dependency_overrides[get_valid_user] = get_bench_user
+    client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    async def whole_table() -> int:
+        async with sessions() as session:
+            characters = await read_all(session, Character) or []
+            content = {"characters": [c.model_dump() for c in characters]}
+            return len(JSONResponse(content=content).body)
+
+    def request(params: Dict[str, str | int]) -> Callable[[], Awaitable[int]]:
+        async def call() -> int:
+            response = await client.get("/character", params=params)
+            return len(response.content)
+
+        return call
+
+    cases = {
+        "read_all": whole_table,
+        "page": request({}),
+        "page after": request({"after": rows // 2}),
+        "projected": request({"fields": "name,image_url"}),
+    }
+    print(f"characters: {rows}")
+    for name, call in cases.items():
+        seconds, size = await timed(call, repeat)
+        print(f"{name:>10}: {seconds * 1000:8.2f} ms  {size / 1024:9.1f} KiB")
+
+    await client.aclose()
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        seed(path, args.rows)
+        asyncio.run(run(path, args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
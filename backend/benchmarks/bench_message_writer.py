@@ -0,0 +1,107 @@
+"""
+Chat message persistence throughput with concurrent websockets.
+
+    python -m backend.benchmarks.bench_message_writer [--sockets N] [--turns T]
+
+Every simulated socket writes a user and an assistant message per turn, as
+fast as it can. "per-message" commits each message in its own transaction,
+like store_message used to; "group commit" goes through MessageWriter. Runs
+on a temporary database file, so commit costs include the real fsyncs.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+from sqlmodel import SQLModel, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.db.db_models import Message
+from backend.db.data_mappers import message_mapper
+from backend.services.message_writer import MessageWriter
+
+Store = Callable[[Message], Awaitable[None]]
+
+
+async def run_sockets(
+    sockets: int, turns: int, store: Store, finish: Callable[[], Awaitable[object]]
+) -> float:
+    async def socket(n: int) -> None:
+        for turn in range(turns):
+            await store(message_mapper(n, "user", f"Hello from {n}, turn {turn}"))
+            await store(message_mapper(n, "assistant", "Greetings, Earthling"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(socket(n) for n in range(sockets)))
+    # Only count messages once they are committed
+    await finish()
+    return time.perf_counter() - start
+
+
+async def run(sockets: int, turns: int, batch: int, delay: float) -> None:
+    messages = sockets * turns * 2
+    print(f"sockets: {sockets}, turns: {turns}, messages: {messages}")
+
+    for mode in ("per-message", "group commit"):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_async_engine(
+                f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+            )
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+            sessions = async_sessionmaker(
+                bind=engine, class_=AsyncSession, expire_on_commit=False
+            )
+
+            if mode == "per-message":
+
+                async def store(message: Message) -> None:
+                    async with sessions() as session:
+                        session.add(message)
+                        await session.commit()
+
+                seconds = await run_sockets(
+                    sockets, turns, store, lambda: asyncio.sleep(0)
+                )
+                detail = ""
+            else:
+                writer = MessageWriter(batch, delay, session_factory=sessions)
+
+                async def store(message: Message) -> None:
+                    writer.write(message)
+                    # Let the socket yield like it would while streaming
+                    await asyncio.sleep(0)
+
+                seconds = await run_sockets(sockets, turns, store, writer.flush)
+                stats = writer.stats()
+                detail = (
+                    f"  ({stats['batches']} batches, avg {stats['avg_batch']:.1f} rows)"
+                )
+                await writer.stop()
+
+            async with sessions() as session:
+                stored = (
+                    await session.exec(select(func.count()).select_from(Message))
+                ).one()
+            await engine.dispose()
+
+        assert stored == messages, f"{mode}: stored {stored} of {messages}"
+        print(f"{mode:>13}: {messages / seconds:8.0f} messages/s{detail}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sockets", type=int, default=25)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=0.005)
+    args = parser.parse_args()
+    asyncio.run(run(args.sockets, args.turns, args.batch, args.delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Write latency under mixed load, one shared engine against the split engines.
+
+    python -m backend.benchmarks.bench_sqlite_engines [--writers W] [--readers R]
+        [--writes N] [--profile fast]
+
+W tasks each run N writes through db_crud (new characters, login token
+updates and chat messages, in turns) while R tasks keep reading characters
+and unmet characters until the writers are done. "shared" is a single pooled
+engine where every connection may write, like before; "split" is the
+config/session.py layout, with one queued writer connection and read-only
+readers. Writes that fail, usually with "database is locked", are counted
+and left out of the latencies.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.config.sqlite import RoutingSession, apply_sqlite_profile
+from backend.db.db_models import Character, User, Thread
+from backend.db.data_mappers import message_mapper
+from backend.db.db_crud import (
+    create_record,
+    update_record,
+    read_record,
+    fetch_unmet_character,
+    store_messages,
+)
+
+SEED_USERS = 200
+SEED_CHARACTERS = 500
+
+
+def make_character(n: int) -> Character:
+    return Character(
+        image_prompt="A retro alien",
+        image_url=f"https://cdn/{n}.png",
+        image_status="READY",
+        generated_by=1,
+        name=f"Alien {n}",
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Proud",
+        speech_style="Regal",
+        quirks="Laughs a lot",
+        human_relationship="Curious",
+    )
+
+
+async def write(session: AsyncSession, n: int) -> None:
+    if n % 3 == 0:
+        await create_record(session, make_character(n))
+    elif n % 3 == 1:
+        user_id = random.randint(1, SEED_USERS)
+        await update_record(session, User, user_id, {"token_expiry": n})
+    else:
+        thread_id = random.randint(1, SEED_USERS)
+        await store_messages(
+            session,
+            [
+                message_mapper(thread_id, "user", f"Hello {n}"),
+                message_mapper(thread_id, "assistant", "Greetings, Earthling"),
+            ],
+        )
+
+
+async def read(session: AsyncSession, n: int) -> None:
+    if n % 2:
+        await read_record(session, Character, random.randint(1, SEED_CHARACTERS))
+    else:
+        await fetch_unmet_character(session, random.randint(1, SEED_USERS))
+
+
+async def seed(sessions: async_sessionmaker[AsyncSession]) -> None:
+    async with sessions() as session:
+        session.add_all(
+            User(username=f"user{n}", email=f"user{n}@mongo.com")
+            for n in range(SEED_USERS)
+        )
+        await session.commit()
+        session.add_all(make_character(n) for n in range(SEED_CHARACTERS))
+        await session.commit()
+        session.add_all(
+            Thread(user_id=user, character_id=user, created_at=0)
+            for user in range(1, SEED_USERS + 1)
+        )
+        await session.commit()
+
+
+async def run_load(
+    sessions: async_sessionmaker[AsyncSession], writers: int, readers: int, writes: int
+) -> dict[str, float]:
+    latencies: list[float] = []
+    failures = 0
+    reads = 0
+    done = asyncio.Event()
+
+    async def writer(w: int) -> None:
+        nonlocal failures
+        for n in range(w * writes, (w + 1) * writes):
+            start = time.perf_counter()
+            try:
+                async with sessions() as session:
+                    await write(session, n)
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    async def reader() -> None:
+        nonlocal reads
+        n = 0
+        while not done.is_set():
+            async with sessions() as session:
+                await read(session, n)
+            reads += 1
+            n += 1
+
+    start = time.perf_counter()
+    reading = [asyncio.create_task(reader()) for _ in range(readers)]
+    await asyncio.gather(*(writer(w) for w in range(writers)))
+    seconds = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*reading)
+
+    latencies.sort()
+    return {
+        "writes/s": len(latencies) / seconds,
+        "reads/s": reads / seconds,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p99 ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max ms": latencies[-1] * 1000,
+        "failed": failures,
+    }
+
+
+async def bench_layout(
+    layout: str, profile: str, writers: int, readers: int, writes: int
+) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        tasks = writers + readers
+        if layout == "shared":
+            engine = create_async_engine(url, pool_size=tasks)
+            apply_sqlite_profile(engine, profile)
+            engines = [engine]
+            sessions = async_sessionmaker(
+                bind=engine, class_=AsyncSession, expire_on_commit=False
+            )
+        else:
+            engine = create_async_engine(
+                url, pool_size=1, max_overflow=0, pool_timeout=60
+            )
+            read_engine = create_async_engine(url, pool_size=readers)
+            apply_sqlite_profile(engine, profile)
+            apply_sqlite_profile(read_engine, profile, {"query_only": "ON"})
+            engines = [engine, read_engine]
+            sessions = async_sessionmaker(
+                class_=AsyncSession,
+                sync_session_class=RoutingSession,
+                writer=engine,
+                reader=read_engine,
+                expire_on_commit=False,
+            )
+
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        await seed(sessions)
+        results = await run_load(sessions, writers, readers, writes)
+        for each in engines:
+            await each.dispose()
+    return results
+
+
+async def run(profile: str, writers: int, readers: int, writes: int) -> None:
+    print(
+        f"profile: {profile}, writers: {writers}, readers: {readers}, "
+        f"writes: {writers * writes}"
+    )
+    columns = ("writes/s", "reads/s", "p50 ms", "p99 ms", "max ms", "failed")
+    print(f"{'layout':>7} " + " ".join(f"{column:>9}" for column in columns))
+    for layout in ("shared", "split"):
+        results = await bench_layout(layout, profile, writers, readers, writes)
+        print(
+            f"{layout:>7} " + " ".join(f"{results[column]:9.1f}" for column in columns)
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=100)
+    parser.add_argument("--profile", default="fast")
+    args = parser.parse_args()
+    asyncio.run(run(args.profile, args.writers, args.readers, args.writes))
+
+
+if __name__ == "__main__":
+    main()
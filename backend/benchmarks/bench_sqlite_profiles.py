@@ -0,0 +1,154 @@
+"""
+Read and write throughput of the db_crud functions under each SQLite profile.
+
+    python -m backend.benchmarks.bench_sqlite_profiles [--ops N] [--tasks T]
+
+For every profile in config/sqlite.py a fresh database file is seeded with
+characters and users, then T concurrent tasks run N operations in total:
+  writes: create_record(Character) and update_record(User) in turns
+  reads:  read_record(Character) and fetch_unmet_character in turns
+  mixed:  one write for every four reads
+Each operation gets its own session, like a request does.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.config.sqlite import SQLITE_PROFILES, apply_sqlite_profile
+from backend.db.db_models import Character, User, Thread
+from backend.db.db_crud import (
+    create_record,
+    update_record,
+    read_record,
+    fetch_unmet_character,
+)
+
+SEED_USERS = 200
+SEED_CHARACTERS = 500
+
+Operation = Callable[[AsyncSession, int], Awaitable[object]]
+
+
+def make_character(n: int) -> Character:
+    return Character(
+        image_prompt="A retro alien",
+        image_url=f"https://cdn/{n}.png",
+        image_status="READY",
+        generated_by=1,
+        name=f"Alien {n}",
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Proud",
+        speech_style="Regal",
+        quirks="Laughs a lot",
+        human_relationship="Curious",
+    )
+
+
+async def write(session: AsyncSession, n: int) -> object:
+    if n % 2:
+        return await create_record(session, make_character(n))
+    user_id = random.randint(1, SEED_USERS)
+    return await update_record(session, User, user_id, {"token_expiry": n})
+
+
+async def read(session: AsyncSession, n: int) -> object:
+    if n % 2:
+        return await read_record(session, Character, random.randint(1, SEED_CHARACTERS))
+    return await fetch_unmet_character(session, random.randint(1, SEED_USERS))
+
+
+async def mixed(session: AsyncSession, n: int) -> object:
+    return await (write(session, n) if n % 5 == 0 else read(session, n))
+
+
+async def run_workload(
+    sessions: async_sessionmaker[AsyncSession],
+    operation: Operation,
+    ops: int,
+    tasks: int,
+) -> float:
+    counter = iter(range(ops))
+
+    async def worker() -> None:
+        for n in counter:
+            async with sessions() as session:
+                await operation(session, n)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(tasks)))
+    return ops / (time.perf_counter() - start)
+
+
+async def bench_profile(profile: str, ops: int, tasks: int) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}",
+            pool_size=tasks,
+        )
+        apply_sqlite_profile(engine, profile)
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        sessions = async_sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        async with sessions() as session:
+            session.add_all(
+                User(username=f"user{n}", email=f"user{n}@mongo.com")
+                for n in range(SEED_USERS)
+            )
+            # Committed first, foreign_keys=ON checks generated_by
+            await session.commit()
+            session.add_all(make_character(n) for n in range(SEED_CHARACTERS))
+            await session.commit()
+            # Everyone has met a good share of the catalog
+            session.add_all(
+                Thread(user_id=user, character_id=character, created_at=0)
+                for user in range(1, SEED_USERS + 1)
+                for character in range(1, SEED_CHARACTERS // 2)
+            )
+            await session.commit()
+
+        results = {
+            name: await run_workload(sessions, operation, ops, tasks)
+            for name, operation in (
+                ("writes", write),
+                ("reads", read),
+                ("mixed", mixed),
+            )
+        }
+        await engine.dispose()
+    return results
+
+
+async def run(ops: int, tasks: int) -> None:
+    print(f"{ops} operations per workload, {tasks} concurrent tasks (ops/s)")
+    print(f"{'profile':>8} {'writes':>8} {'reads':>8} {'mixed':>8}")
+    for profile in SQLITE_PROFILES:
+        results = await bench_profile(profile, ops, tasks)
+        print(
+            f"{profile:>8} {results['writes']:8.0f} "
+            f"{results['reads']:8.0f} {results['mixed']:8.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.ops, args.tasks))
+
+
+if __name__ == "__main__":
+    main()
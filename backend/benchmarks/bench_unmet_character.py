@@ -0,0 +1,164 @@
+"""
+fetch_unmet_character latency on a large catalog.
+
+    python -m backend.benchmarks.bench_unmet_character [--characters C]
+        [--threads T] [--calls N]
+
+Seeds C characters and two users who have each met T of them: "contiguous"
+met the lowest ids, the worst case for walking the id index, and "scattered"
+met random ones. Then times N lookups per user for the NOT IN query
+fetch_unmet_character used to run and for each order it supports now, with
+and without the in-memory MetIndex, and reports the index's memory use.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.config.sqlite import apply_sqlite_profile
+from backend.db.db_models import Character, User, Thread
+from backend.db.db_crud import UNMET_ORDERS, fetch_unmet_character
+from backend.db.met_index import MetIndex
+
+Lookup = Callable[[AsyncSession, int], Awaitable[object]]
+
+
+async def not_in(session: AsyncSession, user_id: int) -> object:
+    statement = (
+        select(Character)
+        .where(
+            Character.id.notin_(  # type: ignore[union-attr]
+                select(Thread.character_id).where(Thread.user_id == user_id)
+            )
+        )
+        .limit(1)
+    )
+    return (await session.exec(statement)).first()
+
+
+def order_lookup(order: str, index: MetIndex | None = None) -> Lookup:
+    async def lookup(session: AsyncSession, user_id: int) -> object:
+        return await fetch_unmet_character(session, user_id, order, index)
+
+    return lookup
+
+
+async def seed(
+    sessions: async_sessionmaker[AsyncSession], characters: int, threads: int
+) -> None:
+    async with sessions() as session:
+        session.add(User(username="contiguous", email="contiguous@mongo.com"))
+        session.add(User(username="scattered", email="scattered@mongo.com"))
+        await session.commit()
+
+        connection = await session.connection()
+        await connection.execute(
+            insert(Character),
+            [
+                {
+                    "image_prompt": "A retro alien",
+                    "image_url": f"https://cdn/{n}.png",
+                    "image_status": "READY",
+                    "generated_by": 1,
+                    "name": f"Alien {n}",
+                    "planet_name": "Mongo",
+                    "planet_description": "Cold",
+                    "personality_traits": "Proud",
+                    "speech_style": "Regal",
+                    "quirks": "Laughs a lot",
+                    "human_relationship": "Curious",
+                    "last_served_at": random.randint(0, 10**6),
+                }
+                for n in range(characters)
+            ],
+        )
+        met = {
+            1: range(1, threads + 1),
+            2: random.sample(range(1, characters + 1), threads),
+        }
+        await connection.execute(
+            insert(Thread),
+            [
+                {"user_id": user_id, "character_id": character_id, "created_at": 0}
+                for user_id, character_ids in met.items()
+                for character_id in character_ids
+            ],
+        )
+        await session.commit()
+
+
+async def time_lookup(
+    sessions: async_sessionmaker[AsyncSession], lookup: Lookup, user_id: int, calls: int
+) -> tuple[float, float]:
+    timings = []
+    async with sessions() as session:
+        for _ in range(calls):
+            start = time.perf_counter()
+            await lookup(session, user_id)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.mean(timings) * 1000, timings[int(calls * 0.99) - 1] * 1000
+
+
+async def run(characters: int, threads: int, calls: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        )
+        apply_sqlite_profile(engine, "fast")
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        sessions = async_sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        )
+        await seed(sessions, characters, threads)
+        index = MetIndex(max_bytes=64 * 1024 * 1024)
+        async with sessions() as session:
+            await index.build(session)
+
+        print(f"characters: {characters}, threads per user: {threads}, calls: {calls}")
+        print(
+            f"{'lookup':>18} {'contiguous mean/p99 ms':>24} {'scattered mean/p99 ms':>24}"
+        )
+        lookups = (
+            [("not in (before)", not_in)]
+            + [(order, order_lookup(order)) for order in UNMET_ORDERS]
+            + [(f"index {order}", order_lookup(order, index)) for order in UNMET_ORDERS]
+        )
+        for name, lookup in lookups:
+            row = f"{name:>18}"
+            for user_id in (1, 2):
+                mean, p99 = await time_lookup(sessions, lookup, user_id, calls)
+                row += f" {mean:15.3f} /{p99:7.3f}"
+            print(row)
+
+        stats = index.stats()
+        print(
+            f"met index: {stats['catalog_bytes'] / 1024:.0f} KiB catalog, "
+            f"{stats['user_bytes'] / stats['users'] / 1024:.1f} KiB per user, "
+            f"{stats['bytes_per_10k_users'] / 1024**2:.0f} MiB per 10k users"
+        )
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--characters", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.characters, args.threads, args.calls))
+
+
+if __name__ == "__main__":
+    main()
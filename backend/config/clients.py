@@ -1,7 +1,8 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 import httpx
 import logging
 import asyncio
+import importlib.util
 
 from typing import Annotated
 
@@ -13,6 +14,103 @@ from backend.services.leonardo.leon_models import (
     ImageGenResponse,
     GenerationInfo,
 )
+from backend.services.leonardo.poller import GenerationPoller
+
+
+# SHARED HTTP CLIENTS #
+class HttpClientRegistry:
+    """
+    One pooled, keep-alive httpx.AsyncClient per upstream service.
+
+    Each upstream lives on its own host, so the connection limits of a client
+    are effectively per-host limits. Upstreams registered without limits of
+    their own share the registry defaults. Clients are opened lazily on first
+    use and closed together from the app lifespan.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_keepalive: int,
+        keepalive_expiry: float,
+        connect_timeout: float,
+        http2: bool = False,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.connect_timeout = connect_timeout
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logging.warning("HTTP/2 requested but 'h2' is not installed, using 1.1")
+        self._timeouts: dict[str, float] = {}
+        self._limits: dict[str, httpx.Limits] = {}
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def register(
+        self,
+        name: str,
+        timeout: float,
+        max_connections: int | None = None,
+        max_keepalive: int | None = None,
+    ) -> None:
+        self._timeouts[name] = timeout
+        if max_connections is None:
+            self._limits[name] = self.limits
+        else:
+            self._limits[name] = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=self.limits.keepalive_expiry,
+            )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            if name not in self._timeouts:
+                raise KeyError(f"No HTTP client registered as '{name}'")
+            client = httpx.AsyncClient(
+                limits=self._limits[name],
+                timeout=httpx.Timeout(
+                    self._timeouts[name], connect=self.connect_timeout
+                ),
+                http2=self.http2,
+            )
+            self._clients[name] = client
+        return client
+
+    def open(self) -> None:
+        for name in self._timeouts:
+            self.get(name)
+        logging.info(f"HTTP clients opened: {', '.join(self._clients)}")
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+
+# Init shared HTTP clients
+_settings = get_settings()
+http_clients = HttpClientRegistry(
+    _settings.http_max_connections,
+    _settings.http_max_keepalive,
+    _settings.http_keepalive_expiry,
+    _settings.http_connect_timeout,
+    _settings.http2,
+)
+http_clients.register("leonardo", timeout=30.0)
+http_clients.register("leonardo_cdn", timeout=30.0)
+http_clients.register("mailgun", timeout=30.0)
+# Every chat turn holds an OpenAI connection for its whole stream
+http_clients.register(
+    "openai",
+    timeout=_settings.openai_timeout,
+    max_connections=_settings.openai_max_connections,
+    max_keepalive=_settings.openai_max_keepalive,
+)
 
 
 # OPENAI API #
@@ -20,9 +118,19 @@ class OpenAIClient:
     def __init__(self, api_key: str, project: str | None = None) -> None:
         self.api_key = api_key
         self.project = project
-        self._client = OpenAI(api_key=api_key, project=project)
-
-    def get_client(self) -> OpenAI:
+        self._client: AsyncOpenAI | None = None
+        self._http_client: httpx.AsyncClient | None = None
+
+    def get_client(self) -> AsyncOpenAI:
+        # Rebuild only when the shared HTTP client was closed and reopened
+        http_client = http_clients.get("openai")
+        if self._client is None or self._http_client is not http_client:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                project=self.project,
+                http_client=http_client,
+            )
+            self._http_client = http_client
         return self._client
 
 
@@ -32,14 +140,29 @@ openai_client = OpenAIClient(
     "proj_iHucBz89WXK9PvH3Hqvf5mhf",
 )
 # Declare dependency
-openai_dep = Annotated[OpenAI, Depends(openai_client.get_client)]
+openai_dep = Annotated[AsyncOpenAI, Depends(openai_client.get_client)]
 
 
 # LEONARDO API #
 class LeonardoClient:
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        poll_initial_delay: float = 2.0,
+        poll_max_delay: float = 8.0,
+        poll_timeout: float = 60.0,
+        webhook_grace: float = 0.0,
+    ) -> None:
         self.api_key = api_key
         self.url = "https://cloud.leonardo.ai/api/rest/v1/generations/"
+        # Shared by every pending generation of this client
+        self.poller = GenerationPoller(
+            self.get_img_info,
+            initial_delay=poll_initial_delay,
+            max_delay=poll_max_delay,
+            timeout=poll_timeout,
+            webhook_grace=webhook_grace,
+        )
 
     def get_client(self) -> "LeonardoClient":
         return self
@@ -81,19 +204,19 @@ class LeonardoClient:
         url = self.url
         payload = self.get_payload(prompt)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json=payload.model_dump(),
-                headers=self.get_headers(),
-            )
+        client = http_clients.get("leonardo")
+        response = await client.post(
+            url,
+            json=payload.model_dump(),
+            headers=self.get_headers(),
+        )
 
-            assert isinstance(response, httpx.Response)
+        assert isinstance(response, httpx.Response)
 
-            if response.status_code == 200:
-                return ImageGenResponse(**response.json())
-            else:
-                raise Exception(f"Failed to generate image: {response.text}")
+        if response.status_code == 200:
+            return ImageGenResponse(**response.json())
+        else:
+            raise Exception(f"Failed to generate image: {response.text}")
 
     async def get_gen_id(self, image_data: ImageGenResponse) -> str:
         return image_data.sdGenerationJob.generationId
@@ -101,40 +224,29 @@ class LeonardoClient:
     async def get_img_info(self, generation_id: str) -> GenerationInfo:
         url = f"{self.url}{generation_id}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.get_headers())
+        client = http_clients.get("leonardo")
+        response = await client.get(url, headers=self.get_headers())
 
-            if response.status_code == 200:
-                return GenerationInfo(**response.json())
-            else:
-                raise Exception(f"Failed to retrieve image info: {response.text}")
-
-    async def get_img_status(self, generation_id: str) -> str:
-        image_info = await self.get_img_info(generation_id)
-        return image_info.generations_by_pk.status
+        if response.status_code == 200:
+            return GenerationInfo(**response.json())
+        else:
+            raise Exception(f"Failed to retrieve image info: {response.text}")
 
     async def get_img_url(
-        self, generation_id: str, max_retries: int, delay: float
+        self, generation_id: str, timeout: float | None = None
     ) -> str | None:
-        for _ in range(max_retries):
-            status = await self.get_img_status(generation_id)
-
-            if status == "PENDING":
-                logging.info("Gathering new image's URL, please wait...")
-                await asyncio.sleep(delay)
-            elif status == "COMPLETE":
-                image_info = await self.get_img_info(generation_id)
-                image_url = image_info.generations_by_pk.generated_images[0].url
-                logging.info(f"New image ready at {image_url}")
-                return image_url
-            elif status == "FAILED":
-                logging.error("Image generation failed.")
-                return None
-        logging.error(f"Unable to retrieve new image's URL after {max_retries} retries")
-        return None
+        """Wait for the generation to finish, polled by the shared poller."""
+        return await self.poller.wait_for(generation_id, timeout)
 
 
 # Init Leonardo client
-leonardo_client = LeonardoClient(get_settings().leonardo_api_key)
+leonardo_client = LeonardoClient(
+    _settings.leonardo_api_key,
+    _settings.leonardo_poll_initial_delay,
+    _settings.leonardo_poll_max_delay,
+    _settings.leonardo_poll_timeout,
+    # Polling is only a fallback once webhooks are configured
+    _settings.leonardo_webhook_timeout if _settings.leonardo_webhook_key else 0.0,
+)
 # Declare dependency
 leonardo_dep = Annotated[LeonardoClient, Depends(leonardo_client.get_client)]
@@ -1,25 +1,94 @@
-from typing import Annotated, AsyncGenerator
+from typing import Annotated, AsyncGenerator, Tuple
 from contextlib import asynccontextmanager
 from fastapi import Depends
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from backend.config.settings import get_settings
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from backend.config.settings import AppSettings, get_settings
+from backend.config.sqlite import (
+    RoutingSession,
+    apply_sqlite_profile,
+    can_split_engines,
+)
 
 app_settings = get_settings()
 DATABASE_URL = app_settings.db_url
 
-async_engine = create_async_engine(DATABASE_URL, echo=False)
 
+def create_engines(url: str, settings: AppSettings) -> Tuple[AsyncEngine, AsyncEngine]:
+    """
+    The writer and reader engines for a database. They are one and the same
+    unless the database can be split (see can_split_engines).
+    """
+    if not (
+        settings.sqlite_split_engines
+        and can_split_engines(url, settings.sqlite_profile, settings.sqlite_pragmas)
+    ):
+        engine = create_async_engine(url, echo=False)
+        apply_sqlite_profile(engine, settings.sqlite_profile, settings.sqlite_pragmas)
+        return engine, engine
 
-@asynccontextmanager
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async_session = async_sessionmaker(
-        bind=async_engine,
+    # Writes queue for the writer's single connection instead of fighting
+    # over SQLite's write lock
+    writer = create_async_engine(
+        url,
+        echo=False,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.sqlite_write_timeout,
+    )
+    reader = create_async_engine(
+        url,
+        echo=False,
+        pool_size=settings.sqlite_read_pool_size,
+    )
+    apply_sqlite_profile(writer, settings.sqlite_profile, settings.sqlite_pragmas)
+    apply_sqlite_profile(
+        reader,
+        settings.sqlite_profile,
+        {**settings.sqlite_pragmas, "query_only": "ON"},
+    )
+    return writer, reader
+
+
+def create_session_factory(
+    writer: AsyncEngine, reader: AsyncEngine
+) -> async_sessionmaker[AsyncSession]:
+    if writer is reader:
+        return async_sessionmaker(
+            bind=writer,
+            class_=AsyncSession,
+            autoflush=True,
+            expire_on_commit=False,
+        )
+    return async_sessionmaker(
         class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        writer=writer,
+        reader=reader,
         autoflush=True,
         expire_on_commit=False,
     )
-    async with async_session() as session:
+
+
+async_engine, async_read_engine = create_engines(DATABASE_URL, app_settings)
+split_engines = async_engine is not async_read_engine
+# Built once, creating a session from it is cheap
+async_session_factory = create_session_factory(async_engine, async_read_engine)
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    A session for a single unit of work, for code that runs outside of a
+    request or holds on to a connection for a long time, like websockets.
+
+    The pooled connection is only checked out while the session is in use
+    and goes back to the pool when the block exits, so keep the block around
+    the database work and nothing else. With split engines there is a single
+    writer connection: commit the request session's writes before anything
+    opens one of these to write, or the inner write waits on the outer one.
+    """
+    async with async_session_factory() as session:
         yield session
 
 
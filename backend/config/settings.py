@@ -20,6 +20,84 @@ class AppSettings(BaseSettings):
 
     frontend_url: str
 
+    # SQLite connection PRAGMAs: a profile from config/sqlite.py ("default",
+    # "safe" or "fast"), plus individual overrides, e.g. {"cache_size": -64000}
+    sqlite_profile: str = "fast"
+    sqlite_pragmas: dict[str, str | int] = {}
+    # With a WAL database file, writes queue for one dedicated connection and
+    # reads use a pool of read-only ones (seconds a write may wait its turn)
+    sqlite_split_engines: bool = True
+    sqlite_read_pool_size: int = 5
+    sqlite_write_timeout: float = 30.0
+
+    # Which unmet character a new chat gets: "lowest" id, "random", or
+    # "least_served" (fresh characters first, then the longest unseen)
+    unmet_character_order: str = "least_served"
+    # In-memory bitsets of the characters each user has met, users beyond
+    # the byte budget are evicted and reloaded on their next lookup
+    met_index_enabled: bool = True
+    met_index_max_bytes: int = 64 * 1024 * 1024
+
+    # Read-through cache of character and chat history responses, cleared by
+    # the writes that change them (seconds an entry lives, total bytes kept)
+    response_cache_enabled: bool = True
+    response_cache_ttl: float = 300.0
+    response_cache_max_bytes: int = 32 * 1024 * 1024
+    # JSON read responses at least this long are gzip/brotli compressed
+    compress_min_bytes: int = 1024
+
+    # Authenticated users kept in memory between requests (seconds, users)
+    user_cache_ttl: float = 30.0
+    user_cache_max_size: int = 10_000
+
+    # Character generation limits (concurrent OpenAI calls, callers allowed to
+    # wait), for users and separately for pool refills and batches
+    character_gen_concurrency: int = 2
+    character_gen_queue: int = 8
+    character_batch_concurrency: int = 2
+    character_batch_queue: int = 16
+
+    # Warm pool of pre-generated characters
+    character_pool_size: int = 3
+    character_pool_interval: float = 60.0
+    character_pool_batch_size: int = 3
+
+    # Shared outbound HTTP connection pools (limits apply per upstream host)
+    http_max_connections: int = 10
+    http_max_keepalive: int = 5
+    http_keepalive_expiry: float = 30.0
+    http_connect_timeout: float = 10.0
+    http2: bool = False
+    # OpenAI gets its own pool, one connection per streaming chat turn, and
+    # the SDK's 600 s timeout for long completions
+    openai_max_connections: int = 500
+    openai_max_keepalive: int = 50
+    openai_timeout: float = 600.0
+
+    # Leonardo generation polling
+    leonardo_poll_initial_delay: float = 2.0
+    leonardo_poll_max_delay: float = 8.0
+    leonardo_poll_timeout: float = 60.0
+    # Bearer key Leonardo sends with completion webhooks; unset disables them
+    leonardo_webhook_key: str | None = None
+    leonardo_webhook_timeout: float = 20.0
+
+    # Local portrait mirror on the /data volume
+    portrait_dir: str = "/data/portraits"
+    portrait_url_prefix: str = "/api/portraits"
+    portrait_workers: int = 1
+
+    # Write-behind chat messages, committed per batch (rows, seconds)
+    message_batch_size: int = 100
+    message_batch_delay: float = 0.005
+
+    # Durable job queue in the database
+    job_concurrency: int = 2
+    job_lease_seconds: float = 300.0
+    job_poll_interval: float = 5.0
+    job_max_attempts: int = 5
+    job_retry_delay: float = 10.0
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -0,0 +1,111 @@
+import logging
+from typing import Any
+
+from sqlalchemy import CompoundSelect, Engine, Select, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import SessionTransaction
+from sqlmodel import Session
+
+# PRAGMAs run on every new connection, in order (journal_mode first, since
+# synchronous=NORMAL is only safe once WAL is on)
+SQLITE_PROFILES: dict[str, dict[str, Any]] = {
+    # SQLite's own defaults: rollback journal, synchronous=FULL, 2MB cache
+    "default": {},
+    # WAL so readers never block the writer, still fsyncing every commit
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "foreign_keys": "ON",
+    },
+    # WAL with fsync only at checkpoints. A power cut can lose the last
+    # commits, but never corrupts the database
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,  # KiB, so 32MB
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "foreign_keys": "ON",
+    },
+}
+
+
+def sqlite_pragmas(
+    profile: str, overrides: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(
+            f"Unknown SQLite profile '{profile}', use one of {list(SQLITE_PROFILES)}"
+        )
+    return {**SQLITE_PROFILES[profile], **(overrides or {})}
+
+
+def apply_sqlite_profile(
+    engine: AsyncEngine, profile: str, overrides: dict[str, Any] | None = None
+) -> None:
+    """
+    Run the profile's PRAGMAs on every connection the engine opens.
+    Engines for other databases are left alone.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(profile, overrides)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    logging.info(f"SQLite profile '{profile}': {pragmas}")
+
+
+def can_split_engines(url: str, profile: str, overrides: dict[str, Any] | None) -> bool:
+    """
+    Whether the database can be served by a single writer connection plus
+    read-only readers. It takes an SQLite file in WAL mode: :memory: databases
+    are private to each connection, and without WAL readers block the writer.
+    """
+    database = make_url(url)
+    if database.get_backend_name() != "sqlite":
+        return False
+    if database.database in (None, "", ":memory:") or "mode=memory" in str(database):
+        return False
+    journal_mode = sqlite_pragmas(profile, overrides).get("journal_mode", "")
+    return str(journal_mode).upper() == "WAL"
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to the read-only engine and everything else, flushes
+    and Core DML on session.connection() included, to the writer.
+
+    Once a transaction has written, its reads stay on the writer too, so they
+    see their own changes, until it commits or rolls back. The writer has a
+    single connection that transactions wait for in turn, so commit soon after
+    writing and never hold a write open across a network call.
+    """
+
+    def __init__(self, *, writer: AsyncEngine, reader: AsyncEngine, **kw: Any) -> None:
+        super().__init__(**kw)
+        self.writer = writer.sync_engine
+        self.reader = reader.sync_engine
+        self.writing = False
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kw: Any) -> Engine:
+        if not self.writing and isinstance(clause, (Select, CompoundSelect)):
+            return self.reader
+        self.writing = True
+        return self.writer
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _stop_writing(session: RoutingSession, transaction: SessionTransaction) -> None:
+    # Only the outermost transaction ends the write, not savepoints
+    if transaction.parent is None:
+        session.writing = False
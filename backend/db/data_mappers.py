@@ -34,10 +34,13 @@ def message_mapper(
     thread_id: int,
     role: str,
     content: str,
+    openai_response_id: str | None = None,
+    created_at: int | None = None,
 ) -> Message:
     return Message(
+        openai_response_id=openai_response_id,
         thread_id=thread_id,
-        created_at=int(time.time()),
+        created_at=created_at if created_at is not None else int(time.time()),
         role=role,
         content=content,
     )
@@ -2,19 +2,42 @@ from typing import (
     Type,
     TypeVar,
     Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
     List,
+    Sequence,
     cast,
 )
 import logging
+import random
 import time
-from sqlmodel import SQLModel, select
+from sqlalchemy import RowMapping, func, and_, or_, bindparam, insert, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import SQLModel, col, select
+from sqlmodel.sql.expression import SelectOfScalar
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError, NoSuchTableError
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql.elements import ColumnElement
 from backend.schemas import NewCharacter
-from backend.db.db_models import Character, Thread, Message
+from backend.db.db_models import Character, Thread, Message, Job
+from backend.db.met_index import MetIndex, met_index
+from backend.db.payloads import character_json
 from backend.db.data_mappers import character_mapper, thread_mapper
-from backend.db.db_excepts import TableNotFound, RecordNotFound, DatabaseError
+from backend.utils.cache import (
+    CHARACTER_LIST,
+    character_namespace,
+    history_namespace,
+    response_cache,
+)
+from backend.db.db_excepts import (
+    TableNotFound,
+    RecordNotFound,
+    DatabaseError,
+    UnknownField,
+)
 
 
 # Global variable for type hinting
@@ -30,6 +53,8 @@ async def create_record(session: AsyncSession, record: T) -> T | None:
         await session.commit()
         await session.refresh(record)
         logging.info(f"New record {record.__class__.__name__} created successfully")
+        if isinstance(record, Character):
+            await response_cache.invalidate(CHARACTER_LIST)
         return record
     except NoSuchTableError as e:
         logging.error(f"{e}")
@@ -133,6 +158,113 @@ async def read_all_filtered(
         raise DatabaseError("read", "Failed to read records")
 
 
+# Rows per page of a listing, by default and at most
+LIST_PAGE_SIZE = 50
+MAX_LIST_PAGE_SIZE = 200
+
+
+async def read_page(
+    session: AsyncSession,
+    model: Type[T],
+    limit: int,
+    after: int | None = None,
+    fields: Sequence[str] | None = None,
+    hidden: Sequence[str] = (),
+) -> tuple[List[Dict[str, Any]], bool]:
+    """
+    Up to `limit` records with an id above `after`, in id order, plus whether
+    there are more beyond them.
+
+    Only the id and the requested `fields` (every column without them) are
+    selected, and rows come back as plain dicts rather than model instances.
+    Columns in `hidden` are never returned, asking for one is the same as
+    asking for a field that does not exist.
+
+    Raises:
+        UnknownField: If a requested field is not a visible column
+    """
+    columns = cast(Any, model).__table__.columns.keys()
+    visible = [name for name in columns if name not in hidden]
+    if fields:
+        unknown = [name for name in fields if name not in visible]
+        if unknown:
+            raise UnknownField(model.__name__, unknown)
+        visible = ["id"] + [name for name in visible if name in fields and name != "id"]
+
+    record_id = col(cast(Any, model).id)
+    statement = select(*[col(getattr(model, name)) for name in visible])
+    if after is not None:
+        statement = statement.where(record_id > after)
+    try:
+        result = await session.stream(statement.order_by(record_id).limit(limit + 1))
+        records = [dict(row) for row in await result.mappings().all()]
+    except NoSuchTableError as e:
+        logging.error(f"{e}")
+        raise TableNotFound(model.__name__)
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        raise DatabaseError("read", "Failed to read records")
+    return records[:limit], len(records) > limit
+
+
+async def count_records(session: AsyncSession, model: Type[T]) -> int:
+    """
+    Count a table's rows. SQLite answers count(*) from its smallest index
+    rather than the table itself, so this stays cheap for wide rows.
+    """
+    try:
+        result = await session.exec(select(func.count()).select_from(model))
+        return int(result.one())
+    except NoSuchTableError as e:
+        logging.error(f"{e}")
+        raise TableNotFound(model.__name__)
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        raise DatabaseError("count", "Failed to count records")
+
+
+async def read_character_payloads(
+    session: AsyncSession, limit: int, after: int | None = None
+) -> tuple[List[bytes], int | None, bool]:
+    """
+    The stored JSON of a page of characters in id order, the last id on the
+    page, and whether there are more. Only the id and public_json columns are
+    read. Rows written with Core have no public_json yet, those are loaded and
+    serialized instead.
+    """
+    rows, more = await read_page(
+        session, Character, limit, after=after, fields=["public_json"]
+    )
+    payloads = [
+        row["public_json"] or await read_character_payload(session, row["id"])
+        for row in rows
+    ]
+    last_id = rows[-1]["id"] if rows else None
+    return payloads, last_id, more
+
+
+async def read_character_payload(session: AsyncSession, character_id: int) -> bytes:
+    """
+    One character's JSON, as stored or else serialized from the row.
+
+    Raises:
+        RecordNotFound: If there is no such character
+    """
+    try:
+        result = await session.exec(
+            select(Character.public_json).where(Character.id == character_id)
+        )
+        payload = result.first()
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        raise DatabaseError("read", "Failed to read record")
+    if payload:
+        return payload
+    character = await read_record(session, Character, character_id)
+    assert character is not None
+    return character_json(character)
+
+
 async def read_one_by_field(
     session: AsyncSession, model: Type[T], field_name: str, value: Any
 ) -> T | None:
@@ -169,6 +301,7 @@ async def update_record(
         session.add(record)
         await session.commit()
         await session.refresh(record)
+        await invalidate_cached(model, primary_key)
         return record
     except NoSuchTableError as e:
         logging.error(f"{e}")
@@ -189,8 +322,19 @@ async def delete_record(
     """Delete a record from the database."""
     try:
         record = await read_record(session, model, primary_key)
+        # A character's threads are deleted along with it
+        threads: Sequence[int | None] = []
+        if model is Character:
+            result = await session.exec(
+                select(Thread.id).where(Thread.character_id == primary_key)
+            )
+            threads = result.all()
         await session.delete(record)
         await session.commit()
+        await invalidate_cached(model, primary_key)
+        await response_cache.invalidate(
+            *(history_namespace(thread_id) for thread_id in threads if thread_id)
+        )
     except NoSuchTableError as e:
         logging.error(f"{e}")
         raise TableNotFound(model.__name__)
@@ -201,28 +345,76 @@ async def delete_record(
         raise DatabaseError("delete", "Failed to delete record")
 
 
+async def invalidate_cached(model: Type[T], primary_key: int) -> None:
+    """Drop the cached responses built from a record that changed."""
+    if model is Character:
+        await response_cache.invalidate(
+            character_namespace(primary_key), CHARACTER_LIST
+        )
+    elif model is Thread:
+        await response_cache.invalidate(history_namespace(primary_key))
+
+
 # API SPECIFIC
 
 
+# Ways fetch_unmet_character can pick among the unmet characters
+UNMET_ORDERS = ("lowest", "random", "least_served")
+
+
 async def fetch_unmet_character(
-    session: AsyncSession, user_id: int
+    session: AsyncSession,
+    user_id: int,
+    order: str = "lowest",
+    index: MetIndex | None = None,
 ) -> Character | None:
     """
-    Returns the first character in the database the user has never seen before,
-    or None if all have been met.
+    Returns a character the user has never met before, or None if all have
+    been met.
+
+    Characters are walked along an index and each one is checked with a
+    NOT EXISTS probe of the thread (user_id, character_id) index, so a lookup
+    costs one probe per met character skipped, whatever the size of the
+    catalog or of the user's history. order picks the character:
+        lowest: the lowest id.
+        random: the first unmet one from a random id onwards, wrapping around.
+            Characters right after a run of met ones are a bit more likely.
+        least_served: the one served to anybody longest ago, never served first.
+
+    Characters whose portrait is READY come first, those still PENDING or
+    FAILED are only picked when the user has met every ready one.
+
+    With a built MetIndex the pick is made in memory and confirmed with a
+    single primary key probe, the index walk is the fallback.
     """
+    if order not in UNMET_ORDERS:
+        raise ValueError(f"Unknown order '{order}', use one of {UNMET_ORDERS}")
     try:
-        statement = (
+        character_id = col(Character.id)
+        unmet = (
             select(Character)
             .where(
-                cast(ColumnElement[int], Character.id).notin_(
-                    select(Thread.character_id).where(Thread.user_id == user_id)
-                )
+                ~select(Thread.id)
+                .where(Thread.user_id == user_id, Thread.character_id == character_id)
+                .exists()
             )
             .limit(1)
         )
-        result = await session.exec(statement)
-        character = result.first()
+
+        character = None
+        for ready_only in (True, False):
+            if index is not None and index.ready:
+                character = await _pick_indexed(
+                    session, unmet, user_id, order, index, ready_only
+                )
+            if not character:
+                ready = col(Character.image_status) == "READY"
+                character = await _walk_unmet(
+                    session, unmet.where(ready) if ready_only else unmet, order
+                )
+            if character:
+                break
+
         if character:
             logging.info(f"Found unmet character for user {user_id}.")
             return character
@@ -236,6 +428,118 @@ async def fetch_unmet_character(
         )
 
 
+async def _pick_indexed(
+    session: AsyncSession,
+    unmet: SelectOfScalar[Character],
+    user_id: int,
+    order: str,
+    index: MetIndex,
+    ready_only: bool,
+) -> Character | None:
+    """fetch_unmet_character's pick from the MetIndex, checked in the database."""
+    for _ in range(3):
+        candidate = await index.pick(session, user_id, order, ready_only)
+        if candidate is None:
+            return None
+        result = await session.exec(unmet.where(col(Character.id) == candidate))
+        character = result.first()
+        if character is None:
+            # Stale, met in a thread the index missed or deleted
+            index.mark_met(user_id, candidate)
+        elif ready_only and character.image_status != "READY":
+            # Its portrait status was written around the ORM
+            index.portrait_changed(candidate, character.image_status)
+        else:
+            return character
+    return None
+
+
+async def _walk_unmet(
+    session: AsyncSession, unmet: SelectOfScalar[Character], order: str
+) -> Character | None:
+    """fetch_unmet_character's walk along the character indexes."""
+    character_id = col(Character.id)
+    if order == "random":
+        # Separate subqueries, SQLite only reads min() or max() off the
+        # index when it is alone in the query
+        bounds = select(
+            select(func.min(character_id)).scalar_subquery(),
+            select(func.max(character_id)).scalar_subquery(),
+        )
+        lowest, highest = (await session.exec(bounds)).one()
+        if lowest is None or highest is None:
+            return None
+        pivot = random.randint(lowest, highest)
+        result = await session.exec(
+            unmet.where(character_id >= pivot).order_by(character_id)
+        )
+        character = result.first()
+        if not character:
+            result = await session.exec(
+                unmet.where(character_id < pivot).order_by(character_id)
+            )
+            character = result.first()
+    else:
+        if order == "least_served":
+            unmet = unmet.order_by(col(Character.last_served_at), character_id)
+        else:
+            unmet = unmet.order_by(character_id)
+        result = await session.exec(unmet)
+        character = result.first()
+    return character
+
+
+async def count_unclaimed_characters(session: AsyncSession) -> int:
+    """
+    Count portrait-complete characters that no user has a thread with yet.
+    These are the characters held "in stock" by the warm character pool.
+    """
+    try:
+        statement = (
+            select(func.count())
+            .select_from(Character)
+            .where(
+                Character.image_status == "READY",
+                ~select(Thread.id).where(Thread.character_id == Character.id).exists(),
+            )
+        )
+        result = await session.exec(statement)
+        return int(result.one())
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        raise DatabaseError("count", "Failed to count unclaimed characters")
+
+
+async def count_incoming_characters(session: AsyncSession) -> int:
+    """
+    Count characters on their way into the pool: those asked for by
+    character_batch jobs that have not stored them yet, and unclaimed ones
+    whose portrait is still being generated.
+    """
+    try:
+        queued = select(
+            func.coalesce(func.sum(func.json_extract(Job.payload, "$.count")), 0)
+        ).where(
+            col(Job.kind) == "character_batch",
+            col(Job.state).in_(("queued", "running")),
+            func.json_extract(Job.payload, "$.stored").is_(None),
+        )
+        generating = (
+            select(func.count())
+            .select_from(Character)
+            .where(
+                Character.image_status == "PENDING",
+                ~select(Thread.id).where(Thread.character_id == Character.id).exists(),
+            )
+        )
+        batches = await session.exec(queued)
+        portraits = await session.exec(generating)
+        return int(batches.one()) + int(portraits.one())
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        raise DatabaseError("count", "Failed to count incoming characters")
+
+
 async def store_new_character(
     session: AsyncSession, new_character: NewCharacter, user_id: int
 ) -> Character:
@@ -247,79 +551,433 @@ async def store_new_character(
     assert stored_character is not None, "Failed to store character"
     assert isinstance(stored_character.id, int)
 
-    # Store thread data
-    thread = thread_mapper(user_id, stored_character.id)
-    await create_record(session, thread)
+    # The creator has met the character
+    await fetch_thread(session, user_id, stored_character.id)
 
     return stored_character
 
 
+async def mark_character_served(session: AsyncSession, character: Character) -> None:
+    """
+    Stamp the character's last_served_at, for the caller to commit.
+
+    A Core UPDATE of that one column: it is bookkeeping outside the character
+    JSON, so public_json is not rebuilt and no cached response goes stale.
+    """
+    served_at = int(time.time())
+    try:
+        connection = await session.connection()
+        await connection.execute(
+            update(Character)
+            .where(col(Character.id) == character.id)
+            .values(last_served_at=served_at)
+        )
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("update", "Failed to mark character as served")
+    set_committed_value(character, "last_served_at", served_at)
+
+
+async def store_character_batch(
+    session: AsyncSession,
+    new_characters: List[NewCharacter],
+    user_id: int,
+    on_stored: Callable[[List[Character]], Awaitable[None]] | None = None,
+) -> List[Character]:
+    """
+    Store several characters in a single transaction, without threads. Their
+    portraits are left PENDING.
+
+    Args:
+        new_characters (List[NewCharacter]): Generated character profiles.
+        user_id (int): User credited as the characters' creator.
+        on_stored: Called with the characters once they have their ids, to
+            write whatever must be committed together with them.
+
+    Returns:
+        List[Character]: The stored characters with their ids.
+    """
+    try:
+        characters = [character_mapper(new, user_id) for new in new_characters]
+        logging.info(f"Storing batch of {len(characters)} characters")
+        session.add_all(characters)
+        if on_stored is not None:
+            await session.flush()
+            await on_stored(characters)
+        await session.commit()
+        await response_cache.invalidate(CHARACTER_LIST)
+        return characters
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("create", "Failed to store character batch")
+
+
 async def fetch_thread(
     session: AsyncSession,
     user_id: int,
     character_id: int,
-) -> Thread | None:
+) -> Thread:
+    """
+    Get the thread between a user and a character, creating it if there is
+    none yet.
+
+    A single INSERT ... ON CONFLICT DO NOTHING RETURNING against the unique
+    (user_id, character_id) index, so concurrent callers always end up with
+    the same thread. Only the callers that lose the race read it back.
+    Commits the session.
+    """
     try:
-        statement = select(Thread).where(
-            Thread.user_id == user_id, Thread.character_id == character_id
+        columns = Thread.__table__.columns  # type: ignore[attr-defined]
+        thread = thread_mapper(user_id, character_id)
+        statement = (
+            sqlite_insert(Thread)
+            .values(**thread.model_dump(exclude={"id"}))
+            .on_conflict_do_nothing(index_elements=["user_id", "character_id"])
+            .returning(*columns)
         )
-        result = await session.exec(statement)
-        thread = result.first()
-
-        if thread:
-            logging.info(
-                f"Previous thread found between user {user_id} and character {character_id}."
+        connection = await session.connection()
+        row = (await connection.execute(statement)).first()
+        created = row is not None
+        if row is None:
+            existing = select(*columns).where(
+                Thread.user_id == user_id, Thread.character_id == character_id
             )
-            return thread
-
-        logging.info(
-            f"Creating new thread between user {user_id} and character {character_id}."
-        )
-        new_thread = Thread(
-            user_id=user_id,
-            character_id=character_id,
-            created_at=int(time.time()),
-        )
-        await create_record(session, new_thread)
-        return new_thread
+            row = (await connection.execute(existing)).one()
+        await session.commit()
     except SQLAlchemyError as e:
         logging.error(f"{e}")
+        await session.rollback()
         raise DatabaseError(
             "thread", "Failed to retrieve or create thread in the database"
         )
 
+    if created:
+        logging.info(
+            f"Created new thread between user {user_id} and character {character_id}."
+        )
+        # Core inserts skip the ORM events that keep the index up to date
+        if met_index.ready:
+            met_index.thread_added(user_id, character_id)
+    return Thread.model_validate(row._mapping)
 
-async def store_message(
+
+async def read_message_page(
     session: AsyncSession,
     thread_id: int,
-    role: str,
-    content: str,
-    openai_response_id: str | None = None,
-    created_at: int | None = None,
-) -> None:
-    new_message = Message(
-        openai_response_id=openai_response_id,
-        thread_id=thread_id,
-        role=role,
-        content=content,
-        created_at=created_at if created_at is not None else int(time.time()),
-    )
+    limit: int,
+    before: int | None = None,
+    after: int | None = None,
+) -> tuple[List[Message], bool]:
+    """
+    One page of a thread's messages in id order, plus whether there are more
+    beyond it.
+
+    Without `after` the page holds the newest messages older than `before`
+    (the latest ones without either), for scrolling back; with `after` the
+    oldest ones newer than it. SQLite's thread_id index already orders each
+    thread's entries by rowid, which is the id, so both directions are a range
+    scan that stops after limit + 1 rows.
+    """
+    try:
+        message_id = col(Message.id)
+        statement = select(Message).where(Message.thread_id == thread_id)
+        if after is not None:
+            statement = statement.where(message_id > after).order_by(message_id)
+        else:
+            if before is not None:
+                statement = statement.where(message_id < before)
+            statement = statement.order_by(message_id.desc())
+        result = await session.exec(statement.limit(limit + 1))
+        messages = list(result.all())
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        raise DatabaseError("read", "Failed to read messages")
 
-    await create_record(session, new_message)
+    more = len(messages) > limit
+    messages = messages[:limit]
+    if after is None:
+        messages.reverse()
+    return messages, more
 
 
-async def get_last_resp_id(session: AsyncSession, thread_id: int) -> str | None:
-    query = (
-        select(Message)
-        .where(Message.thread_id == thread_id, Message.role == "assistant")
-        .order_by(cast(ColumnElement[int], Message.id).desc())
-        .limit(1)
+async def stream_conversations(
+    session: AsyncSession, batch_size: int = 1000
+) -> AsyncGenerator[RowMapping, None]:
+    """
+    Every thread joined with each of its messages, in thread and message id
+    order, read through a server-side cursor `batch_size` rows at a time.
+    Threads without messages come once, with None message columns.
+
+    Rows are plain column tuples rather than ORM objects, so nothing piles up
+    in the session and only the current batch is held in memory, whatever the
+    size of the tables.
+    """
+    columns = [
+        col(Thread.id).label("thread_id"),
+        col(Thread.user_id),
+        col(Thread.character_id),
+        col(Thread.created_at).label("thread_created_at"),
+        col(Message.id).label("message_id"),
+        col(Message.role),
+        col(Message.content),
+        col(Message.created_at),
+        col(Message.openai_response_id),
+    ]
+    statement = (
+        select(*columns)
+        .outerjoin(Message, col(Message.thread_id) == col(Thread.id))
+        .order_by(col(Thread.id), col(Message.id))
+        .execution_options(yield_per=batch_size)
     )
+    try:
+        result = await session.stream(statement)
+        async for row in result.mappings():
+            yield row
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        raise DatabaseError("read", "Failed to stream conversations")
+
+
+# Folds a batch's messages into their thread's summary columns, one set of
+# parameters per thread
+THREAD_SUMMARY = (
+    update(Thread)
+    .where(col(Thread.id) == bindparam("b_thread_id"))
+    .values(
+        message_count=Thread.message_count + bindparam("b_added"),
+        last_message_at=func.max(
+            func.coalesce(Thread.last_message_at, 0), bindparam("b_last_message_at")
+        ),
+        last_response_id=func.coalesce(
+            bindparam("b_response_id"), Thread.last_response_id
+        ),
+    )
+)
+
+
+async def store_messages(session: AsyncSession, messages: List[Message]) -> None:
+    """
+    Store a batch of messages in a single transaction with one executemany,
+    and bring their threads' message_count, last_message_at and
+    last_response_id up to date in the same transaction.
+    Nothing reads the messages back, so their ids are not fetched.
+    """
+    summaries: dict[int, dict[str, Any]] = {}
+    for message in messages:
+        summary = summaries.setdefault(
+            message.thread_id,
+            {
+                "b_thread_id": message.thread_id,
+                "b_added": 0,
+                "b_last_message_at": 0,
+                "b_response_id": None,
+            },
+        )
+        summary["b_added"] += 1
+        summary["b_last_message_at"] = max(
+            summary["b_last_message_at"], message.created_at
+        )
+        if message.role == "assistant" and message.openai_response_id:
+            summary["b_response_id"] = message.openai_response_id
+
+    try:
+        connection = await session.connection()
+        await connection.execute(
+            insert(Message),
+            [message.model_dump(exclude={"id"}) for message in messages],
+        )
+        await connection.execute(THREAD_SUMMARY, list(summaries.values()))
+        await session.commit()
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("create", "Failed to store messages")
+    await response_cache.invalidate(*map(history_namespace, summaries))
+
+
+# JOBS
+
+
+async def enqueue_job(
+    session: AsyncSession,
+    kind: str,
+    payload: str,
+    run_at: float,
+    max_attempts: int,
+    commit: bool = True,
+) -> Job:
+    """
+    Store a new queued job. Without commit it is only flushed, and stored
+    along with the rest of the caller's transaction.
+    """
+    try:
+        job = Job(
+            kind=kind,
+            payload=payload,
+            run_at=run_at,
+            max_attempts=max_attempts,
+            created_at=int(time.time()),
+        )
+        session.add(job)
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
+        return job
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("create", "Failed to enqueue job")
+
+
+async def lease_job(
+    session: AsyncSession, worker: str, now: float, lease_seconds: float
+) -> Job | None:
+    """
+    Atomically claim the next due job for a worker.
+
+    A single UPDATE ... RETURNING picks a queued job whose run_at has passed,
+    or a running one whose lease expired, so two workers can never lease the
+    same job.
+    """
+    try:
+        next_job = (
+            select(Job.id)
+            .where(
+                or_(
+                    and_(col(Job.state) == "queued", col(Job.run_at) <= now),
+                    and_(
+                        col(Job.state) == "running",
+                        col(Job.lease_expires_at) < now,
+                    ),
+                )
+            )
+            .order_by(cast(ColumnElement[float], Job.run_at))
+            .limit(1)
+            .scalar_subquery()
+        )
+        statement = (
+            update(Job)
+            .where(cast(ColumnElement[int], Job.id) == next_job)
+            .values(
+                state="running",
+                attempts=Job.attempts + 1,
+                lease_expires_at=now + lease_seconds,
+                locked_by=worker,
+            )
+            .returning(*Job.__table__.columns)  # type: ignore[attr-defined]
+        )
+        # Core statement on the session's connection, no ORM state to sync
+        connection = await session.connection()
+        result = await connection.execute(statement)
+        row = result.first()
+        await session.commit()
+        return Job.model_validate(row._mapping) if row else None
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("update", "Failed to lease job")
+
+
+async def extend_job_lease(
+    session: AsyncSession, job_id: int, worker: str, lease_expires_at: float
+) -> bool:
+    """Push a running job's lease back. False if the worker lost the lease."""
+    try:
+        statement = (
+            update(Job)
+            .where(
+                cast(ColumnElement[int], Job.id) == job_id,
+                col(Job.state) == "running",
+                col(Job.locked_by) == worker,
+            )
+            .values(lease_expires_at=lease_expires_at)
+        )
+        connection = await session.connection()
+        result = await connection.execute(statement)
+        await session.commit()
+        return bool(result.rowcount)
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("update", "Failed to extend job lease")
+
+
+async def save_job_payload(
+    session: AsyncSession, job_id: int, worker: str, payload: str
+) -> bool:
+    """
+    Replace a running job's payload as part of the caller's transaction, so
+    the progress it records is committed with the work itself. False if the
+    worker lost the lease.
+    """
+    try:
+        statement = (
+            update(Job)
+            .where(
+                cast(ColumnElement[int], Job.id) == job_id,
+                col(Job.state) == "running",
+                col(Job.locked_by) == worker,
+            )
+            .values(payload=payload)
+        )
+        connection = await session.connection()
+        result = await connection.execute(statement)
+        return bool(result.rowcount)
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("update", "Failed to save job payload")
+
+
+async def finish_job(session: AsyncSession, job_id: int) -> None:
+    """Remove a job that completed successfully."""
+    try:
+        connection = await session.connection()
+        await connection.execute(
+            delete(Job).where(cast(ColumnElement[int], Job.id) == job_id)
+        )
+        await session.commit()
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("delete", "Failed to finish job")
 
-    result = await session.exec(query)
-    last_message = result.first()
 
-    if last_message:
-        return last_message.openai_response_id
+async def release_job(
+    session: AsyncSession, job_id: int, error: str, run_at: float | None
+) -> None:
+    """
+    Record a failed attempt. With a run_at the job is queued again for a retry,
+    without one it is marked failed for good.
+    """
+    values: dict[str, Any] = {
+        "lease_expires_at": None,
+        "locked_by": None,
+        "last_error": error,
+    }
+    if run_at is None:
+        values["state"] = "failed"
     else:
-        return None
+        values["state"] = "queued"
+        values["run_at"] = run_at
+    try:
+        connection = await session.connection()
+        await connection.execute(
+            update(Job)
+            .where(cast(ColumnElement[int], Job.id) == job_id)
+            .values(**values)
+        )
+        await session.commit()
+    except SQLAlchemyError as e:
+        logging.error(f"{e}")
+        await session.rollback()
+        raise DatabaseError("update", "Failed to release job")
+
+
+async def count_jobs_by_state(session: AsyncSession) -> dict[str, int]:
+    statement = select(Job.state, func.count()).group_by(Job.state)
+    result = await session.exec(statement)
+    return {state: int(count) for state, count in result.all()}
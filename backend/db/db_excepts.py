@@ -24,3 +24,11 @@ class TableNotFound(HTTPException):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Table '{table_name}' does not exist in the database.",
         )
+
+
+class UnknownField(HTTPException):
+    def __init__(self, model: str, fields: list[str]) -> None:
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{model} has no field(s) {', '.join(fields)}.",
+        )
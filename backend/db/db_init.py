@@ -1,10 +1,68 @@
 import logging
+from sqlalchemy import inspect, Connection
+from sqlalchemy.schema import CreateColumn
 from sqlmodel import SQLModel
 from backend.config.session import async_engine, get_async_session
 from backend.db.db_models import User
 from backend.db.db_crud import create_record, read_record
+from backend.db.payloads import backfill_sql
 from backend.db.db_excepts import RecordNotFound
 
+# One-off statements run right after sync_schema adds the matching column
+BACKFILLS = {
+    # Portraits left PENDING by older versions were never going to finish
+    ("character", "image_status"): (
+        "UPDATE character SET image_status = "
+        "CASE WHEN image_url = 'PENDING' THEN 'FAILED' ELSE 'READY' END"
+    ),
+    ("character", "last_served_at"): (
+        "UPDATE character SET last_served_at = "
+        "(SELECT MAX(created_at) FROM thread WHERE thread.character_id = character.id)"
+    ),
+    ("character", "public_json"): backfill_sql(),
+    ("thread", "last_response_id"): (
+        "UPDATE thread SET last_response_id = (SELECT openai_response_id FROM message"
+        " WHERE message.thread_id = thread.id AND role = 'assistant'"
+        " ORDER BY id DESC LIMIT 1)"
+    ),
+    ("thread", "last_message_at"): (
+        "UPDATE thread SET last_message_at = "
+        "(SELECT MAX(created_at) FROM message WHERE message.thread_id = thread.id)"
+    ),
+    ("thread", "message_count"): (
+        "UPDATE thread SET message_count = "
+        "(SELECT COUNT(*) FROM message WHERE message.thread_id = thread.id)"
+    ),
+}
+
+# A thread with an older one for the same user and character
+DUPLICATE_THREAD = (
+    "id > (SELECT MIN(first.id) FROM thread AS first"
+    " WHERE first.user_id = thread.user_id"
+    " AND first.character_id = thread.character_id)"
+)
+
+# Statements run before sync_schema creates the matching index on an existing
+# table, for indexes the rows may not satisfy yet
+INDEX_MIGRATIONS = {
+    # Merge duplicate threads into the oldest one of each pair, messages and all
+    "uq_thread_user_id_character_id": (
+        "UPDATE message SET thread_id = ("
+        "SELECT MIN(first.id) FROM thread AS first JOIN thread AS duplicate"
+        " ON first.user_id = duplicate.user_id"
+        " AND first.character_id = duplicate.character_id"
+        " WHERE duplicate.id = message.thread_id) "
+        f"WHERE thread_id IN (SELECT id FROM thread WHERE {DUPLICATE_THREAD})",
+        f"DELETE FROM thread WHERE {DUPLICATE_THREAD}",
+        # Superseded by the unique index
+        "DROP INDEX IF EXISTS ix_thread_user_id_character_id",
+        # The merged threads' summaries now cover more messages
+        BACKFILLS[("thread", "last_response_id")],
+        BACKFILLS[("thread", "last_message_at")],
+        BACKFILLS[("thread", "message_count")],
+    ),
+}
+
 
 async def init_db() -> None:
     """Initialize database and load admin user."""
@@ -18,6 +76,10 @@ async def init_db() -> None:
             await conn.run_sync(SQLModel.metadata.create_all)
             logging.info("Database tables created successfully")
 
+        # Bring tables created by older versions up to date
+        async with async_engine.begin() as conn:
+            await conn.run_sync(sync_schema)
+
         # Load admin user
         success = await load_admin()
         if not success:
@@ -28,6 +90,40 @@ async def init_db() -> None:
         raise
 
 
+def sync_schema(conn: Connection) -> None:
+    """
+    Add the columns and indexes that create_all skips on existing tables.
+
+    New columns must be nullable or have a server default, since SQLite can
+    only ALTER TABLE ADD COLUMN under those conditions. Columns listed in
+    BACKFILLS are populated for the existing rows as soon as they are added,
+    and INDEX_MIGRATIONS run right before their index is created.
+    """
+    inspector = inspect(conn)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            definition = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {definition}")
+            logging.info(f"Added column {table.name}.{column.name}")
+
+            backfill = BACKFILLS.get((table.name, column.name))
+            if backfill is not None:
+                conn.exec_driver_sql(backfill)
+                logging.info(f"Backfilled column {table.name}.{column.name}")
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in indexes:
+                continue
+            for statement in INDEX_MIGRATIONS.get(str(index.name), ()):
+                conn.exec_driver_sql(statement)
+            index.create(conn)
+            logging.info(f"Created index {index.name}")
+
+
 async def load_admin() -> bool:
     """
     Load or create admin user in database.
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from sqlmodel import Field, SQLModel, Relationship
+from sqlmodel import Field, SQLModel, Relationship, Index
 from pydantic import EmailStr
 
 
@@ -7,6 +7,11 @@ class Character(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     image_prompt: str = Field(nullable=False)
     image_url: str = Field(default="PENDING")
+    # PENDING while the portrait is generated, then READY or FAILED
+    image_status: str = Field(
+        default="PENDING", index=True, sa_column_kwargs={"server_default": "PENDING"}
+    )
+    image_generation_id: Optional[str] = Field(default=None, index=True)
     generated_by: int = Field(foreign_key="user.id")
     name: str = Field(nullable=False, index=True)
     planet_name: str = Field(nullable=False)
@@ -15,6 +20,11 @@ class Character(SQLModel, table=True):
     speech_style: str = Field(nullable=False)
     quirks: str = Field(nullable=False)
     human_relationship: str = Field(nullable=False)
+    # When a user last started a chat with the character, None if nobody has
+    last_served_at: Optional[int] = Field(default=None, index=True)
+    # The other columns as the JSON the API sends, kept current by
+    # db/payloads.py so reads can send it as is
+    public_json: Optional[bytes] = Field(default=None, exclude=True)
 
     threads: List["Thread"] = Relationship(
         back_populates="character",
@@ -49,10 +59,20 @@ class Message(SQLModel, table=True):
 
 
 class Thread(SQLModel, table=True):
+    # One thread per pair, also covers the "has this user met this character"
+    # lookups
+    __table_args__ = (
+        Index("uq_thread_user_id_character_id", "user_id", "character_id", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     user_id: int = Field(foreign_key="user.id", nullable=False, index=True)
     character_id: int = Field(foreign_key="character.id", nullable=False, index=True)
     created_at: int = Field(nullable=False, index=True)
+    # Kept up to date with every batch of stored messages
+    last_response_id: Optional[str] = Field(default=None)
+    last_message_at: Optional[int] = Field(default=None)
+    message_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     user: Optional[User] = Relationship(back_populates="threads")
     character: Optional[Character] = Relationship(back_populates="threads")
@@ -60,3 +80,26 @@ class Thread(SQLModel, table=True):
         back_populates="thread",
         sa_relationship_kwargs={"cascade": "all, delete-orphan"},
     )
+
+
+class Job(SQLModel, table=True):
+    """
+    Background work that has to survive restarts and machine suspends.
+
+    state goes queued -> running -> (deleted on success | queued again for a
+    retry | failed). A running job whose lease expired is leased again.
+    """
+
+    __table_args__ = (Index("ix_job_state_run_at", "state", "run_at"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(nullable=False, index=True)
+    payload: str = Field(nullable=False, default="{}")
+    state: str = Field(nullable=False, default="queued")
+    attempts: int = Field(nullable=False, default=0)
+    max_attempts: int = Field(nullable=False, default=5)
+    run_at: float = Field(nullable=False)
+    lease_expires_at: Optional[float] = Field(default=None)
+    locked_by: Optional[str] = Field(default=None)
+    last_error: Optional[str] = Field(default=None)
+    created_at: int = Field(nullable=False)
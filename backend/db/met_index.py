@@ -0,0 +1,259 @@
+import logging
+import random
+import sys
+from array import array
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, cast
+
+from sqlalchemy import event
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.settings import get_settings
+from backend.db.db_models import Character, Thread
+
+
+def bitset(ids: Iterable[int]) -> int:
+    """An int with bit n set for every n in ids."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    bits = bytearray(max(ids) // 8 + 1)
+    for n in ids:
+        bits[n >> 3] |= 1 << (n & 7)
+    return int.from_bytes(bits, "little")
+
+
+def lowest_bit(bits: int) -> int:
+    return (bits & -bits).bit_length() - 1
+
+
+class MetIndex:
+    """
+    In-process record of the characters every user has met, so picking an
+    unmet character takes a few int operations instead of a query.
+
+    A user's met characters are an int used as a bitset, bit n set for
+    character id n. The catalog is kept three ways: a bitset of every id, a
+    dense sorted array of them for uniform random picks, and the ids in least
+    recently served order. A last bitset holds the characters whose portrait
+    is not READY, which picks can skip. Users are kept in LRU order and evicted once their
+    bitsets take more than `max_bytes`, to be loaded from Thread again on
+    their next lookup.
+
+    The index is a hint, fetch_unmet_character confirms every pick against the
+    database. ORM inserts of threads and characters update it through mapper
+    events, rows written with Core only show up after the next build().
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.ready = False
+        self._users: OrderedDict[int, int] = OrderedDict()
+        self._user_bytes = 0
+        self._catalog = 0
+        self._unready = 0
+        self._ids = array("q")
+        # Least recently served order: never served, then oldest serve first
+        self._fresh: Dict[int, None] = {}
+        self._served: Dict[int, None] = {}
+
+        # Metrics
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    async def build(self, session: AsyncSession) -> None:
+        """Load the catalog and as many users' threads as fit in max_bytes."""
+        self.ready = False
+        self._users.clear()
+        self._user_bytes = 0
+
+        statement = select(
+            Character.id, Character.last_served_at, Character.image_status
+        ).order_by(col(Character.last_served_at), col(Character.id))
+        self._fresh, self._served = {}, {}
+        unready: List[int] = []
+        for character_id, served_at, image_status in await session.exec(statement):
+            order = self._fresh if served_at is None else self._served
+            order[cast(int, character_id)] = None
+            if image_status != "READY":
+                unready.append(cast(int, character_id))
+        self._ids = array("q", sorted(chain(self._fresh, self._served)))
+        self._catalog = bitset(self._ids)
+        self._unready = bitset(unready)
+
+        threads = await session.stream(
+            select(Thread.user_id, Thread.character_id).order_by(col(Thread.user_id))
+        )
+        user_id: int | None = None
+        met: List[int] = []
+        async for row_user_id, character_id in threads:
+            if row_user_id != user_id:
+                if user_id is not None:
+                    self._put(user_id, bitset(met))
+                user_id, met = row_user_id, []
+            met.append(character_id)
+        if user_id is not None:
+            self._put(user_id, bitset(met))
+
+        self.ready = True
+        logging.info(
+            f"Met index built: {len(self._ids)} characters, {len(self._users)} users"
+        )
+
+    async def pick(
+        self, session: AsyncSession, user_id: int, order: str, ready_only: bool = False
+    ) -> int | None:
+        """
+        The id of a character the user has not met, picked by `order` like
+        fetch_unmet_character does, or None if the index knows of none.
+        With ready_only, only among the characters whose portrait is READY.
+        """
+        met = await self._met(session, user_id)
+        if ready_only:
+            met |= self._unready
+        unmet = self._catalog & ~met
+        if not unmet:
+            return None
+
+        if order == "random":
+            # First unmet id from a random catalog entry onwards, wrapping around
+            pivot = self._ids[random.randrange(len(self._ids))]
+            above = unmet >> pivot
+            return pivot + lowest_bit(above) if above else lowest_bit(unmet)
+        if order == "least_served":
+            for character_id in chain(self._fresh, self._served):
+                if not met >> character_id & 1:
+                    return character_id
+            return None
+        return lowest_bit(unmet)
+
+    def mark_met(self, user_id: int, character_id: int) -> None:
+        """Record a met character for a user, if the user is loaded."""
+        met = self._users.get(user_id)
+        if met is not None:
+            self._put(user_id, met | 1 << character_id)
+
+    def thread_added(self, user_id: int, character_id: int) -> None:
+        self.mark_met(user_id, character_id)
+        # A new thread is a serve, so it goes to the back of the order
+        self._fresh.pop(character_id, None)
+        self._served.pop(character_id, None)
+        self._served[character_id] = None
+
+    def character_added(
+        self, character_id: int, served_at: int | None, image_status: str
+    ) -> None:
+        if self._catalog >> character_id & 1:
+            return
+        self._catalog |= 1 << character_id
+        self.portrait_changed(character_id, image_status)
+        if not self._ids or character_id > self._ids[-1]:
+            self._ids.append(character_id)
+        else:
+            self._ids = array("q", sorted([*self._ids, character_id]))
+        (self._fresh if served_at is None else self._served)[character_id] = None
+
+    def portrait_changed(self, character_id: int, image_status: str) -> None:
+        if image_status == "READY":
+            self._unready &= ~(1 << character_id)
+        else:
+            self._unready |= 1 << character_id
+
+    def character_removed(self, character_id: int) -> None:
+        if not self._catalog >> character_id & 1:
+            return
+        self._catalog &= ~(1 << character_id)
+        self._unready &= ~(1 << character_id)
+        self._ids.remove(character_id)
+        self._fresh.pop(character_id, None)
+        self._served.pop(character_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        users = len(self._users)
+        if users:
+            per_user = self._user_bytes / users
+        else:
+            # What a user who met the newest character would take
+            per_user = sys.getsizeof(1 << self._ids[-1]) if self._ids else 0
+        catalog_bytes = (
+            sys.getsizeof(self._catalog)
+            + sys.getsizeof(self._unready)
+            + self._ids.buffer_info()[1] * self._ids.itemsize
+            + sys.getsizeof(self._fresh)
+            + sys.getsizeof(self._served)
+        )
+        return {
+            "ready": self.ready,
+            "characters": len(self._ids),
+            "unready_portraits": self._unready.bit_count(),
+            "users": users,
+            "user_bytes": self._user_bytes,
+            "catalog_bytes": catalog_bytes,
+            "bytes_per_10k_users": round(per_user * 10_000),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+    async def _met(self, session: AsyncSession, user_id: int) -> int:
+        met = self._users.get(user_id)
+        if met is not None:
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return met
+
+        statement = select(Thread.character_id).where(Thread.user_id == user_id)
+        met = bitset(await session.exec(statement))
+        self.loads += 1
+        self._put(user_id, met)
+        return met
+
+    def _put(self, user_id: int, met: int) -> None:
+        previous = self._users.pop(user_id, None)
+        if previous is not None:
+            self._user_bytes -= sys.getsizeof(previous)
+        self._users[user_id] = met
+        self._user_bytes += sys.getsizeof(met)
+
+        while self._user_bytes > self.max_bytes and len(self._users) > 1:
+            _, evicted = self._users.popitem(last=False)
+            self._user_bytes -= sys.getsizeof(evicted)
+            self.evictions += 1
+
+
+settings = get_settings()
+met_index = MetIndex(settings.met_index_max_bytes)
+
+
+# Keep the index in step with rows the ORM writes. These fire on flush, so a
+# rolled back insert can leave a stale entry behind, which picks then skip.
+
+
+@event.listens_for(Thread, "after_insert")
+def _thread_inserted(mapper: Any, connection: Any, thread: Thread) -> None:
+    if met_index.ready:
+        met_index.thread_added(thread.user_id, thread.character_id)
+
+
+@event.listens_for(Character, "after_insert")
+def _character_inserted(mapper: Any, connection: Any, character: Character) -> None:
+    if met_index.ready and character.id is not None:
+        met_index.character_added(
+            character.id, character.last_served_at, character.image_status
+        )
+
+
+@event.listens_for(Character, "after_update")
+def _character_updated(mapper: Any, connection: Any, character: Character) -> None:
+    if met_index.ready and character.id is not None:
+        met_index.portrait_changed(character.id, character.image_status)
+
+
+@event.listens_for(Character, "after_delete")
+def _character_deleted(mapper: Any, connection: Any, character: Character) -> None:
+    if met_index.ready and character.id is not None:
+        met_index.character_removed(character.id)
@@ -0,0 +1,54 @@
+from typing import Any, List
+
+import orjson
+from sqlalchemy import event, update
+from sqlalchemy.orm.attributes import get_history, set_committed_value
+from sqlmodel import col
+
+from backend.db.db_models import Character
+
+# Bookkeeping columns that stay out of the character JSON users are sent
+PRIVATE_FIELDS = ("public_json", "last_served_at", "image_generation_id")
+# Keys of a character's public JSON, in the order model_dump gives them
+PUBLIC_FIELDS = [name for name in Character.model_fields if name not in PRIVATE_FIELDS]
+
+
+def public_character(character: Character) -> dict[str, Any]:
+    return character.model_dump(include=set(PUBLIC_FIELDS))
+
+
+def character_json(character: Character) -> bytes:
+    return orjson.dumps(public_character(character))
+
+
+def join_payloads(key: str, payloads: List[bytes]) -> bytes:
+    """{"<key>": [...]} around items that are already serialized."""
+    return b'{"' + key.encode() + b'":[' + b",".join(payloads) + b"]}"
+
+
+def backfill_sql() -> str:
+    """Fills public_json for the rows from before the column existed."""
+    pairs = ", ".join(f"'{name}', {name}" for name in PUBLIC_FIELDS)
+    return f"UPDATE character SET public_json = CAST(json_object({pairs}) AS BLOB)"
+
+
+# Keep public_json in step with every ORM write of a character. The id only
+# exists after the INSERT, so new rows get theirs in a second UPDATE, and
+# updates that only touch bookkeeping columns leave it as it is.
+
+
+@event.listens_for(Character, "after_insert")
+def _character_inserted(mapper: Any, connection: Any, character: Character) -> None:
+    payload = character_json(character)
+    connection.execute(
+        update(Character)
+        .where(col(Character.id) == character.id)
+        .values(public_json=payload)
+    )
+    set_committed_value(character, "public_json", payload)
+
+
+@event.listens_for(Character, "before_update")
+def _character_updated(mapper: Any, connection: Any, character: Character) -> None:
+    if any(get_history(character, name).has_changes() for name in PUBLIC_FIELDS):
+        character.public_json = character_json(character)
@@ -1,21 +1,47 @@
 from typing import AsyncGenerator, Any
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from backend.db.db_init import init_db
+from backend.db.met_index import met_index
+from backend.config.session import get_async_session
+from backend.config.settings import get_settings
+from backend.config.clients import http_clients, leonardo_client
+from backend.services.character_pool import character_pool
+from backend.services.portraits import portrait_store
+from backend.services.job_queue import job_queue
+from backend.services.message_writer import message_writer
 from backend.routes.rt_users import router as users
 from backend.routes.rt_characters import router as characters
 from backend.routes.chat_websocket import router as chat
+from backend.routes.rt_metrics import router as metrics
+from backend.routes.rt_leonardo import router as leonardo
+from backend.routes.rt_portraits import router as portraits
+from backend.routes.rt_export import router as export
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[Any, None]:
     await init_db()
+    if get_settings().met_index_enabled:
+        async with get_async_session() as session:
+            await met_index.build(session)
+    http_clients.open()
+    character_pool.start()
+    job_queue.start()
     yield
+    await character_pool.stop()
+    await job_queue.stop()
+    await message_writer.stop()
+    await leonardo_client.poller.stop()
+    await http_clients.aclose()
+    portrait_store.close()
 
 
 app = FastAPI(
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     root_path="/api",  # Set the root path for the API
 )  # add /api prefix, then update all frontend API requests accordingly
 
@@ -30,11 +56,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # History and listing pages hand out their cursor and total in headers
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 app.include_router(characters)
 app.include_router(users)
 app.include_router(chat)
+app.include_router(metrics)
+app.include_router(leonardo)
+app.include_router(portraits)
+app.include_router(export)
 
 
 @app.get("/")
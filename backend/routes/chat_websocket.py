@@ -3,32 +3,32 @@ import traceback
 from typing import List, Any, Dict
 from fastapi import (
     APIRouter,
+    Query,
+    Request,
     WebSocket,
     WebSocketDisconnect,
 )
 
-from fastapi.responses import JSONResponse
-
-from backend.config.settings import settings_dependency
-from backend.config.session import db_dependency
-from backend.services.openai.chat import ai_response
-from backend.db.db_models import User, Character, Thread, Message
-from backend.db.db_crud import (
-    read_record,
-    read_field,
-    read_all_filtered,
-    store_message,
-    get_last_resp_id,
-)
+from fastapi.responses import ORJSONResponse, Response
+
+from backend.config.session import db_dependency, get_async_session
+from backend.config.clients import openai_client
+from backend.services.conversation import load_conversation, conversation_turn
+from backend.services.message_writer import message_writer
+from backend.db.db_crud import read_message_page
+from backend.utils.cache import history_namespace, request_key, response_cache
+from backend.utils.conditional import ConditionalRoute
+
+router = APIRouter(route_class=ConditionalRoute)
 
-router = APIRouter()
+# Messages per history page
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
 
 
 @router.websocket("/chat/{thread_id}")
 async def chat_with_character(
     websocket: WebSocket,
-    session: db_dependency,
-    settings: settings_dependency,
     thread_id: int,
 ) -> None:
 
@@ -37,67 +37,21 @@ async def chat_with_character(
     logging.info(f"WebSocket connection established for thread {thread_id}")
 
     try:
-        # Load thread and validate thread
-        thread = await read_record(session, Thread, thread_id)
-        assert thread is not None, "No chat thread found"
-        assert isinstance(thread, Thread), "Thread object is incorrect"
-        assert isinstance(thread.id, int), "Thread id is not an int"
+        # Thread, username and character are fixed for the whole connection.
+        # The session is released right after, an idle socket holds no
+        # connection; messages are written through the shared writer
+        async with get_async_session() as session:
+            context = await load_conversation(session, thread_id)
 
         while True:
             # Receive a text message from the client
             user_message = await websocket.receive_text()
 
-            # Store the user message in your database
-            await store_message(session, thread.id, "user", user_message)
-
-            # Retrieve the last OpenAI response id, if any, for context
-            last_response_id = await get_last_resp_id(session, thread.id)
-            if last_response_id:
-                assert isinstance(
-                    last_response_id, str
-                ), "Last response id is not an int"
-
-            # Get the streaming response from OpenAI using your custom logic
-            username = await read_field(session, User, thread.user_id, "username")
-            assert isinstance(username, str)
-            character = await read_record(session, Character, thread.character_id)
-            assert character is not None
-            assert isinstance(character, Character)
-
-            response = await ai_response(
-                settings.openai_api_key,
-                username,
-                character,
-                user_message,
-                last_response_id,
-            )
-
-            # Initialize variables to capture the final response details
-            openai_response_id = None
-            content: str = ""
-            role: str = ""
-            created_at: int = 0
-
-            # Stream the response back to the client chunk by chunk
-            async for chunk in response:
-                if chunk.type == "response.output_text.delta":
-                    await websocket.send_text(chunk.delta)
-                elif chunk.type == "response.completed":
-                    openai_response_id = chunk.response.id
-                    content = chunk.response.output[0].content[0].text
-                    role = chunk.response.output[0].role
-                    created_at = chunk.response.created_at
-
-            # After the stream completes, store the assistant's response if available
-            if openai_response_id:
-                await store_message(
-                    session,
-                    thread.id,
-                    role,
-                    content,
-                    openai_response_id=openai_response_id,
-                    created_at=created_at,
-                )
+            # Stream the character's reply back to the client chunk by chunk
+            async for delta in conversation_turn(
+                openai_client.get_client(), context, user_message
+            ):
+                await websocket.send_text(delta)
 
     except WebSocketDisconnect:
         logging.info("WebSocket disconnected")
@@ -108,35 +62,56 @@ async def chat_with_character(
         logging.error(f"Unexpected error: {e}")
         traceback.print_exc()
     finally:
+        # Make sure the conversation is on disk before the socket is gone
+        await message_writer.flush()
         if websocket.client_state.name == "CONNECTED":
             await websocket.close()
 
 
 @router.get("/chat/history/{thread_id}")
 async def get_chat_history(
+    request: Request,
     session: db_dependency,
     thread_id: int,
-) -> JSONResponse:
+    limit: int = Query(default=HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    before: int | None = None,
+    after: int | None = None,
+) -> Response:
+    """
+    A page of the thread's messages, oldest first. The latest page by default,
+    `before` pages back from a message id and `after` forward. When there are
+    more messages in that direction, the X-Next-Cursor header holds the id to
+    pass as the next `before` (or `after`).
+    """
+    # Include messages still waiting in the write-behind buffer, storing them
+    # also drops the thread's cached pages
+    await message_writer.flush()
+
+    async def build() -> Response:
+        try:
+            messages, more = await read_message_page(
+                session, thread_id, limit, before=before, after=after
+            )
 
-    try:
-        messages = await read_all_filtered(session, Message, thread_id=thread_id)
-
-        if not messages:
-            return JSONResponse(content=[], status_code=200)
-
-        assert isinstance(messages, List)
-
-        history: List[Dict[str, Any]] = [
-            {
-                "role": message.role,
-                "content": message.content,
-                "created_at": message.created_at,
-            }
-            for message in sorted(messages, key=lambda x: x.created_at)
-        ]
-        assert isinstance(history, List)
-        return JSONResponse(content=history, status_code=200)
-    except (AssertionError, Exception) as e:
-        logging.error(f"Assertion error: {e}")
-        traceback.print_exc()
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+            history: List[Dict[str, Any]] = [
+                {
+                    "id": message.id,
+                    "role": message.role,
+                    "content": message.content,
+                    "created_at": message.created_at,
+                }
+                for message in messages
+            ]
+            headers = {}
+            if more:
+                cursor = messages[-1] if after is not None else messages[0]
+                headers["X-Next-Cursor"] = str(cursor.id)
+            return ORJSONResponse(content=history, status_code=200, headers=headers)
+        except (AssertionError, Exception) as e:
+            logging.error(f"Assertion error: {e}")
+            traceback.print_exc()
+            return ORJSONResponse(content={"error": str(e)}, status_code=500)
+
+    return await response_cache.fetch(
+        history_namespace(thread_id), request_key(request), build
+    )
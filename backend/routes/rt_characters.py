@@ -1,58 +1,91 @@
+import asyncio
+import json
 import logging
+import orjson
 import traceback
+from typing import Any, AsyncGenerator
 
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from openai import APIConnectionError, RateLimitError
 
 
 from backend.config.session import db_dependency
-from backend.config.clients import (
-    openai_dep,
-    leonardo_dep,
-)
+from backend.config.clients import openai_dep
 from backend.services.auth import admin_only_dependency, valid_user_dependency
 from backend.schemas import CharacterPatchData, NewCharacter
 from backend.db.db_crud import (
     store_new_character,
     update_record,
-    read_all,
+    read_page,
     read_record,
+    read_character_payload,
+    read_character_payloads,
+    count_records,
     delete_record,
+    LIST_PAGE_SIZE,
+    MAX_LIST_PAGE_SIZE,
 )
 from backend.db.db_models import Character, Thread
-from backend.db.db_excepts import DatabaseError, TableNotFound, RecordNotFound
-from backend.services.openai.character import generate_character
-from backend.services.leonardo.img_request import generate_portrait
+from backend.db.payloads import PRIVATE_FIELDS, join_payloads, public_character
+from backend.db.db_excepts import (
+    DatabaseError,
+    TableNotFound,
+    RecordNotFound,
+    UnknownField,
+)
+from backend.services.openai.character import (
+    generate_character,
+    GenerationQueueFull,
+    MAX_BATCH_SIZE,
+)
+from backend.services.job_queue import job_queue
+from backend.services.portrait_jobs import (
+    FINAL_STATUSES,
+    portrait_events,
+    portrait_jobs,
+)
 from backend.services.chat_builder import chat_builder
+from backend.utils.cache import (
+    CHARACTER_LIST,
+    character_namespace,
+    request_key,
+    response_cache,
+)
+from backend.utils.conditional import ConditionalRoute
 from backend.utils.retry import retry_async
 
-router = APIRouter()
+router = APIRouter(route_class=ConditionalRoute)
+
+
+# OpenAI errors worth another try. A full generation queue (503) is not one
+# of them, that caller is turned away at once
+TRANSIENT_OPENAI_ERRORS = (APIConnectionError, RateLimitError)
 
 
 @router.post("/character/generate")
-@retry_async(3, 1.0)
 async def new_character(
     session: db_dependency,
     user: valid_user_dependency,
-    image_client: leonardo_dep,
     text_client: openai_dep,
-) -> JSONResponse:
+) -> ORJSONResponse:
 
-    new_char = generate_character(text_client)
+    # Only the generation is retried, so a failure after the character is
+    # stored can never store it twice
+    generate = retry_async(3, 1.0, exceptions=TRANSIENT_OPENAI_ERRORS)(
+        generate_character
+    )
+    new_char = await generate(text_client)
 
     assert isinstance(new_char, NewCharacter)
     assert isinstance(user.id, int)
     stored = await store_new_character(session, new_char, user.id)
 
-    url = await generate_portrait(image_client, stored.image_prompt)
-
-    if not url:
-        raise RuntimeError("portrait failed")
-
+    # The portrait follows in the background, see /character/{id}/portrait/events
     assert isinstance(stored.id, int)
-    await update_record(session, Character, stored.id, {"image_url": url})
+    await portrait_jobs.schedule(stored.id)
 
-    return JSONResponse(content=f"{stored.name} created and stored.", status_code=201)
+    return ORJSONResponse(content=f"{stored.name} created and stored.", status_code=201)
 
 
 @router.post("/character/add")
@@ -60,42 +93,93 @@ async def add_character(
     session: db_dependency,
     new_character: NewCharacter,
     admin: admin_only_dependency,
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         assert admin.id is not None
         stored_character = await store_new_character(session, new_character, admin.id)
 
-        return JSONResponse(content=stored_character.model_dump(), status_code=201)
+        return ORJSONResponse(content=stored_character.model_dump(), status_code=201)
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             content=f"Unable to create new character: {e}", status_code=500
         )
 
 
+@router.post("/character/batch")
+async def generate_character_batch(
+    admin: admin_only_dependency,
+    count: int = Query(default=5, ge=1, le=MAX_BATCH_SIZE),
+) -> ORJSONResponse:
+    """
+    Seed the catalog with a batch of characters generated in one OpenAI call.
+    Portraits take a while, so the batch is queued as a background job.
+    """
+    assert isinstance(admin.id, int)
+    await job_queue.enqueue("character_batch", {"count": count, "owner_id": admin.id})
+    return ORJSONResponse(
+        content=f"Generating a batch of {count} characters.", status_code=202
+    )
+
+
 @router.get("/character")
 async def get_all_characters(
+    request: Request,
     session: db_dependency,
     user: valid_user_dependency,
-) -> JSONResponse:
-    try:
-        characters = await read_all(session, Character)
-        if not characters:
-            return JSONResponse(content="No characters found", status_code=404)
-        result = {"characters": [character.model_dump() for character in characters]}
-        return JSONResponse(content=result, status_code=200)
-    except (DatabaseError, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
+    limit: int = Query(default=LIST_PAGE_SIZE, ge=1, le=MAX_LIST_PAGE_SIZE),
+    after: int | None = None,
+    fields: str | None = None,
+) -> Response:
+    """
+    A page of characters in id order. `after` continues from a character id,
+    `fields` is a comma separated list of the columns to return (the id is
+    always there). X-Next-Cursor holds the `after` for the next page when there
+    is one, and the first page carries the total in X-Total-Count.
+    """
+
+    async def build() -> Response:
+        try:
+            if fields:
+                characters, more = await read_page(
+                    session,
+                    Character,
+                    limit,
+                    after=after,
+                    fields=fields.split(","),
+                    hidden=PRIVATE_FIELDS,
+                )
+                last_id = characters[-1]["id"] if characters else None
+                body = orjson.dumps({"characters": characters})
+            else:
+                # Every column: the stored JSON of each character, as is
+                payloads, last_id, more = await read_character_payloads(
+                    session, limit, after=after
+                )
+                body = join_payloads("characters", payloads)
+            if last_id is None and after is None:
+                return ORJSONResponse(content="No characters found", status_code=404)
+            headers = {}
+            if more:
+                headers["X-Next-Cursor"] = str(last_id)
+            if after is None:
+                headers["X-Total-Count"] = str(await count_records(session, Character))
+            return Response(
+                content=body, media_type="application/json", headers=headers
+            )
+        except (DatabaseError, TableNotFound, UnknownField) as e:
+            return ORJSONResponse(content=e.detail, status_code=e.status_code)
+
+    return await response_cache.fetch(CHARACTER_LIST, request_key(request), build)
 
 
 @router.get("/character/chat")
 async def load_character(
     session: db_dependency,
     user: valid_user_dependency,
-    image_client: leonardo_dep,
     text_client: openai_dep,
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
-        thread = await chat_builder(session, user, image_client, text_client)
+        thread = await chat_builder(session, user, text_client)
         assert thread is not None
         assert isinstance(thread, Thread)
 
@@ -103,16 +187,18 @@ async def load_character(
         assert character is not None
         assert isinstance(character, Character)
 
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "thread_id": thread.id,
-                "character": character.model_dump(),
+                "character": public_character(character),
             },
             status_code=200,
         )
+    except GenerationQueueFull as e:
+        return ORJSONResponse(content={"error": e.detail}, status_code=e.status_code)
     except Exception as e:
         logging.error(traceback.format_exc())
-        return JSONResponse(
+        return ORJSONResponse(
             content={"error": f"Failed to create or load character: {e}"},
             status_code=500,
         )
@@ -120,25 +206,109 @@ async def load_character(
 
 @router.get("/character/{character_id}")
 async def get_character_by_id(
+    request: Request,
     session: db_dependency,
     character_id: int,
     user: valid_user_dependency,
-) -> JSONResponse:
+) -> Response:
+    """The character, served from the response cache until it changes."""
+
+    async def build() -> Response:
+        try:
+            payload = await read_character_payload(session, character_id)
+            return Response(
+                content=b'{"character":' + payload + b"}",
+                media_type="application/json",
+            )
+        except (DatabaseError, RecordNotFound, TableNotFound) as e:
+            return ORJSONResponse(content=e.detail, status_code=e.status_code)
+        except Exception:
+            return ORJSONResponse(content="Unexpected error", status_code=500)
+
+    return await response_cache.fetch(
+        character_namespace(character_id), request_key(request), build
+    )
+
+
+@router.post("/character/{character_id}/portrait")
+async def retry_portrait(
+    session: db_dependency,
+    character_id: int,
+    admin: admin_only_dependency,
+) -> ORJSONResponse:
+    """Queue a new portrait for a character whose portrait failed."""
     try:
         character = await read_record(session, Character, character_id)
-        if not character:
-            return JSONResponse(content="Character not found", status_code=404)
-
-        return JSONResponse(
-            content={
-                "character": character.model_dump(),
-            },
-            status_code=200,
+        assert isinstance(character, Character)
+        if character.image_status != "FAILED":
+            return ORJSONResponse(
+                content=f"Portrait is {character.image_status}", status_code=409
+            )
+        await update_record(
+            session,
+            Character,
+            character_id,
+            {"image_status": "PENDING", "image_generation_id": None},
         )
+        await portrait_jobs.schedule(character_id)
+        return ORJSONResponse(content="Portrait queued", status_code=202)
     except (DatabaseError, RecordNotFound, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
-    except Exception:
-        return JSONResponse(content="Unexpected error", status_code=500)
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
+
+
+def sse_event(event: dict[str, Any]) -> str:
+    return f"event: portrait\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("/character/{character_id}/portrait/events", response_model=None)
+async def portrait_progress(
+    session: db_dependency,
+    character_id: int,
+    user: valid_user_dependency,
+    request: Request,
+) -> StreamingResponse | ORJSONResponse:
+    """
+    Server-sent events with the progress of a character's portrait. The
+    stream ends once the portrait is READY or FAILED.
+    """
+    # Subscribe before reading the status, so no event can slip in between
+    queue = portrait_events.subscribe(character_id)
+    try:
+        character = await read_record(session, Character, character_id)
+        assert isinstance(character, Character)
+    except (DatabaseError, RecordNotFound, TableNotFound) as e:
+        portrait_events.unsubscribe(character_id, queue)
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
+
+    current = {
+        "character_id": character_id,
+        "status": character.image_status,
+        "image_url": character.image_url,
+    }
+
+    async def stream() -> AsyncGenerator[str, None]:
+        try:
+            yield sse_event(current)
+            if current["status"] in FINAL_STATUSES:
+                return
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    # Comment line, keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event(event)
+                if event["status"] in FINAL_STATUSES:
+                    return
+        finally:
+            portrait_events.unsubscribe(character_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.patch("/character/{character_id}")
@@ -147,20 +317,20 @@ async def update_character(
     character_id: int,
     updates: CharacterPatchData,
     admin: admin_only_dependency,
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         updated = await update_record(
             session, Character, character_id, updates.model_dump(exclude_unset=True)
         )
         if not updated:
-            return JSONResponse(content="Character not found", status_code=404)
+            return ORJSONResponse(content="Character not found", status_code=404)
 
-        return JSONResponse(content=updated.model_dump(), status_code=200)
+        return ORJSONResponse(content=updated.model_dump(), status_code=200)
 
     except (DatabaseError, RecordNotFound, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
     except Exception:
-        return JSONResponse(content="Unexpected error", status_code=500)
+        return ORJSONResponse(content="Unexpected error", status_code=500)
 
 
 @router.delete("/character/{character_id}")
@@ -168,12 +338,12 @@ async def delete_character(
     session: db_dependency,
     character_id: int,
     admin: admin_only_dependency,
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         await delete_record(session, Character, character_id)
 
-        return JSONResponse(content="Character deleted successfully", status_code=200)
+        return ORJSONResponse(content="Character deleted successfully", status_code=200)
     except (DatabaseError, RecordNotFound, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
     except Exception:
-        return JSONResponse(content="Unexpected error", status_code=500)
+        return ORJSONResponse(content="Unexpected error", status_code=500)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from backend.services.auth import admin_only_dependency
+from backend.services.export import export_conversations
+from backend.services.message_writer import message_writer
+
+router = APIRouter()
+
+
+@router.get("/export/conversations")
+async def export_conversations_ndjson(
+    admin: admin_only_dependency, gzip: bool = False
+) -> StreamingResponse:
+    """
+    Stream every thread and message as NDJSON, gzip encoded with ?gzip=true.
+    """
+    # Include messages still waiting in the write-behind buffer
+    await message_writer.flush()
+
+    headers = {"Content-Disposition": 'attachment; filename="conversations.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_conversations(compress=gzip),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
@@ -0,0 +1,80 @@
+import hmac
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Request
+from fastapi.responses import ORJSONResponse
+
+from backend.config.settings import settings_dependency
+from backend.config.session import db_dependency
+from backend.config.clients import leonardo_dep
+from backend.services.leonardo.leon_models import WebhookPayload
+from backend.services.portraits import mirror_portrait
+from backend.services.portrait_jobs import portrait_events
+from backend.db.db_crud import read_one_by_field, update_record
+from backend.db.db_models import Character
+from backend.db.db_excepts import RecordNotFound
+
+router = APIRouter()
+
+
+@router.post("/leonardo/webhook")
+async def leonardo_webhook(
+    payload: WebhookPayload,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: db_dependency,
+    settings: settings_dependency,
+    image_client: leonardo_dep,
+) -> ORJSONResponse:
+    """
+    Receive Leonardo's generation-complete callback, store the portrait URL on
+    the matching character and wake whoever is waiting for that generation.
+    """
+    if not settings.leonardo_webhook_key:
+        return ORJSONResponse(content="Webhook not enabled", status_code=404)
+
+    expected = f"Bearer {settings.leonardo_webhook_key}"
+    received = request.headers.get("authorization", "")
+    if not hmac.compare_digest(received.encode(), expected.encode()):
+        return ORJSONResponse(content="Invalid webhook key", status_code=401)
+
+    generation = payload.data.object
+    image_url: str | None = None
+    if generation.status == "COMPLETE" and generation.images:
+        image_url = generation.images[0].url
+
+    character_id: int | None = None
+    if image_url:
+        try:
+            character = await read_one_by_field(
+                session, Character, "image_generation_id", generation.id
+            )
+        except RecordNotFound:
+            character = None
+        if character is not None and isinstance(character.id, int):
+            character_id = character.id
+            await update_record(
+                session,
+                Character,
+                character_id,
+                {"image_url": image_url, "image_status": "READY"},
+            )
+
+    resolved = image_client.poller.resolve(generation.id, image_url)
+    if character_id is not None and image_url and not resolved:
+        # Nobody is waiting to mirror it, which happens after restarts
+        background_tasks.add_task(mirror_portrait, character_id, image_url)
+        portrait_events.publish(character_id, "READY", image_url)
+    logging.info(
+        f"Leonardo webhook for generation {generation.id}: {generation.status}"
+    )
+
+    # Always acknowledge, unknown generations are not worth a redelivery
+    return ORJSONResponse(
+        content={
+            "generation_id": generation.id,
+            "character_id": character_id,
+            "resolved": resolved,
+        },
+        status_code=200,
+    )
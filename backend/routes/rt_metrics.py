@@ -0,0 +1,50 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+from backend.config.clients import leonardo_client
+from backend.db.met_index import met_index
+from backend.services.auth import admin_only_dependency, user_cache
+from backend.services.character_pool import character_pool
+from backend.services.job_queue import job_queue
+from backend.services.message_writer import message_writer
+from backend.services.portrait_jobs import portrait_events
+from backend.utils.cache import response_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics/character-pool")
+async def get_character_pool_metrics(admin: admin_only_dependency) -> ORJSONResponse:
+    return ORJSONResponse(content=character_pool.stats(), status_code=200)
+
+
+@router.get("/metrics/leonardo-poller")
+async def get_leonardo_poller_metrics(admin: admin_only_dependency) -> ORJSONResponse:
+    return ORJSONResponse(content=leonardo_client.poller.stats(), status_code=200)
+
+
+@router.get("/metrics/jobs")
+async def get_job_metrics(admin: admin_only_dependency) -> ORJSONResponse:
+    stats = await job_queue.stats()
+    stats["portrait_subscribers"] = portrait_events.subscriber_count()
+    return ORJSONResponse(content=stats, status_code=200)
+
+
+@router.get("/metrics/message-writer")
+async def get_message_writer_metrics(admin: admin_only_dependency) -> ORJSONResponse:
+    return ORJSONResponse(content=message_writer.stats(), status_code=200)
+
+
+@router.get("/metrics/met-index")
+async def get_met_index_metrics(admin: admin_only_dependency) -> ORJSONResponse:
+    return ORJSONResponse(content=met_index.stats(), status_code=200)
+
+
+@router.get("/metrics/response-cache")
+async def get_response_cache_metrics(admin: admin_only_dependency) -> ORJSONResponse:
+    return ORJSONResponse(content=response_cache.stats(), status_code=200)
+
+
+@router.get("/metrics/user-cache")
+async def get_user_cache_metrics(admin: admin_only_dependency) -> ORJSONResponse:
+    return ORJSONResponse(content=user_cache.stats(), status_code=200)
@@ -0,0 +1,36 @@
+import os
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse
+
+from backend.services.portraits import portrait_store
+from backend.utils.conditional import etag_matches
+from backend.utils.images import PORTRAIT_SIZES, PORTRAIT_FORMATS
+
+router = APIRouter()
+
+MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+# Variant URLs carry the content digest, so a cached copy never goes stale
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/portraits/{character_id}/{variant}.{extension}", response_model=None)
+async def get_portrait(
+    character_id: int, variant: str, extension: str, request: Request
+) -> Response:
+    """Serve a locally mirrored portrait variant with a strong ETag."""
+    if variant not in PORTRAIT_SIZES or extension not in PORTRAIT_FORMATS:
+        return ORJSONResponse(content="Unknown portrait variant", status_code=404)
+
+    version = portrait_store.version(character_id)
+    path = portrait_store.variant_path(character_id, variant, extension)
+    if version is None or not os.path.exists(path):
+        return ORJSONResponse(content="Portrait not found", status_code=404)
+
+    etag = f'"{version}-{variant}-{extension}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path, media_type=MEDIA_TYPES[extension], headers=headers)
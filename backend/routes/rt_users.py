@@ -1,6 +1,6 @@
 import time
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 from backend.config.settings import settings_dependency
 from backend.config.session import db_dependency
 from backend.schemas import MagicLinkRequest, UserPatchData
@@ -10,26 +10,39 @@ from backend.services.auth import (
     create_access_token,
     admin_only_dependency,
     valid_user_dependency,
+    token_user_id,
+    user_cache,
 )
 from backend.db.db_crud import (
     create_record,
     read_record,
     read_one_by_field,
-    read_all,
+    read_page,
+    count_records,
     update_record,
+    LIST_PAGE_SIZE,
+    MAX_LIST_PAGE_SIZE,
 )
 from backend.db.db_models import User
-from backend.db.db_excepts import DatabaseError, TableNotFound, RecordNotFound
+from backend.db.db_excepts import (
+    DatabaseError,
+    TableNotFound,
+    RecordNotFound,
+    UnknownField,
+)
 
 router = APIRouter()
 
+# Never part of a user listing
+HIDDEN_USER_FIELDS = ("login_token",)
+
 
 @router.post("/user/login")
 async def register_or_login(
     payload: MagicLinkRequest,
     session: db_dependency,
     settings: settings_dependency,
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         try:
             user = await read_one_by_field(session, User, "email", payload.email)
@@ -51,7 +64,7 @@ async def register_or_login(
             if not user:
                 raise HTTPException(status_code=500, detail="Failed to storenew user.")
             await send_magic_link(settings, user.email, token)
-            return JSONResponse(
+            return ORJSONResponse(
                 content=f"User {user.username} registered", status_code=201
             )
         else:
@@ -60,18 +73,18 @@ async def register_or_login(
             user.token_expiry = expiry
             await session.commit()
             await send_magic_link(settings, user.email, token)
-            return JSONResponse(
+            return ORJSONResponse(
                 content=f"Login link sent to {user.email}", status_code=200
             )
 
     except Exception as e:
-        return JSONResponse(content=f"Unexpected error: {e}", status_code=500)
+        return ORJSONResponse(content=f"Unexpected error: {e}", status_code=500)
 
 
 @router.get("/user/verify")
 async def verify_magic_link(
     token: str, session: db_dependency, settings: settings_dependency
-) -> JSONResponse:
+) -> ORJSONResponse:
     user = await read_one_by_field(session, User, "login_token", token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token.")
@@ -85,7 +98,7 @@ async def verify_magic_link(
         expires_in_seconds=60 * 60 * 24 * 7,
     )
 
-    response = JSONResponse({"message": "Login verified"})
+    response = ORJSONResponse({"message": "Login verified"})
     response.set_cookie(
         key="access_token",
         value=access_token,
@@ -99,8 +112,8 @@ async def verify_magic_link(
 
 
 @router.get("/user/me")
-async def get_current_user(user: valid_user_dependency) -> JSONResponse:
-    return JSONResponse(
+async def get_current_user(user: valid_user_dependency) -> ORJSONResponse:
+    return ORJSONResponse(
         content={
             "id": user.id,
             "username": user.username,
@@ -111,8 +124,13 @@ async def get_current_user(user: valid_user_dependency) -> JSONResponse:
 
 
 @router.get("/user/logout")
-async def logout_user() -> JSONResponse:
-    response = JSONResponse(content={"message": "Logged out"}, status_code=200)
+async def logout_user(
+    request: Request, settings: settings_dependency
+) -> ORJSONResponse:
+    user_id = token_user_id(request.cookies.get("access_token"), settings.secret_key)
+    if user_id is not None:
+        user_cache.invalidate(user_id)
+    response = ORJSONResponse(content={"message": "Logged out"}, status_code=200)
     response.delete_cookie(key="access_token", path="/")
     return response
 
@@ -122,7 +140,7 @@ async def add_user(
     user: User,
     session: db_dependency,
     admin: admin_only_dependency,
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         new_user = User(
             username=user.username,
@@ -135,38 +153,69 @@ async def add_user(
         stored_user = await create_record(session, new_user)
         if not stored_user:
             raise HTTPException(status_code=500, detail="Failed to store new user.")
-        return JSONResponse(
+        return ORJSONResponse(
             content=f"User {stored_user.username} created.", status_code=201
         )
     except Exception as e:
-        return JSONResponse(content=f"Unexpected error: {e}", status_code=500)
+        return ORJSONResponse(content=f"Unexpected error: {e}", status_code=500)
 
 
 @router.get("/user")
-async def get_all_users(session: db_dependency) -> JSONResponse:
+async def get_all_users(
+    session: db_dependency,
+    admin: admin_only_dependency,
+    limit: int = Query(default=LIST_PAGE_SIZE, ge=1, le=MAX_LIST_PAGE_SIZE),
+    after: int | None = None,
+    fields: str | None = None,
+) -> ORJSONResponse:
+    """
+    A page of users in id order, paged and projected like GET /character.
+    Login tokens are never listed.
+    """
     try:
-        users = await read_all(session, User)
-        if not users:
-            return JSONResponse(content="No users found.", status_code=404)
-        result = {"user": [user.model_dump() for user in users]}
-        return JSONResponse(content=result, status_code=200)
-    except (DatabaseError, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
+        users, more = await read_page(
+            session,
+            User,
+            limit,
+            after=after,
+            fields=fields.split(",") if fields else None,
+            hidden=HIDDEN_USER_FIELDS,
+        )
+        if not users and after is None:
+            return ORJSONResponse(content="No users found.", status_code=404)
+        headers = {}
+        if more:
+            headers["X-Next-Cursor"] = str(users[-1]["id"])
+        if after is None:
+            headers["X-Total-Count"] = str(await count_records(session, User))
+        return ORJSONResponse(content={"user": users}, status_code=200, headers=headers)
+    except (DatabaseError, TableNotFound, UnknownField) as e:
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
     except Exception as e:
-        return JSONResponse(content=f"Unexpected error: {e}", status_code=500)
+        return ORJSONResponse(content=f"Unexpected error: {e}", status_code=500)
 
 
 @router.get("/user/{user_id}")
-async def get_user(session: db_dependency, user_id: int) -> JSONResponse:
+async def get_user(
+    session: db_dependency, user_id: int, current_user: valid_user_dependency
+) -> ORJSONResponse:
+    """A user's own record, or anyone's for an admin. Never the login token."""
+    if current_user.id != user_id and current_user.role != "admin":
+        raise HTTPException(
+            status_code=403, detail="You don't have permission to view this user"
+        )
     try:
         user = await read_record(session, User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found.")
-        return JSONResponse(content=user.model_dump(), status_code=200)
+        return ORJSONResponse(
+            content=user.model_dump(exclude=set(HIDDEN_USER_FIELDS)),
+            status_code=200,
+        )
     except (DatabaseError, RecordNotFound, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
     except Exception:
-        return JSONResponse(content="Unexpected error", status_code=500)
+        return ORJSONResponse(content="Unexpected error", status_code=500)
 
 
 @router.patch("/user/{user_id}")
@@ -175,27 +224,33 @@ async def update_user(
     session: db_dependency,
     updates: UserPatchData,
     admin: admin_only_dependency,
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         updated_user = await update_record(
             session, User, user_id, updates.model_dump(exclude_unset=True)
         )
+        user_cache.invalidate(user_id)
+        assert updated_user is not None
 
-        return JSONResponse(content=updated_user, status_code=200)
+        return ORJSONResponse(
+            content=updated_user.model_dump(exclude=set(HIDDEN_USER_FIELDS)),
+            status_code=200,
+        )
     except (DatabaseError, RecordNotFound, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
     except Exception:
-        return JSONResponse(content="Unexpected error", status_code=500)
+        return ORJSONResponse(content="Unexpected error", status_code=500)
 
 
-@router.delete("user/{user_id}")
+@router.delete("/user/{user_id}")
 async def delete_user(
     session: db_dependency, user_id: int, admin: admin_only_dependency
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         await update_record(session, User, user_id, {"status": "deleted"})
-        return JSONResponse(content="User deleted", status_code=200)
+        user_cache.invalidate(user_id)
+        return ORJSONResponse(content="User deleted", status_code=200)
     except (DatabaseError, RecordNotFound, TableNotFound) as e:
-        return JSONResponse(content=e.detail, status_code=e.status_code)
+        return ORJSONResponse(content=e.detail, status_code=e.status_code)
     except Exception:
-        return JSONResponse(content="Unexpected error", status_code=500)
+        return ORJSONResponse(content="Unexpected error", status_code=500)
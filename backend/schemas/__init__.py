@@ -1,4 +1,14 @@
-from backend.schemas.character import NewCharacter, CharacterPatchData
+from backend.schemas.character import (
+    NewCharacter,
+    NewCharacterBatch,
+    CharacterPatchData,
+)
 from backend.schemas.user import UserPatchData, MagicLinkRequest
 
-__all__ = ["NewCharacter", "CharacterPatchData", "UserPatchData", "MagicLinkRequest"]
+__all__ = [
+    "NewCharacter",
+    "NewCharacterBatch",
+    "CharacterPatchData",
+    "UserPatchData",
+    "MagicLinkRequest",
+]
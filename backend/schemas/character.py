@@ -1,3 +1,4 @@
+from typing import List
 from pydantic import BaseModel
 
 
@@ -13,6 +14,10 @@ class NewCharacter(BaseModel):
     human_relationship: str
 
 
+class NewCharacterBatch(BaseModel):
+    characters: List[NewCharacter]
+
+
 class CharacterPatchData(BaseModel):
     image_prompt: str | None = None
     image_url: str | None = None
@@ -1,8 +1,10 @@
 import uuid
 import time
 import jwt
+from collections import OrderedDict
 from typing import (
     Annotated,
+    Dict,
     Tuple,
     Any,
 )
@@ -12,7 +14,7 @@ from fastapi import (
     status,
     Request,
 )
-from backend.config.settings import settings_dependency
+from backend.config.settings import get_settings, settings_dependency
 from backend.config.session import db_dependency
 from backend.db.db_models import User
 from backend.db.db_crud import read_record
@@ -56,6 +58,85 @@ def create_access_token(
     return jwt.encode(to_encode, secret_key, algorithm="HS256")  # type: ignore
 
 
+class UserCache:
+    """
+    Recently validated users by id, so authenticated requests skip the users
+    table. Entries live for `ttl` seconds, at most `max_size` are kept (least
+    recently used out first), and the user routes drop a user's entry as soon
+    as the user is changed, deleted or logs out.
+
+    Entries are snapshots: every hit builds a new User that no session owns,
+    without the login token fields, which only the login flow reads.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users: OrderedDict[int, Tuple[Dict[str, Any], float]] = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, user_id: int) -> User | None:
+        entry = self._users.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            self._users.pop(user_id, None)
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return User(**entry[0])
+
+    def put(self, user: User) -> None:
+        if self.max_size <= 0 or user.id is None:
+            return
+        fields = user.model_dump(exclude={"login_token", "token_expiry"})
+        self._users[user.id] = (fields, time.monotonic() + self.ttl)
+        self._users.move_to_end(user.id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        if self._users.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            # Every hit is a users table read that didn't happen
+            "db_reads_saved": self.hits,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+settings = get_settings()
+user_cache = UserCache(settings.user_cache_ttl, settings.user_cache_max_size)
+
+
+def token_user_id(token: str | None, secret_key: str) -> int | None:
+    """The user id in an access token, or None if it isn't a valid one."""
+    try:
+        payload = jwt.decode(token, secret_key, algorithms=["HS256"])  # type: ignore
+    except jwt.InvalidTokenError:
+        return None
+    user_id = payload.get("sub")
+    return int(user_id) if str(user_id).isdigit() else None
+
+
 async def get_valid_user(
     session: db_dependency,
     settings: settings_dependency,
@@ -76,9 +157,13 @@ async def get_valid_user(
             raise credential_exception
         user_id = int(user_id)
 
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
         user = await read_record(session, User, user_id)
         if user is None:
             raise credential_exception
+        user_cache.put(user)
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List
+
+from backend.config.settings import get_settings
+from backend.config.session import get_async_session
+from backend.db.db_models import Character, User
+from backend.db.db_crud import (
+    read_one_by_field,
+    store_character_batch,
+    count_unclaimed_characters,
+    count_incoming_characters,
+)
+from backend.services.openai.character import generate_character_batch
+from backend.services.job_queue import job_queue
+from backend.services.portrait_jobs import portrait_jobs
+
+
+async def run_character_batch(payload: dict[str, Any]) -> None:
+    """
+    Job handler for character batches, queued by the pool and by
+    /character/batch.
+
+    Profiles come from a single OpenAI call and are stored in one transaction,
+    without threads, together with a portrait job for each character and a
+    checkpoint of the stored ids in this job's payload. A retry after that
+    commit finds the ids and stops, so a batch is never stored twice.
+    """
+    if "stored" in payload:
+        return
+
+    new_characters = await generate_character_batch(payload["count"])
+
+    async with get_async_session() as session:
+        owner_id = payload.get("owner_id")
+        if owner_id is None:
+            # Pool characters belong to the admin account created by load_admin
+            admin = await read_one_by_field(session, User, "username", "admin")
+            assert admin is not None and isinstance(admin.id, int)
+            owner_id = admin.id
+
+        async def on_stored(characters: List[Character]) -> None:
+            ids = [character.id for character in characters]
+            for character_id in ids:
+                assert isinstance(character_id, int)
+                await portrait_jobs.schedule(character_id, session=session)
+            await job_queue.checkpoint(session, {**payload, "stored": ids})
+
+        stored = await store_character_batch(
+            session, new_characters, owner_id, on_stored=on_stored
+        )
+    logging.info(f"Stored batch of {len(stored)} characters")
+
+
+job_queue.register("character_batch", run_character_batch)
+
+
+async def count_pooled_characters() -> tuple[int, int]:
+    """Characters in stock, and characters on their way into it."""
+    async with get_async_session() as session:
+        stock = await count_unclaimed_characters(session)
+        incoming = await count_incoming_characters(session)
+    return stock, incoming
+
+
+async def enqueue_character_batch(count: int) -> None:
+    await job_queue.enqueue("character_batch", {"count": count})
+
+
+class CharacterPool:
+    """
+    Keeps a number of fully generated characters in the database that no user
+    has met yet, so chat_builder finds one instead of generating inline.
+
+    The stock is durable: it lives in the database, and refills are
+    character_batch jobs of up to `batch_size` characters whose portraits are
+    made by portrait jobs. Batches and portraits still in progress count
+    towards the target, so a restart or suspend resumes the queued work
+    instead of ordering more.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        interval: float,
+        batch_size: int = 1,
+        counter: Callable[[], Awaitable[tuple[int, int]]] = count_pooled_characters,
+        enqueue: Callable[[int], Awaitable[None]] = enqueue_character_batch,
+    ) -> None:
+        self.size = size
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self._counter = counter
+        self._enqueue = enqueue
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+        # Metrics
+        self.depth = 0
+        self.incoming = 0
+        self.batches = 0
+        self.failures = 0
+        self.stockouts = 0
+
+    def start(self) -> None:
+        if self.size <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Character pool started (target {self.size})")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def notify(self) -> None:
+        """Ask the replenisher to re-check the stock level right away."""
+        self._wake.set()
+
+    def record_stockout(self) -> None:
+        """A caller needed a character and the pool had none to offer."""
+        self.stockouts += 1
+        self.notify()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "target": self.size,
+            "depth": self.depth,
+            "incoming": self.incoming,
+            "batch_size": self.batch_size,
+            "batches_queued": self.batches,
+            "failures": self.failures,
+            "stockouts": self.stockouts,
+        }
+
+    async def fill(self) -> None:
+        """Queue enough batches to bring the stock back up to its target."""
+        self.depth, self.incoming = await self._counter()
+        deficit = self.size - self.depth - self.incoming
+        while deficit > 0:
+            count = min(deficit, self.batch_size)
+            try:
+                await self._enqueue(count)
+            except Exception as e:
+                self.failures += 1
+                logging.error(f"Character pool could not queue a batch: {e}")
+                return
+            self.batches += 1
+            self.incoming += count
+            deficit -= count
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self.fill()
+            except Exception as e:
+                logging.error(f"Character pool refill check failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+settings = get_settings()
+character_pool = CharacterPool(
+    settings.character_pool_size,
+    settings.character_pool_interval,
+    settings.character_pool_batch_size,
+)
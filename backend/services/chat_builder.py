@@ -1,24 +1,27 @@
-import time
-
 from backend.config.session import db_dependency
-from backend.config.clients import openai_dep, leonardo_dep
+from backend.config.settings import get_settings
+from backend.config.clients import openai_dep
 from backend.services.auth import valid_user_dependency
 
-from backend.db.db_models import Thread, Character
+from backend.db.db_models import Thread
+from backend.db.met_index import met_index
 from backend.db.db_crud import (
     fetch_unmet_character,
+    fetch_thread,
+    mark_character_served,
     store_new_character,
-    create_record,
-    update_record,
 )
-from backend.services.openai.character import generate_character_async
-from backend.services.leonardo.img_request import generate_portrait
+from backend.services.openai.character import generate_character
+from backend.services.portrait_jobs import portrait_jobs
+from backend.services.character_pool import character_pool
+
+
+settings = get_settings()
 
 
 async def chat_builder(
     session: db_dependency,
     user: valid_user_dependency,
-    image_client: leonardo_dep,
     text_client: openai_dep,
 ) -> Thread | None:
     """
@@ -32,48 +35,37 @@ async def chat_builder(
         user: the user object already validated.
     """
     assert isinstance(user.id, int)
-    thread: Thread
     # Is there a character the user has not met in the database?
 
-    unmet_character = await fetch_unmet_character(session, user.id)
+    character = await fetch_unmet_character(
+        session, user.id, settings.unmet_character_order, met_index
+    )
 
     # If there is no unmet character, generate a new one
-    if not unmet_character:
+    if not character:
+        # The warm pool ran dry, so this request has to wait for generation
+        character_pool.record_stockout()
         # Generate a complete new character
-        new_character = await generate_character_async(text_client)
+        new_character = await generate_character(text_client)
         assert new_character is not None
-        # Store generated character in db
-        stored_character = await store_new_character(session, new_character, user.id)
-        assert stored_character is not None
-        # Create the character portrait
-        portrait_url = await generate_portrait(
-            image_client, stored_character.image_prompt
-        )
-        # Store the portrait URL in the database
-        assert portrait_url is not None and isinstance(portrait_url, str)
-        assert stored_character.id is not None and isinstance(stored_character.id, int)
-        await update_record(
-            session, Character, stored_character.id, {"image_url": portrait_url}
-        )
+        # Store generated character in db, along with the user's thread
+        character = await store_new_character(session, new_character, user.id)
+        assert character is not None
+        # Create the character portrait in the background, the chat can start
+        # right away and the portrait is pushed to the client once ready.
+        # The job is stored from a session of its own, so this one must hold
+        # no uncommitted write here (store_new_character committed)
+        assert character.id is not None and isinstance(character.id, int)
+        await portrait_jobs.schedule(character.id)
 
-        # Create a new thread beteen the user and the generated character
-        assert isinstance(stored_character.id, int)
-        thread = Thread(
-            user_id=user.id,
-            character_id=stored_character.id,
-            created_at=int(time.time()),
-        )
-    else:
-        assert unmet_character is not None
-        assert isinstance(unmet_character.id, int)
+    assert isinstance(character.id, int)
+    # Served now, committed along with the thread
+    await mark_character_served(session, character)
 
-        thread = Thread(
-            user_id=user.id,
-            character_id=unmet_character.id,
-            created_at=int(time.time()),
-        )
+    # Get or create the thread between the user and the character
+    thread = await fetch_thread(session, user.id, character.id)
 
-    # Store the thread in db
-    stored_thread = await create_record(session, thread)
+    # The character may have come from the pool's stock, so let it top up
+    character_pool.notify()
 
-    return stored_thread
+    return thread
@@ -0,0 +1,95 @@
+from typing import AsyncGenerator
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.services.openai.chat import ai_response
+from backend.services.message_writer import MessageWriter, message_writer
+from backend.db.db_models import User, Character, Thread
+from backend.db.data_mappers import message_mapper
+from backend.db.db_crud import read_record, read_field
+
+
+class ConversationContext(BaseModel):
+    """
+    Everything a chat turn needs that does not change while a socket is open.
+
+    Loaded once when the websocket is accepted. The last OpenAI response id is
+    kept up to date in memory after each completed reply, so a turn only has
+    to write its two messages.
+    """
+
+    thread_id: int
+    username: str
+    character: Character
+    last_response_id: str | None = None
+
+
+async def load_conversation(
+    session: AsyncSession, thread_id: int
+) -> ConversationContext:
+    thread = await read_record(session, Thread, thread_id)
+    assert isinstance(thread, Thread), "No chat thread found"
+    assert isinstance(thread.id, int), "Thread id is not an int"
+
+    username = await read_field(session, User, thread.user_id, "username")
+    assert isinstance(username, str)
+    character = await read_record(session, Character, thread.character_id)
+    assert isinstance(character, Character)
+
+    return ConversationContext(
+        thread_id=thread.id,
+        username=username,
+        character=character,
+        last_response_id=thread.last_response_id,
+    )
+
+
+async def conversation_turn(
+    client: AsyncOpenAI,
+    context: ConversationContext,
+    user_message: str,
+    writer: MessageWriter = message_writer,
+) -> AsyncGenerator[str, None]:
+    """
+    Stream the character's reply chunk by chunk. Both messages of the turn go
+    to the write-behind writer, which commits them together with other
+    sockets' messages.
+    """
+    writer.write(message_mapper(context.thread_id, "user", user_message))
+
+    response = await ai_response(
+        client,
+        context.username,
+        context.character,
+        user_message,
+        context.last_response_id,
+    )
+
+    # Capture the final response details
+    openai_response_id = None
+    content: str = ""
+    role: str = ""
+    created_at: int = 0
+
+    async for chunk in response:
+        if chunk.type == "response.output_text.delta":
+            yield chunk.delta
+        elif chunk.type == "response.completed":
+            openai_response_id = chunk.response.id
+            content = chunk.response.output[0].content[0].text
+            role = chunk.response.output[0].role
+            created_at = chunk.response.created_at
+
+    # After the stream completes, store the assistant's response if available
+    if openai_response_id:
+        writer.write(
+            message_mapper(
+                context.thread_id,
+                role,
+                content,
+                openai_response_id=openai_response_id,
+                created_at=created_at,
+            )
+        )
+        context.last_response_id = openai_response_id
@@ -0,0 +1,86 @@
+import json
+import zlib
+from contextlib import AbstractAsyncContextManager
+from typing import Any, AsyncGenerator, Callable, Dict, List
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.session import get_async_session
+from backend.db.db_crud import stream_conversations
+
+# Bytes of NDJSON gathered before a chunk goes out
+CHUNK_SIZE = 64 * 1024
+
+
+async def export_conversations(
+    compress: bool = False,
+    session_factory: Callable[
+        [], AbstractAsyncContextManager[AsyncSession]
+    ] = get_async_session,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Every thread and its messages as NDJSON, one record per line:
+
+        {"type": "thread", "id": 1, "user_id": 1, "character_id": 2, ...}
+        {"type": "message", "id": 10, "thread_id": 1, "role": "user", ...}
+
+    Each thread's line comes right before its messages. Rows are read through
+    a server-side cursor and sent in chunks of about CHUNK_SIZE bytes, gzipped
+    as they go with `compress`, so memory use does not depend on how much
+    there is to export.
+
+    The generator opens its own session: a response body is streamed after
+    the request's session is closed.
+    """
+    gzip = zlib.compressobj(wbits=31) if compress else None
+    lines: List[str] = []
+    size = 0
+    thread_id = None
+
+    def record(values: Dict[str, Any]) -> None:
+        nonlocal size
+        line = json.dumps(values, ensure_ascii=False) + "\n"
+        lines.append(line)
+        size += len(line)
+
+    def chunk() -> bytes:
+        nonlocal lines, size
+        data = "".join(lines).encode()
+        lines, size = [], 0
+        return gzip.compress(data) if gzip else data
+
+    async with session_factory() as session:
+        async for row in stream_conversations(session):
+            if row["thread_id"] != thread_id:
+                thread_id = row["thread_id"]
+                record(
+                    {
+                        "type": "thread",
+                        "id": thread_id,
+                        "user_id": row["user_id"],
+                        "character_id": row["character_id"],
+                        "created_at": row["thread_created_at"],
+                    }
+                )
+            if row["message_id"] is not None:
+                record(
+                    {
+                        "type": "message",
+                        "id": row["message_id"],
+                        "thread_id": thread_id,
+                        "role": row["role"],
+                        "content": row["content"],
+                        "created_at": row["created_at"],
+                        "openai_response_id": row["openai_response_id"],
+                    }
+                )
+            if size >= CHUNK_SIZE:
+                data = chunk()
+                if data:
+                    yield data
+
+    data = chunk()
+    if gzip:
+        data += gzip.flush()
+    if data:
+        yield data
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from contextlib import AbstractAsyncContextManager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.settings import get_settings
+from backend.config.session import get_async_session
+from backend.db.db_models import Job
+from backend.db.db_crud import (
+    enqueue_job,
+    lease_job,
+    extend_job_lease,
+    finish_job,
+    release_job,
+    save_job_payload,
+    count_jobs_by_state,
+)
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[None]]
+FailureHandler = Callable[[dict[str, Any], str], Awaitable[None]]
+
+# Id of the job the current task is running a handler for
+current_job_id: ContextVar[int | None] = ContextVar("current_job_id", default=None)
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Runs background work stored in the Job table, so it survives suspends and
+    restarts: whatever was queued or running is picked up again on boot.
+
+    Workers lease one job at a time for `lease_seconds` and renew the lease
+    while the handler runs. A job whose worker vanished becomes visible again
+    once the lease expires. Failed attempts are retried with exponential
+    backoff until `max_attempts`, then the kind's failure handler is called.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        lease_seconds: float,
+        poll_interval: float,
+        max_attempts: int,
+        retry_delay: float,
+        session_factory: Callable[
+            [], AbstractAsyncContextManager[AsyncSession]
+        ] = get_async_session,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._session_factory = session_factory
+        self._handlers: dict[str, JobHandler] = {}
+        self._failure_handlers: dict[str, FailureHandler] = {}
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._running: set[asyncio.Task[None]] = set()
+
+        # Metrics
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def register(
+        self,
+        kind: str,
+        handler: JobHandler,
+        on_failure: FailureHandler | None = None,
+    ) -> None:
+        self._handlers[kind] = handler
+        if on_failure is not None:
+            self._failure_handlers[kind] = on_failure
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: dict[str, Any],
+        delay: float = 0.0,
+        max_attempts: int | None = None,
+        session: AsyncSession | None = None,
+    ) -> Job:
+        """
+        Store a job and wake the worker loop. Given a session, the job is only
+        added to it and stored when the caller commits.
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"No job handler registered for '{kind}'")
+        run_at = time.time() + delay
+        attempts = max_attempts or self.max_attempts
+        if session is not None:
+            job = await enqueue_job(
+                session, kind, json.dumps(payload), run_at, attempts, commit=False
+            )
+        else:
+            async with self._session_factory() as own_session:
+                job = await enqueue_job(
+                    own_session, kind, json.dumps(payload), run_at, attempts
+                )
+        self._wake.set()
+        return job
+
+    async def checkpoint(self, session: AsyncSession, payload: dict[str, Any]) -> None:
+        """
+        Record the running job's progress in its payload, committed with the
+        caller's transaction. A retry is handed this payload and can resume
+        instead of redoing work that was already stored.
+        """
+        job_id = current_job_id.get()
+        if job_id is None:
+            raise RuntimeError("checkpoint() called outside of a job handler")
+        if not await save_job_payload(
+            session, job_id, self.worker_id, json.dumps(payload)
+        ):
+            raise LeaseLost(f"Job {job_id} was leased by another worker")
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Job queue worker {self.worker_id} started")
+
+    async def stop(self) -> None:
+        # Interrupted jobs keep their lease and are picked up after it expires
+        tasks = list(self._running)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._running.clear()
+
+    async def stats(self) -> dict[str, Any]:
+        async with self._session_factory() as session:
+            states = await count_jobs_by_state(session)
+        return {
+            "worker": self.worker_id,
+            "running": len(self._running),
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "states": states,
+        }
+
+    async def run_once(self) -> bool:
+        """Lease and run a single job. Returns False when nothing was due."""
+        job = await self._lease()
+        if job is None:
+            return False
+        await self._execute(job)
+        return True
+
+    async def _lease(self) -> Job | None:
+        async with self._session_factory() as session:
+            return await lease_job(
+                session, self.worker_id, time.time(), self.lease_seconds
+            )
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                while len(self._running) < self.concurrency:
+                    job = await self._lease()
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._execute(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._on_done)
+            except Exception as e:
+                logging.error(f"Job queue lease failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_done(self, task: asyncio.Task[None]) -> None:
+        self._running.discard(task)
+        # A slot freed up, look for more work
+        self._wake.set()
+
+    async def _execute(self, job: Job) -> None:
+        assert isinstance(job.id, int)
+        payload = json.loads(job.payload)
+        handler = self._handlers.get(job.kind)
+
+        error: str | None = None
+        if handler is None:
+            error = f"No job handler registered for '{job.kind}'"
+        elif job.attempts > job.max_attempts:
+            # Leased again after its last attempt lost the lease
+            error = job.last_error or "Lease expired on the last attempt"
+        else:
+            heartbeat = asyncio.create_task(self._heartbeat(job.id))
+            token = current_job_id.set(job.id)
+            try:
+                await handler(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logging.error(traceback.format_exc())
+            finally:
+                current_job_id.reset(token)
+                heartbeat.cancel()
+
+        async with self._session_factory() as session:
+            if error is None:
+                await finish_job(session, job.id)
+                self.completed += 1
+                return
+
+            if handler is not None and job.attempts < job.max_attempts:
+                delay = self.retry_delay * 2 ** (job.attempts - 1)
+                await release_job(session, job.id, error, time.time() + delay)
+                self.retried += 1
+                logging.warning(f"Job {job.id} ({job.kind}) retrying in {delay}s")
+                return
+
+            await release_job(session, job.id, error, None)
+            self.failed += 1
+            logging.error(f"Job {job.id} ({job.kind}) failed: {error}")
+
+        on_failure = self._failure_handlers.get(job.kind)
+        if on_failure is not None:
+            await on_failure(payload, error)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with self._session_factory() as session:
+                    await extend_job_lease(
+                        session,
+                        job_id,
+                        self.worker_id,
+                        time.time() + self.lease_seconds,
+                    )
+            except Exception as e:
+                logging.error(f"Failed to extend lease of job {job_id}: {e}")
+
+
+settings = get_settings()
+job_queue = JobQueue(
+    settings.job_concurrency,
+    settings.job_lease_seconds,
+    settings.job_poll_interval,
+    settings.job_max_attempts,
+    settings.job_retry_delay,
+)
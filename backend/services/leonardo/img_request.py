@@ -1,15 +1,56 @@
 import logging
 from backend.config.clients import LeonardoClient
+from backend.config.session import get_async_session
+from backend.db.db_crud import update_record
+from backend.db.db_models import Character
+from backend.services.portraits import mirror_portrait
 
 
-async def generate_portrait(client: LeonardoClient, prompt: str) -> str | None:
+async def generate_portrait(
+    client: LeonardoClient,
+    prompt: str,
+    character_id: int | None = None,
+    generation_id: str | None = None,
+) -> str | None:
+    """
+    Generate a portrait and wait for its URL, delivered by Leonardo's webhook
+    or, as a fallback, by the shared poller.
 
+    When a character_id is given, the generation id is recorded on the
+    character so the webhook can store the URL even if nobody is waiting
+    anymore, and the URL is stored as soon as it is known. The portrait is
+    then mirrored locally and the local URL returned instead.
+
+    Passing the generation_id of an earlier request resumes waiting for it
+    instead of paying for a new image.
+    """
     try:
-        image_gen = await client.async_generate_image(prompt=prompt)
-        gen_id = await client.get_gen_id(image_gen)
-        image_url = await client.get_img_url(gen_id, 10, 1.0)
+        if generation_id is not None:
+            gen_id = generation_id
+        else:
+            image_gen = await client.async_generate_image(prompt=prompt)
+            gen_id = await client.get_gen_id(image_gen)
+
+        if character_id is not None and generation_id is None:
+            async with get_async_session() as session:
+                await update_record(
+                    session, Character, character_id, {"image_generation_id": gen_id}
+                )
+
+        image_url = await client.get_img_url(gen_id)
 
         assert isinstance(image_url, str), "Image URL should be a string"
+
+        if character_id is not None:
+            async with get_async_session() as session:
+                await update_record(
+                    session,
+                    Character,
+                    character_id,
+                    {"image_url": image_url, "image_status": "READY"},
+                )
+            return await mirror_portrait(character_id, image_url)
+
         return image_url
     except Exception as e:
         logging.error(f"Error generating portrait: {e}")
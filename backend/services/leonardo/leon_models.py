@@ -38,3 +38,23 @@ class GenerationByPk(BaseModel):
 
 class GenerationInfo(BaseModel):
     generations_by_pk: GenerationByPk
+
+
+# Generation complete webhook callback
+class WebhookImage(BaseModel):
+    url: str
+
+
+class WebhookGeneration(BaseModel):
+    id: str
+    status: str
+    images: List[WebhookImage] = []
+
+
+class WebhookData(BaseModel):
+    object: WebhookGeneration
+
+
+class WebhookPayload(BaseModel):
+    type: str
+    data: WebhookData
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from backend.services.leonardo.leon_models import GenerationInfo
+
+
+class PendingGeneration:
+    def __init__(
+        self,
+        future: "asyncio.Future[str | None]",
+        registered: float,
+        delay: float,
+        timeout: float,
+    ) -> None:
+        self.future = future
+        self.registered = registered
+        self.delay = delay
+        self.due = registered + delay
+        self.deadline = registered + timeout
+
+
+class GenerationPoller:
+    """
+    Tracks every pending Leonardo generation and checks them from a single
+    background task.
+
+    Each check is one fetch whose result resolves every waiter of that
+    generation. Delays between checks grow exponentially, and the first check
+    is scheduled from the running average completion time, so a generation
+    that usually takes 6s is not polled at 1s, 2s, 3s...
+
+    When Leonardo's completion webhook is enabled, generations are resolved
+    through resolve() and polling only starts after webhook_grace seconds.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[GenerationInfo]],
+        initial_delay: float = 2.0,
+        max_delay: float = 8.0,
+        backoff: float = 1.5,
+        timeout: float = 60.0,
+        webhook_grace: float = 0.0,
+    ) -> None:
+        self._fetch = fetch
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self.webhook_grace = webhook_grace
+        self._pending: dict[str, PendingGeneration] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._wake = asyncio.Event()
+        self._avg_completion: float | None = None
+
+        # Metrics
+        self.checks = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def _first_delay(self) -> float:
+        if self._avg_completion is None:
+            delay = self.initial_delay
+        else:
+            # Aim just short of the usual completion time
+            delay = min(
+                max(self._avg_completion * 0.9, self.initial_delay), self.max_delay
+            )
+        return max(delay, self.webhook_grace)
+
+    async def wait_for(
+        self, generation_id: str, timeout: float | None = None
+    ) -> str | None:
+        """Wait for a generation's image URL, or None if it failed or timed out."""
+        pending = self._pending.get(generation_id)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = PendingGeneration(
+                loop.create_future(),
+                registered=loop.time(),
+                delay=self._first_delay(),
+                timeout=timeout if timeout is not None else self.timeout,
+            )
+            self._pending[generation_id] = pending
+            self._ensure_running()
+            self._wake.set()
+
+        # Shield so one cancelled waiter does not cancel the shared future
+        return await asyncio.shield(pending.future)
+
+    def resolve(self, generation_id: str, image_url: str | None) -> bool:
+        """Resolve a pending generation from outside the polling loop."""
+        pending = self._pending.pop(generation_id, None)
+        if pending is None or pending.future.done():
+            return False
+        pending.future.set_result(image_url)
+        self._wake.set()
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "checks": self.checks,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_completion_seconds": self._avg_completion,
+        }
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.set_result(None)
+        self._pending.clear()
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            self._wake.clear()
+            now = loop.time()
+
+            for generation_id, pending in list(self._pending.items()):
+                if now >= pending.deadline:
+                    logging.error(f"Timed out waiting for generation {generation_id}")
+                    self.timeouts += 1
+                    self.resolve(generation_id, None)
+
+            due = [gid for gid, p in self._pending.items() if p.due <= now]
+            if due:
+                await asyncio.gather(*(self._check(gid) for gid in due))
+                continue
+
+            if not self._pending:
+                break
+            next_due = min(min(p.due, p.deadline) for p in self._pending.values())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=next_due - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, generation_id: str) -> None:
+        pending = self._pending.get(generation_id)
+        if pending is None:
+            return
+
+        self.checks += 1
+        status = "PENDING"
+        image_url: str | None = None
+        try:
+            info = await self._fetch(generation_id)
+            status = info.generations_by_pk.status
+            if status == "COMPLETE":
+                image_url = info.generations_by_pk.generated_images[0].url
+        except Exception as e:
+            self.errors += 1
+            logging.error(f"Failed to check generation {generation_id}: {e}")
+
+        loop = asyncio.get_running_loop()
+        if status == "COMPLETE":
+            elapsed = loop.time() - pending.registered
+            self._avg_completion = (
+                elapsed
+                if self._avg_completion is None
+                else 0.8 * self._avg_completion + 0.2 * elapsed
+            )
+            self.completed += 1
+            logging.info(f"New image ready at {image_url}")
+            self.resolve(generation_id, image_url)
+        elif status == "FAILED":
+            self.failed += 1
+            logging.error("Image generation failed.")
+            self.resolve(generation_id, None)
+        else:
+            pending.delay = min(pending.delay * self.backoff, self.max_delay)
+            pending.due = loop.time() + pending.delay
@@ -1,6 +1,7 @@
 import httpx
 from pydantic import EmailStr
 from backend.config.settings import settings_dependency
+from backend.config.clients import http_clients
 
 
 async def send_magic_link(
@@ -12,26 +13,23 @@ async def send_magic_link(
     subject = "Your MarsRoulette Login"
     text = f"Click here to login: {magic_link}"
 
-    # Configure httpx with longer timeout for better reliability on Fly.io
-    timeout = 30.0
+    # Pooled client, registered with a longer timeout for reliability on Fly.io
+    client = http_clients.get("mailgun")
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        try:
-            response = await client.post(
-                f"https://api.mailgun.net/v3/{settings.mailgun_domain}/messages",
-                auth=("api", settings.mailgun_api_key),
-                data={
-                    "from": settings.from_email,
-                    "to": to,
-                    "subject": subject,
-                    "text": text,
-                },
-            )
-            response.raise_for_status()
-        except httpx.ConnectError as e:
-            # If IPv6 connection fails, this might help with debugging
-            raise Exception(
-                f"Failed to connect to Mailgun API (network unreachable): {e}"
-            )
-        except Exception as e:
-            raise Exception(f"Failed to send magic link: {e}")
+    try:
+        response = await client.post(
+            f"https://api.mailgun.net/v3/{settings.mailgun_domain}/messages",
+            auth=("api", settings.mailgun_api_key),
+            data={
+                "from": settings.from_email,
+                "to": to,
+                "subject": subject,
+                "text": text,
+            },
+        )
+        response.raise_for_status()
+    except httpx.ConnectError as e:
+        # If IPv6 connection fails, this might help with debugging
+        raise Exception(f"Failed to connect to Mailgun API (network unreachable): {e}")
+    except Exception as e:
+        raise Exception(f"Failed to send magic link: {e}")
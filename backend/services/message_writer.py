@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from contextlib import AbstractAsyncContextManager
+from typing import Any, Callable, List, Tuple
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.settings import get_settings
+from backend.config.session import get_async_session
+from backend.db.db_models import Message
+from backend.db.db_crud import store_messages
+
+
+class MessageWriter:
+    """
+    Write-behind buffer for chat messages from every websocket.
+
+    Messages are committed in one transaction per batch, once `max_batch`
+    rows are waiting or `max_delay` seconds after the first one arrived,
+    whichever comes first. On SQLite this turns one fsync per message into
+    one per batch.
+
+    write() does not wait for the commit. Call flush() where the messages
+    must be on disk, e.g. when a socket disconnects, and stop() on shutdown.
+    """
+
+    def __init__(
+        self,
+        max_batch: int,
+        max_delay: float,
+        retries: int = 3,
+        session_factory: Callable[
+            [], AbstractAsyncContextManager[AsyncSession]
+        ] = get_async_session,
+    ) -> None:
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.retries = retries
+        self._session_factory = session_factory
+        self._pending: List[Tuple[Message, asyncio.Future[bool]]] = []
+        self._inflight: List[asyncio.Future[bool]] = []
+        self._wake = asyncio.Event()
+        self._urgent = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+        # Metrics
+        self.batches = 0
+        self.messages = 0
+        self.failures = 0
+        self.largest_batch = 0
+
+    def write(self, message: Message) -> asyncio.Future[bool]:
+        """
+        Buffer a message for the next batch.
+
+        Returns:
+            asyncio.Future[bool]: Resolves once the batch is committed, to
+            False if it could not be stored.
+        """
+        self._ensure_running()
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        self._pending.append((message, future))
+        self._wake.set()
+        if len(self._pending) >= self.max_batch:
+            self._urgent.set()
+        return future
+
+    async def flush(self) -> bool:
+        """Commit everything buffered so far. False if any of it failed."""
+        futures = self._inflight + [future for _, future in self._pending]
+        if not futures:
+            return True
+        self._ensure_running()
+        self._urgent.set()
+        return all(await asyncio.gather(*futures))
+
+    async def stop(self) -> None:
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "messages": self.messages,
+            "failures": self.failures,
+            "largest_batch": self.largest_batch,
+            "avg_batch": self.messages / self.batches if self.batches else None,
+        }
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._urgent = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if not self._pending:
+                continue
+
+            # Give other sockets a moment to join the batch
+            if len(self._pending) < self.max_batch and not self._urgent.is_set():
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._urgent.clear()
+
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            self._inflight = [future for _, future in batch]
+            stored = await self._commit([message for message, _ in batch])
+            self._inflight = []
+            for future in (future for _, future in batch):
+                if not future.done():
+                    future.set_result(stored)
+
+            if self._pending:
+                # Leftovers from a full batch, or written during the commit
+                self._wake.set()
+                if len(self._pending) >= self.max_batch:
+                    self._urgent.set()
+
+    async def _commit(self, messages: List[Message]) -> bool:
+        for attempt in range(1, self.retries + 1):
+            try:
+                async with self._session_factory() as session:
+                    await store_messages(session, messages)
+                self.batches += 1
+                self.messages += len(messages)
+                self.largest_batch = max(self.largest_batch, len(messages))
+                return True
+            except Exception as e:
+                logging.error(f"Message batch attempt {attempt} failed: {e}")
+                await asyncio.sleep(0.05 * attempt)
+
+        self.failures += len(messages)
+        logging.error(f"Dropped a batch of {len(messages)} messages")
+        return False
+
+
+settings = get_settings()
+message_writer = MessageWriter(
+    settings.message_batch_size,
+    settings.message_batch_delay,
+)
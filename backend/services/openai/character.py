@@ -1,68 +1,131 @@
 import random
 import logging
 import asyncio
-from typing import Optional
-from concurrent.futures import ThreadPoolExecutor
-from openai import OpenAIError, OpenAI
-from backend.schemas import NewCharacter
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, List, Optional
+from fastapi import HTTPException, status
+from openai import OpenAIError, AsyncOpenAI
+from backend.schemas import NewCharacter, NewCharacterBatch
 from backend.config.clients import openai_client
+from backend.config.settings import get_settings
 
 
-def generate_character(
-    client: OpenAI = openai_client.get_client(),
+class GenerationQueueFull(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many characters are being generated, try again shortly.",
+        )
+
+
+class GenerationLimiter:
+    """
+    Bounds concurrent OpenAI character generations.
+
+    Up to `concurrency` calls run at once and up to `max_queue` callers may wait
+    for a slot. Anyone beyond that is turned away with GenerationQueueFull
+    instead of piling up behind a slow upstream.
+    """
+
+    def __init__(self, concurrency: int, max_queue: int) -> None:
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.running = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncGenerator[None, None]:
+        if self.running >= self.concurrency and self.waiting >= self.max_queue:
+            raise GenerationQueueFull()
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+
+settings = get_settings()
+# Interactive generations, a user is waiting on each of them
+generation_limiter = GenerationLimiter(
+    settings.character_gen_concurrency, settings.character_gen_queue
+)
+# Pool refills and admin batches, kept apart so they never take a user's slot
+batch_limiter = GenerationLimiter(
+    settings.character_batch_concurrency, settings.character_batch_queue
+)
+
+
+async def generate_character(
+    client: AsyncOpenAI | None = None,
 ) -> Optional[NewCharacter]:
     """
     Generate a new character via OpenAI and return the character's data and profile.
 
+    Runs natively on the event loop and waits for a slot in generation_limiter.
+
     Args:
-        openai_key (str): OpenAI API key for authentication
+        client (AsyncOpenAI | None): OpenAI client, the shared one by default.
 
     Returns:
         Optional[NewCharacter]: Generated character data and profile as a NewCharacter object.
 
     Raises:
+        GenerationQueueFull: If too many generations are already waiting.
         OpenAIError: If there is an error with the OpenAI API request.
         Exception: For any other unexpected errors.
     """
+    client = client or openai_client.get_client()
 
     try:
         # Select random values for the prompt
         gender, species, archetype = character_randomizer()
 
-        response = client.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "developer",
-                    "content": "You are a character designer with expertise in unique and exciting retro futurism characters.",
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                    Generate a unique alien character with both:
-                    1. A descriptive **image prompt** tuned for AI-generated art.
-                    2. **Character details** useful for interactive dialogue.
+        async with generation_limiter.slot():
+            response = await client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "developer",
+                        "content": "You are a character designer with expertise in unique and exciting retro futurism characters.",
+                    },
+                    {
+                        "role": "user",
+                        "content": f"""
+                        Generate a unique alien character with both:
+                        1. A descriptive **image prompt** tuned for AI-generated art.
+                        2. **Character details** useful for interactive dialogue.
                     
-                    Follow these instructions to create the data inside the fields:
+                        Follow these instructions to create the data inside the fields:
 
-                    "image_prompt": "Retrofuturism frontal close-up of a {gender} {species} {archetype}, looking straight into the camera. This alien has [describe physical features such as eyes, skin, facial shape, and unique details]. It has a [describe facial expression based on the character's personality]. It wears [describe outfit] inspired by [insert a fashion designer]. Background is a colorful mod pattern.",
+                        "image_prompt": "Retrofuturism frontal close-up of a {gender} {species} {archetype}, looking straight into the camera. This alien has [describe physical features such as eyes, skin, facial shape, and unique details]. It has a [describe facial expression based on the character's personality]. It wears [describe outfit] inspired by [insert a fashion designer]. Background is a colorful mod pattern.",
 
                     
-                    "name": "[Generate a unique name for this alien]",
-                    "planet_name": [Unique name for this alien's homeplanet]
-                    "planet_description": [Main characteristics of the home planet and how its nature impacts its inhabitants] 
-                    "personality_traits": "[Personality traits that would come apparent as the alien speaks.]",
-                    "speech_style": "[Explain how they express themselves (e.g. are they cryptic? humorous? regal? cold? poetic? etc.)]",
-                    "quirks": "[Any quirky speech habits, or unique expressions they tend to use.]"
-                    "human_relationship": [How they see humans (eg. Are they curious? Friendly? Hostile? Pleasant? Distrustful? Uninterested? etc. This should impact their conversation.)]
-                    """,
-                },
-            ],
-            response_format=NewCharacter,
-        )
+                        "name": "[Generate a unique name for this alien]",
+                        "planet_name": [Unique name for this alien's homeplanet]
+                        "planet_description": [Main characteristics of the home planet and how its nature impacts its inhabitants] 
+                        "personality_traits": "[Personality traits that would come apparent as the alien speaks.]",
+                        "speech_style": "[Explain how they express themselves (e.g. are they cryptic? humorous? regal? cold? poetic? etc.)]",
+                        "quirks": "[Any quirky speech habits, or unique expressions they tend to use.]"
+                        "human_relationship": [How they see humans (eg. Are they curious? Friendly? Hostile? Pleasant? Distrustful? Uninterested? etc. This should impact their conversation.)]
+                        """,
+                    },
+                ],
+                response_format=NewCharacter,
+            )
 
         return response.choices[0].message.parsed
 
+    except GenerationQueueFull:
+        raise
     except OpenAIError as e:
         logging.error(f"Error generating character with OpenAI: {e}")
         raise
@@ -71,6 +134,95 @@ def generate_character(
         raise
 
 
+# Upper bound keeps a single structured response well inside the output limit
+MAX_BATCH_SIZE = 10
+
+
+async def generate_character_batch(
+    count: int,
+    client: AsyncOpenAI | None = None,
+) -> List[NewCharacter]:
+    """
+    Generate several characters in a single structured-output call.
+
+    Each character gets its own randomized gender, species and archetype, and
+    the shared field instructions are sent once for the whole batch. Waits for
+    a slot in batch_limiter, not in the interactive generation_limiter.
+
+    Args:
+        count (int): Number of characters, at most MAX_BATCH_SIZE.
+        client (AsyncOpenAI | None): OpenAI client, the shared one by default.
+
+    Returns:
+        List[NewCharacter]: The generated characters, possibly fewer than asked.
+    """
+    client = client or openai_client.get_client()
+    count = max(1, min(count, MAX_BATCH_SIZE))
+
+    # Draw distinct trait combinations so the batch does not repeat itself
+    combos: List[tuple[str, str, str]] = []
+    for _ in range(count * 10):
+        combo = character_randomizer()
+        if combo not in combos:
+            combos.append(combo)
+        if len(combos) == count:
+            break
+    assignments = "\n".join(
+        f"{n}. A {gender} {species} {archetype}"
+        for n, (gender, species, archetype) in enumerate(combos, start=1)
+    )
+
+    try:
+        async with batch_limiter.slot():
+            response = await client.beta.chat.completions.parse(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "developer",
+                        "content": "You are a character designer with expertise in unique and exciting retro futurism characters.",
+                    },
+                    {
+                        "role": "user",
+                        "content": f"""
+                        Generate {len(combos)} unique alien characters, one for each of these descriptions, in the same order:
+                        {assignments}
+
+                        Every character needs both:
+                        1. A descriptive **image prompt** tuned for AI-generated art.
+                        2. **Character details** useful for interactive dialogue.
+
+                        Follow these instructions to create the data inside the fields of each character:
+
+                        "image_prompt": "Retrofuturism frontal close-up of a [its description], looking straight into the camera. This alien has [describe physical features such as eyes, skin, facial shape, and unique details]. It has a [describe facial expression based on the character's personality]. It wears [describe outfit] inspired by [insert a fashion designer]. Background is a colorful mod pattern.",
+
+                        "name": "[Generate a unique name for this alien]",
+                        "planet_name": [Unique name for this alien's homeplanet]
+                        "planet_description": [Main characteristics of the home planet and how its nature impacts its inhabitants]
+                        "personality_traits": "[Personality traits that would come apparent as the alien speaks.]",
+                        "speech_style": "[Explain how they express themselves (e.g. are they cryptic? humorous? regal? cold? poetic? etc.)]",
+                        "quirks": "[Any quirky speech habits, or unique expressions they tend to use.]"
+                        "human_relationship": [How they see humans (eg. Are they curious? Friendly? Hostile? Pleasant? Distrustful? Uninterested? etc. This should impact their conversation.)]
+                        """,
+                    },
+                ],
+                response_format=NewCharacterBatch,
+            )
+
+        batch = response.choices[0].message.parsed
+        if batch is None:
+            return []
+        return batch.characters[: len(combos)]
+
+    except GenerationQueueFull:
+        raise
+    except OpenAIError as e:
+        logging.error(f"Error generating character batch with OpenAI: {e}")
+        raise
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise
+
+
 def character_randomizer() -> tuple[str, str, str]:
     gender = ["male", "female"]
 
@@ -114,22 +266,3 @@ def character_randomizer() -> tuple[str, str, str]:
     ]
 
     return random.choice(gender), random.choice(species), random.choice(archetypes)
-
-
-# Concurrency for generating characters
-executor = ThreadPoolExecutor()
-
-
-async def generate_character_async(
-    client: OpenAI = openai_client.get_client(),
-) -> Optional[NewCharacter]:
-    """
-    This function is a wrapper for the generate_character function to run it in a separate thread.
-    It uses asyncio's run_in_executor to allow for non-blocking behavior in an async context.
-    Args:
-        openai_key (str): OpenAI API key for authentication
-    Returns:
-        Optional[NewCharacter]: Generated character data and profile as a NewCharacter object.
-    """
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(executor, generate_character, client)
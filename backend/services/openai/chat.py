@@ -5,17 +5,12 @@ from backend.db.db_models import Character
 
 
 async def ai_response(
-    openai_api_key: str,
+    client: AsyncOpenAI,
     username: str,
     character: Character,
     user_message: str,
     previous_response_id: str | None = None,
 ) -> AsyncStream[Any]:
-    client = AsyncOpenAI(
-        api_key=openai_api_key,
-        project="proj_iHucBz89WXK9PvH3Hqvf5mhf",
-    )
-
     response_stream = await client.responses.create(
         input=user_message,
         model="gpt-4o",
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.config.clients import LeonardoClient, leonardo_client
+from backend.config.session import get_async_session
+from backend.db.db_crud import read_record, update_record
+from backend.db.db_models import Character
+from backend.services.leonardo.img_request import generate_portrait
+from backend.services.job_queue import JobQueue, job_queue
+
+# Events past these statuses are final, subscribers can stop listening
+FINAL_STATUSES = ("READY", "FAILED")
+
+
+class PortraitEvents:
+    """
+    In-process pub/sub of portrait progress, keyed by character id.
+
+    Every subscriber gets its own queue, so a slow SSE client never holds up
+    the job publishing the event or the other subscribers.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[int, set[asyncio.Queue[dict[str, Any]]]] = {}
+
+    def subscribe(self, character_id: int) -> asyncio.Queue[dict[str, Any]]:
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._subscribers.setdefault(character_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(
+        self, character_id: int, queue: asyncio.Queue[dict[str, Any]]
+    ) -> None:
+        subscribers = self._subscribers.get(character_id, set())
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(character_id, None)
+
+    def publish(
+        self, character_id: int, status: str, image_url: str | None = None
+    ) -> None:
+        event = {"character_id": character_id, "status": status, "image_url": image_url}
+        for queue in self._subscribers.get(character_id, ()):
+            queue.put_nowait(event)
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+
+class PortraitFailed(Exception):
+    pass
+
+
+class PortraitJobs:
+    """
+    Generates portraits through the job queue, so character creation can
+    return as soon as the text profile is stored and a suspend or restart
+    does not lose the work.
+
+    Jobs record the outcome in Character.image_status and announce their
+    progress through `events`. An attempt that dies while waiting on Leonardo
+    resumes the same generation instead of requesting a new one.
+    """
+
+    def __init__(
+        self, client: LeonardoClient, events: PortraitEvents, queue: JobQueue
+    ) -> None:
+        self.client = client
+        self.events = events
+        self.queue = queue
+        queue.register("portrait", self.run, on_failure=self.fail)
+
+    async def schedule(
+        self, character_id: int, session: AsyncSession | None = None
+    ) -> None:
+        await self.queue.enqueue(
+            "portrait", {"character_id": character_id}, session=session
+        )
+
+    async def run(self, payload: dict[str, Any]) -> None:
+        character_id = payload["character_id"]
+        async with get_async_session() as session:
+            character = await read_record(session, Character, character_id)
+        assert isinstance(character, Character)
+        if character.image_status == "READY":
+            return
+
+        self.events.publish(character_id, "GENERATING")
+        image_url = await generate_portrait(
+            self.client,
+            character.image_prompt,
+            character_id,
+            generation_id=character.image_generation_id,
+        )
+        if image_url is None:
+            # A failed generation cannot be resumed, the retry starts over
+            async with get_async_session() as session:
+                await update_record(
+                    session, Character, character_id, {"image_generation_id": None}
+                )
+            raise PortraitFailed(f"No portrait for character {character_id}")
+
+        self.events.publish(character_id, "READY", image_url)
+
+    async def fail(self, payload: dict[str, Any], error: str) -> None:
+        character_id = payload["character_id"]
+        async with get_async_session() as session:
+            await update_record(
+                session, Character, character_id, {"image_status": "FAILED"}
+            )
+        self.events.publish(character_id, "FAILED")
+
+
+portrait_events = PortraitEvents()
+portrait_jobs = PortraitJobs(leonardo_client, portrait_events, job_queue)
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.config.settings import get_settings
+from backend.config.session import get_async_session
+from backend.config.clients import http_clients
+from backend.db.db_crud import update_record
+from backend.db.db_models import Character
+from backend.utils.images import (
+    PORTRAIT_SIZES,
+    PORTRAIT_FORMATS,
+    render_portrait_variants,
+)
+
+
+class PortraitStore:
+    """
+    Mirrors generated portraits to local disk as resized variants.
+
+    Each character gets a directory holding every size/format combination and
+    a `version` file with the content digest of the original. The digest goes
+    into variant URLs and ETags, so the files can be cached as immutable.
+    """
+
+    def __init__(self, root: str, url_prefix: str, workers: int = 1) -> None:
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.workers = max(1, workers)
+        self._executor: ProcessPoolExecutor | None = None
+        self._versions: dict[int, str] = {}
+        self._mirroring: dict[int, asyncio.Task[str | None]] = {}
+
+    def directory(self, character_id: int) -> str:
+        return os.path.join(self.root, str(character_id))
+
+    def variant_path(self, character_id: int, variant: str, extension: str) -> str:
+        if variant not in PORTRAIT_SIZES or extension not in PORTRAIT_FORMATS:
+            raise ValueError(f"Unknown portrait variant {variant}.{extension}")
+        return os.path.join(self.directory(character_id), f"{variant}.{extension}")
+
+    def version(self, character_id: int) -> str | None:
+        if character_id in self._versions:
+            return self._versions[character_id]
+        try:
+            with open(os.path.join(self.directory(character_id), "version")) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        self._versions[character_id] = version
+        return version
+
+    def url(
+        self, character_id: int, variant: str = "medium", extension: str = "webp"
+    ) -> str:
+        version = self.version(character_id)
+        return f"{self.url_prefix}/{character_id}/{variant}.{extension}?v={version}"
+
+    async def mirror(self, character_id: int, remote_url: str) -> str | None:
+        """
+        Download a portrait once and render its variants in a worker process.
+        Concurrent calls for the same character share one download.
+
+        Returns:
+            str | None: Local URL of the medium variant, or None on failure.
+        """
+        task = self._mirroring.get(character_id)
+        if task is None:
+            task = asyncio.create_task(self._mirror(character_id, remote_url))
+            self._mirroring[character_id] = task
+            task.add_done_callback(lambda _: self._mirroring.pop(character_id, None))
+        return await asyncio.shield(task)
+
+    async def _mirror(self, character_id: int, remote_url: str) -> str | None:
+        try:
+            response = await http_clients.get("leonardo_cdn").get(remote_url)
+            response.raise_for_status()
+            data = response.content
+
+            version = hashlib.sha256(data).hexdigest()[:16]
+            if self.version(character_id) != version:
+                loop = asyncio.get_running_loop()
+                directory = self.directory(character_id)
+                await loop.run_in_executor(
+                    self._get_executor(), render_portrait_variants, data, directory
+                )
+                with open(os.path.join(directory, "version.tmp"), "w") as f:
+                    f.write(version)
+                os.replace(
+                    os.path.join(directory, "version.tmp"),
+                    os.path.join(directory, "version"),
+                )
+                self._versions[character_id] = version
+
+            logging.info(f"Portrait of character {character_id} mirrored locally")
+            return self.url(character_id)
+        except Exception as e:
+            logging.error(f"Failed to mirror portrait of {character_id}: {e}")
+            return None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers only import Pillow, and forking a process that
+            # runs database threads is asking for trouble
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+settings = get_settings()
+portrait_store = PortraitStore(
+    settings.portrait_dir,
+    settings.portrait_url_prefix,
+    settings.portrait_workers,
+)
+
+
+async def mirror_portrait(character_id: int, remote_url: str) -> str:
+    """
+    Mirror a character's portrait and point its image_url at the local copy.
+
+    Returns:
+        str: The URL the character now uses, the remote one if mirroring failed.
+    """
+    local_url = await portrait_store.mirror(character_id, remote_url)
+    if local_url is None:
+        return remote_url
+
+    async with get_async_session() as session:
+        await update_record(session, Character, character_id, {"image_url": local_url})
+    return local_url
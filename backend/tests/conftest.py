@@ -0,0 +1,84 @@
+import pytest
+from typing import AsyncGenerator, Iterator
+
+from httpx import AsyncClient, ASGITransport
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+)
+
+from backend.main import app
+from backend.config.session import get_session
+from backend.config.settings import get_settings
+from backend.db.db_models import User
+from backend.services.auth import get_valid_user, user_cache
+from backend.utils.cache import MemoryCache, response_cache
+
+
+# Module scoped like anyio's own, for the module scoped engines
+@pytest.fixture(scope="module")
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(scope="function")
+async def async_db_engine() -> AsyncGenerator[AsyncEngine, None]:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture(scope="function")
+async def async_db_session(
+    async_db_engine: AsyncEngine,
+) -> AsyncGenerator[AsyncSession, None]:
+    # Modules seed their data by overriding this fixture with one that uses it
+    async_session = async_sessionmaker(
+        bind=async_db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with async_session() as session:
+        yield session
+
+
+@pytest.fixture(scope="function")
+async def user_client(
+    async_db_session: AsyncSession,
+) -> AsyncGenerator[AsyncClient, None]:
+    """The app on the test session, signed in as user 1."""
+
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    async def get_test_user() -> User:
+        return User(id=1, username="Flash", email="flash@mongo.com", role="user")
+
+    app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_valid_user] = get_test_user
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache() -> Iterator[None]:
+    # Every test has databases of its own, so no cached response may outlive it
+    backend = response_cache.backend
+    response_cache.backend = MemoryCache(get_settings().response_cache_max_bytes)
+    response_cache.hits = response_cache.misses = response_cache.invalidations = 0
+    yield
+    response_cache.backend = backend
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache() -> Iterator[None]:
+    # Nor may a user validated against them
+    user_cache.clear()
+    user_cache.hits = user_cache.misses = user_cache.invalidations = 0
+    yield
+    user_cache.clear()
@@ -4,7 +4,10 @@ import time
 import base64
 from typing import Any, Dict, AsyncGenerator
 
+from unittest.mock import patch
+
 from fastapi import Request
+from httpx import AsyncClient, ASGITransport
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import (
@@ -13,11 +16,14 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
 )
 
+from backend.main import app
+from backend.config.session import get_session
 from backend.config.settings import AppSettings, get_settings
 from backend.services.auth import (
     create_mailer_token,
     create_access_token,
     get_valid_user,
+    user_cache,
 )
 from backend.db.db_models import User
 
@@ -137,3 +143,109 @@ async def test_get_valid_user(
     user = await get_valid_user(async_db_session, settings, request)
     assert user.id == mock_user.id
     assert user.username == mock_user.username
+
+
+@pytest.fixture(scope="function")
+async def cookie_client(
+    async_db_session: AsyncSession, settings: AppSettings
+) -> AsyncGenerator[AsyncClient, None]:
+    # The real get_valid_user, behind an access token cookie for user 1
+    async_db_session.add(
+        User(username="Teela", email="teela@grayskull.com", role="admin")
+    )
+    await async_db_session.commit()
+
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    app.dependency_overrides[get_session] = get_test_session
+    token = create_access_token({"sub": "1"}, settings.secret_key)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(
+        transport=transport, base_url="http://test", cookies={"access_token": token}
+    ) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+def user_request(token: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(b"cookie", f"access_token={token}".encode())],
+        }
+    )
+
+
+@pytest.mark.anyio
+async def test_get_valid_user_cached(
+    async_db_session: AsyncSession,
+    settings: AppSettings,
+    mock_token: str,
+    mock_user: User,
+) -> None:
+    request = user_request(mock_token)
+    first = await get_valid_user(async_db_session, settings, request)
+
+    with patch("backend.services.auth.read_record") as read_record:
+        second = await get_valid_user(async_db_session, settings, request)
+        read_record.assert_not_called()
+
+    # A snapshot of its own, without the login token fields
+    assert second is not first
+    assert second.username == first.username and second.role == first.role
+    assert second.login_token is None
+    assert user_cache.stats()["db_reads_saved"] == 1
+
+    # Past the TTL the user is read again
+    expired = time.monotonic() + user_cache.ttl
+    with patch("backend.services.auth.time.monotonic", return_value=expired):
+        assert user_cache.get(first.id or 0) is None
+
+
+@pytest.mark.anyio
+async def test_user_cache_invalidated(cookie_client: AsyncClient) -> None:
+    response = await cookie_client.get("/user/me")
+    assert response.json()["username"] == "Teela"
+    await cookie_client.get("/user/me")
+    assert user_cache.stats()["hits"] == 1
+
+    # The admin check is a hit too, then the patch drops the entry
+    response = await cookie_client.patch("/user/1", json={"username": "Sorceress"})
+    assert response.status_code == 200
+    assert "login_token" not in response.json()
+    response = await cookie_client.get("/user/me")
+    assert response.json()["username"] == "Sorceress"
+    assert user_cache.stats()["hits"] == 2
+
+    response = await cookie_client.get("/user/logout")
+    assert response.status_code == 200
+    assert user_cache.get(1) is None
+    assert user_cache.stats()["invalidations"] == 2
+
+
+@pytest.mark.anyio
+async def test_get_user_self_or_admin(
+    cookie_client: AsyncClient, async_db_session: AsyncSession, settings: AppSettings
+) -> None:
+    async_db_session.add(
+        User(username="Adam", email="adam@grayskull.com", login_token="magic")
+    )
+    await async_db_session.commit()
+
+    # The admin reads anyone, never their login token
+    response = await cookie_client.get("/user/2")
+    assert response.status_code == 200
+    assert response.json()["username"] == "Adam"
+    assert "login_token" not in response.json()
+
+    # A user reads only themselves
+    token = create_access_token({"sub": "2"}, settings.secret_key)
+    cookie_client.cookies.set("access_token", token)
+    assert (await cookie_client.get("/user/2")).status_code == 200
+    assert (await cookie_client.get("/user/1")).status_code == 403
+
+    cookie_client.cookies.clear()
+    assert (await cookie_client.get("/user/2")).status_code == 401
@@ -0,0 +1,234 @@
+import pytest
+from httpx import AsyncClient
+from typing import Any, Dict, Tuple
+from unittest.mock import patch
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.db.db_crud import delete_record, store_messages, update_record
+from backend.db.db_models import User, Character, Thread, Message
+from backend.schemas import NewCharacter
+from backend.utils.cache import (
+    MemoryCache,
+    RedisCache,
+    ResponseCache,
+    response_cache,
+)
+
+
+class FakeRedis:
+    """The slice of redis.asyncio.Redis that RedisCache uses."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.data: Dict[str, Tuple[bytes, float | None]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.now:
+            del self.data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, px: int | None = None) -> None:
+        self.data[key] = (value, self.now + px / 1000 if px is not None else None)
+
+    async def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+
+@pytest.fixture(scope="function")
+async def async_db_session(async_db_session: AsyncSession) -> AsyncSession:
+    async_db_session.add(User(username="Flash", email="flash@mongo.com"))
+    async_db_session.add(
+        Character(
+            image_prompt="A retro alien",
+            generated_by=1,
+            name="Ming",
+            planet_name="Mongo",
+            planet_description="Cold",
+            personality_traits="Proud",
+            speech_style="Regal",
+            quirks="Laughs a lot",
+            human_relationship="Curious",
+        )
+    )
+    async_db_session.add(Thread(user_id=1, character_id=1, created_at=0))
+    await async_db_session.commit()
+    return async_db_session
+
+
+def counting_builder(content: Any) -> Tuple[Dict[str, int], Any]:
+    calls = {"count": 0}
+
+    async def build() -> Response:
+        calls["count"] += 1
+        return JSONResponse(content=content, headers={"X-Next-Cursor": "7"})
+
+    return calls, build
+
+
+@pytest.mark.anyio
+async def test_memory_cache_evicts_and_expires() -> None:
+    cache = MemoryCache(max_bytes=10)
+    await cache.set("a", b"1234")
+    await cache.set("b", b"1234")
+    await cache.get("a")
+    # Over budget, "b" is the least recently used
+    await cache.set("c", b"1234")
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"1234"
+    assert cache.stats()["bytes"] == 8
+
+    with patch("backend.utils.cache.time.monotonic", return_value=0.0):
+        await cache.set("d", b"12", ttl=5)
+    with patch("backend.utils.cache.time.monotonic", return_value=5.0):
+        assert await cache.get("d") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_response_cache_hits_until_invalidated(backend: str) -> None:
+    redis = FakeRedis()
+    cache = ResponseCache(
+        MemoryCache(1024) if backend == "memory" else RedisCache(redis), ttl=60
+    )
+    calls, build = counting_builder({"characters": [1, 2]})
+
+    first = await cache.fetch("characters", "/character?", build)
+    second = await cache.fetch("characters", "/character?", build)
+    assert calls["count"] == 1
+    assert second.body == first.body
+    assert second.headers["X-Next-Cursor"] == "7"
+    assert second.headers["content-type"] == "application/json"
+
+    await cache.invalidate("characters")
+    await cache.fetch("characters", "/character?", build)
+    assert calls["count"] == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+    if backend == "redis":
+        # Past the TTL Redis drops the entry
+        redis.now = 61.0
+        await cache.fetch("characters", "/character?", build)
+        assert calls["count"] == 3
+
+
+@pytest.mark.anyio
+async def test_lost_version_keeps_entries_dead() -> None:
+    cache = ResponseCache(MemoryCache(1024), ttl=60)
+    calls, build = counting_builder("Ming")
+    await cache.fetch("character:1", "/character/1?", build)
+    await cache.invalidate("character:1")
+    await cache.fetch("character:1", "/character/1?", build)
+
+    # The version is evicted, the entries under it are not
+    await cache.backend.delete("version:character:1")
+    await cache.invalidate("character:1")
+    await cache.fetch("character:1", "/character/1?", build)
+    assert calls["count"] == 3
+
+
+@pytest.mark.anyio
+async def test_character_update_invalidates(
+    user_client: AsyncClient, async_db_session: AsyncSession
+) -> None:
+    response = await user_client.get("/character/1")
+    assert response.json()["character"]["planet_name"] == "Mongo"
+    await user_client.get("/character", params={"fields": "planet_name"})
+
+    await update_record(async_db_session, Character, 1, {"planet_name": "Barsoom"})
+
+    response = await user_client.get("/character/1")
+    assert response.json()["character"]["planet_name"] == "Barsoom"
+    response = await user_client.get("/character", params={"fields": "planet_name"})
+    assert response.json()["characters"][0]["planet_name"] == "Barsoom"
+    assert response_cache.stats()["hits"] == 0
+
+
+@pytest.mark.anyio
+async def test_history_cached_until_messages_stored(
+    user_client: AsyncClient, async_db_session: AsyncSession
+) -> None:
+    async def add_message(content: str) -> None:
+        await store_messages(
+            async_db_session,
+            [Message(thread_id=1, role="user", content=content, created_at=1)],
+        )
+
+    await add_message("Hello")
+    first = await user_client.get("/chat/history/1")
+    second = await user_client.get("/chat/history/1")
+    assert second.json() == first.json()
+    assert response_cache.stats()["hits"] == 1
+
+    await add_message("Anyone there?")
+    response = await user_client.get("/chat/history/1")
+    assert [entry["content"] for entry in response.json()] == [
+        "Hello",
+        "Anyone there?",
+    ]
+    assert response_cache.stats()["hits"] == 1
+
+
+@pytest.mark.anyio
+async def test_chat_start_keeps_character_reads_fresh(
+    user_client: AsyncClient,
+) -> None:
+    first = await user_client.get("/character/1")
+    await user_client.get("/character")
+
+    # Flash has met Ming, so the chat gets a newly generated character
+    generated = NewCharacter(
+        image_prompt="A retro alien",
+        name="Aura",
+        planet_name="Arboria",
+        planet_description="Green",
+        personality_traits="Cunning",
+        speech_style="Sly",
+        quirks="Winks",
+        human_relationship="Fond",
+    )
+    with (
+        patch(
+            "backend.services.chat_builder.generate_character",
+            return_value=generated,
+        ),
+        patch("backend.services.chat_builder.portrait_jobs.schedule"),
+    ):
+        response = await user_client.get("/character/chat")
+    assert response.status_code == 200
+    assert "last_served_at" not in response.json()["character"]
+
+    response = await user_client.get("/character")
+    assert [c["name"] for c in response.json()["characters"]] == ["Ming", "Aura"]
+    response = await user_client.get("/character/2")
+    assert response.json()["character"]["name"] == "Aura"
+    # Serving a character is bookkeeping, its cached reads stay valid
+    response = await user_client.get(
+        "/character/1", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.anyio
+async def test_character_delete_drops_thread_history(
+    user_client: AsyncClient, async_db_session: AsyncSession
+) -> None:
+    await store_messages(
+        async_db_session,
+        [Message(thread_id=1, role="user", content="Hello", created_at=1)],
+    )
+    response = await user_client.get("/chat/history/1")
+    assert response.status_code == 200
+
+    await delete_record(async_db_session, Character, 1)
+
+    # The thread and its messages went with the character
+    response = await user_client.get("/chat/history/1")
+    assert response.json() == []
+    response = await user_client.get("/character/1")
+    assert response.status_code == 404
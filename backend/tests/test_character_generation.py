@@ -0,0 +1,185 @@
+import asyncio
+import re
+import time
+import pytest
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, List
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.main import app
+from backend.config.session import get_session
+from backend.config.clients import openai_client
+from backend.services.auth import get_valid_user
+from backend.services.openai import character as generation
+from backend.services.openai.character import (
+    GenerationLimiter,
+    GenerationQueueFull,
+    generate_character,
+    generate_character_batch,
+)
+from backend.schemas import NewCharacter, NewCharacterBatch
+from backend.db.db_models import User
+
+
+def make_character(name: str) -> NewCharacter:
+    return NewCharacter(
+        image_prompt="A jovial rock based alien rockstar",
+        name=name,
+        planet_name="Basalt",
+        planet_description="Volcanic",
+        personality_traits="Loud",
+        speech_style="Rumbling",
+        quirks="Hums bass lines",
+        human_relationship="Big fan",
+    )
+
+
+class SlowOpenAI:
+    """Stands in for AsyncOpenAI, taking a while to parse like the real API."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.requests: List[Any] = []
+        self.beta = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(parse=self.parse))
+        )
+
+    async def parse(self, **kwargs: Any) -> Any:
+        self.requests.append(kwargs)
+        await asyncio.sleep(self.delay)
+        parsed: Any = make_character("Gorgo")
+        if kwargs["response_format"] is NewCharacterBatch:
+            # Models sometimes overshoot the requested count
+            parsed = NewCharacterBatch(
+                characters=[make_character(f"Gorgo {n}") for n in range(5)]
+            )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))]
+        )
+
+
+@pytest.fixture(scope="function")
+async def user_client(
+    async_db_session: AsyncSession,
+) -> AsyncGenerator[AsyncClient, None]:
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    async def get_test_user() -> User:
+        return User(id=2, username="TestUser", email="user@user.com")
+
+    app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_valid_user] = get_test_user
+    app.dependency_overrides[openai_client.get_client] = lambda: SlowOpenAI(0.3)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.anyio
+async def test_event_loop_stays_responsive_during_generation(
+    user_client: AsyncClient,
+) -> None:
+    gaps: List[float] = []
+    done = asyncio.Event()
+
+    async def heartbeat() -> None:
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    beat = asyncio.create_task(heartbeat())
+    with patch("backend.routes.rt_characters.portrait_jobs.schedule"):
+        response = await user_client.post("/character/generate")
+    done.set()
+    await beat
+
+    assert response.status_code == 201
+    # The 0.3s generation ran while the heartbeat kept ticking
+    assert len(gaps) > 10
+    assert max(gaps) < 0.1
+
+
+@pytest.mark.anyio
+async def test_limiter_bounds_concurrency_and_queue() -> None:
+    limiter = GenerationLimiter(concurrency=2, max_queue=1)
+    running = 0
+    peak = 0
+    release = asyncio.Event()
+
+    async def generate() -> None:
+        nonlocal running, peak
+        async with limiter.slot():
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+
+    tasks = [asyncio.create_task(generate()) for _ in range(3)]
+    await asyncio.sleep(0.01)
+
+    # Two running, one queued: a fourth caller is turned away
+    with pytest.raises(GenerationQueueFull):
+        async with limiter.slot():
+            pass
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert peak == 2
+
+
+@pytest.mark.anyio
+async def test_generate_character_batch_uses_one_call() -> None:
+    client = SlowOpenAI(0.0)
+    characters = await generate_character_batch(3, client)  # type: ignore[arg-type]
+
+    assert [c.name for c in characters] == ["Gorgo 0", "Gorgo 1", "Gorgo 2"]
+    assert len(client.requests) == 1
+
+    # Each character in the batch gets its own trait draw
+    prompt = client.requests[0]["messages"][1]["content"]
+    descriptions = re.findall(r"^\s*\d+\. A ((?:male|female) .+)$", prompt, re.M)
+    assert len(descriptions) == 3
+    assert len(set(descriptions)) == 3
+
+
+@pytest.mark.anyio
+async def test_batches_never_take_user_slots() -> None:
+    with (
+        patch.object(generation, "generation_limiter", GenerationLimiter(1, 0)),
+        patch.object(generation, "batch_limiter", GenerationLimiter(1, 0)),
+    ):
+        # A refill holds the only batch slot, more batches are turned away
+        refill = asyncio.create_task(
+            generate_character_batch(3, SlowOpenAI(0.5))  # type: ignore[arg-type]
+        )
+        await asyncio.sleep(0.01)
+        with pytest.raises(GenerationQueueFull):
+            await generate_character_batch(3, SlowOpenAI(0.0))  # type: ignore[arg-type]
+
+        # A user still gets a slot straight away
+        start = time.perf_counter()
+        character = await generate_character(SlowOpenAI(0.0))  # type: ignore[arg-type]
+        assert character is not None
+        assert time.perf_counter() - start < 0.1
+        assert not refill.done()
+        assert len(await refill) == 3
+
+
+@pytest.mark.anyio
+async def test_full_queue_refused_at_once(user_client: AsyncClient) -> None:
+    limiter = GenerationLimiter(1, 0)
+    with patch.object(generation, "generation_limiter", limiter):
+        async with limiter.slot():
+            start = time.perf_counter()
+            response = await user_client.post("/character/generate")
+            elapsed = time.perf_counter() - start
+    assert response.status_code == 503
+    # Not retried: no second wait in the queue, no sleep between tries
+    assert elapsed < 0.5
@@ -0,0 +1,213 @@
+import json
+import pytest
+from pathlib import Path
+from typing import AsyncGenerator, List
+
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    async_sessionmaker,
+)
+
+from backend.config.clients import leonardo_client
+from backend.services import character_pool
+from backend.services.character_pool import CharacterPool
+from backend.services.job_queue import JobQueue, current_job_id
+from backend.services.portrait_jobs import PortraitEvents, PortraitJobs
+from backend.db.db_crud import (
+    count_incoming_characters,
+    count_unclaimed_characters,
+    store_character_batch,
+)
+from backend.db.db_models import Character, Job, Thread, User
+from backend.schemas import NewCharacter
+
+
+def make_character(name: str, image_url: str) -> Character:
+    return Character(
+        image_prompt="A retro alien",
+        image_url=image_url,
+        image_status="PENDING" if image_url == "PENDING" else "READY",
+        generated_by=1,
+        name=name,
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Proud",
+        speech_style="Regal",
+        quirks="Laughs a lot",
+        human_relationship="Curious",
+    )
+
+
+@pytest.mark.anyio
+async def test_pool_queues_batches_up_to_target() -> None:
+    queued: List[int] = []
+
+    async def counter() -> tuple[int, int]:
+        # One in stock, and the batches queued so far are on their way
+        return 1, sum(queued)
+
+    async def enqueue(count: int) -> None:
+        queued.append(count)
+
+    pool = CharacterPool(6, 60.0, 2, counter=counter, enqueue=enqueue)
+    await pool.fill()
+    # Queued batches count towards the target, a second check orders nothing
+    await pool.fill()
+
+    stats = pool.stats()
+    assert queued == [2, 2, 1]
+    assert stats["depth"] == 1
+    assert stats["incoming"] == 5
+    assert stats["batches_queued"] == 3
+
+
+@pytest.mark.anyio
+async def test_pool_counts_failed_enqueues() -> None:
+    async def counter() -> tuple[int, int]:
+        return 0, 0
+
+    async def enqueue(count: int) -> None:
+        raise RuntimeError("database is locked")
+
+    pool = CharacterPool(2, 60.0, counter=counter, enqueue=enqueue)
+    await pool.fill()
+
+    stats = pool.stats()
+    assert stats["failures"] == 1
+    assert stats["batches_queued"] == 0
+
+
+@pytest.mark.anyio
+async def test_count_unclaimed_characters(async_db_session: AsyncSession) -> None:
+    async_db_session.add(User(username="Flash", email="flash@mongo.com"))
+    claimed = make_character("Ming", "https://cdn/ming.png")
+    unclaimed = make_character("Vultan", "https://cdn/vultan.png")
+    pending = make_character("Barin", "PENDING")
+    async_db_session.add_all([claimed, unclaimed, pending])
+    await async_db_session.commit()
+
+    assert isinstance(claimed.id, int)
+    async_db_session.add(Thread(user_id=1, character_id=claimed.id, created_at=0))
+    await async_db_session.commit()
+
+    assert await count_unclaimed_characters(async_db_session) == 1
+
+
+def new_characters(*names: str) -> List[NewCharacter]:
+    return [
+        NewCharacter(
+            image_prompt="A retro alien",
+            name=name,
+            planet_name="Mongo",
+            planet_description="Cold",
+            personality_traits="Proud",
+            speech_style="Regal",
+            quirks="Laughs a lot",
+            human_relationship="Curious",
+        )
+        for name in names
+    ]
+
+
+@pytest.mark.anyio
+async def test_store_character_batch(async_db_session: AsyncSession) -> None:
+    seen: List[int | None] = []
+
+    async def on_stored(characters: List[Character]) -> None:
+        seen.extend(character.id for character in characters)
+
+    stored = await store_character_batch(
+        async_db_session,
+        new_characters("Aura", "Klytus", "Zarkov"),
+        1,
+        on_stored=on_stored,
+    )
+
+    assert [c.name for c in stored] == ["Aura", "Klytus", "Zarkov"]
+    assert seen == [c.id for c in stored]
+    assert all(isinstance(c.id, int) for c in stored)
+    assert all(c.image_status == "PENDING" for c in stored)
+    # Portraits pending, on their way into the pool but not in stock yet
+    assert await count_unclaimed_characters(async_db_session) == 0
+    assert await count_incoming_characters(async_db_session) == 3
+
+
+@pytest.mark.anyio
+async def test_count_incoming_characters(async_db_session: AsyncSession) -> None:
+    for payload in ('{"count": 3}', '{"count": 2, "stored": [1, 2]}'):
+        async_db_session.add(
+            Job(kind="character_batch", payload=payload, run_at=0, created_at=0)
+        )
+    async_db_session.add(
+        Job(kind="portrait", payload='{"character_id": 9}', run_at=0, created_at=0)
+    )
+    async_db_session.add(make_character("Barin", "PENDING"))
+    await async_db_session.commit()
+
+    # Three still to be generated, one waiting for its portrait
+    assert await count_incoming_characters(async_db_session) == 4
+
+
+@pytest.fixture(scope="function")
+async def session_factory(
+    tmp_path: Path,
+) -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    # A file database, so every session gets its own connection like in prod
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    factory = async_sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with factory() as session:
+        session.add(User(username="admin", email="admin@mongo.com"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_retried_batch_is_not_stored_twice(
+    session_factory: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    generated: List[int] = []
+
+    async def generate(count: int) -> List[NewCharacter]:
+        generated.append(count)
+        return new_characters(*(f"Hawkman {n}" for n in range(count)))
+
+    # Leases expire at once, as if the worker was suspended mid-job
+    queue = JobQueue(1, -1.0, 0.05, 3, 0.0, session_factory=session_factory)
+    queue.register("character_batch", character_pool.run_character_batch)
+    monkeypatch.setattr(character_pool, "job_queue", queue)
+    monkeypatch.setattr(
+        character_pool,
+        "portrait_jobs",
+        PortraitJobs(leonardo_client, PortraitEvents(), queue),
+    )
+    monkeypatch.setattr(character_pool, "get_async_session", session_factory)
+    monkeypatch.setattr(character_pool, "generate_character_batch", generate)
+
+    await queue.enqueue("character_batch", {"count": 3})
+    job = await queue._lease()
+    assert job is not None and isinstance(job.id, int)
+    # The batch is stored, then the worker dies before finishing the job
+    token = current_job_id.set(job.id)
+    try:
+        await character_pool.run_character_batch(json.loads(job.payload))
+    finally:
+        current_job_id.reset(token)
+
+    job = await queue._lease()
+    assert job is not None and job.attempts == 2
+    await queue._execute(job)
+
+    assert generated == [3]
+    async with session_factory() as session:
+        characters = (await session.exec(select(Character))).all()
+        jobs = (await session.exec(select(Job))).all()
+    assert len(characters) == 3
+    assert sorted(job.kind for job in jobs) == ["portrait"] * 3
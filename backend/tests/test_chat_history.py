@@ -0,0 +1,105 @@
+import pytest
+from httpx import AsyncClient
+from typing import List
+from sqlalchemy import insert
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.db.db_models import User, Character, Thread, Message
+
+MESSAGES = 120
+
+
+@pytest.fixture(scope="function")
+async def async_db_session(async_db_session: AsyncSession) -> AsyncSession:
+    async_db_session.add(User(username="Flash", email="flash@mongo.com"))
+    async_db_session.add(
+        Character(
+            image_prompt="A retro alien",
+            generated_by=1,
+            name="Ming",
+            planet_name="Mongo",
+            planet_description="Cold",
+            personality_traits="Proud",
+            speech_style="Regal",
+            quirks="Laughs a lot",
+            human_relationship="Curious",
+        )
+    )
+    async_db_session.add(Thread(user_id=1, character_id=1, created_at=0))
+    await async_db_session.commit()
+    connection = await async_db_session.connection()
+    await connection.execute(
+        insert(Message),
+        [
+            {
+                "thread_id": 1,
+                "role": "user" if n % 2 else "assistant",
+                "content": f"Message {n}",
+                # Same second for all, only the id orders them
+                "created_at": 1,
+            }
+            for n in range(1, MESSAGES + 1)
+        ],
+    )
+    await async_db_session.commit()
+    return async_db_session
+
+
+@pytest.mark.anyio
+async def test_scroll_back_from_latest_page(user_client: AsyncClient) -> None:
+    response = await user_client.get("/chat/history/1")
+    assert response.status_code == 200
+    page = response.json()
+    # The latest 50, oldest first
+    assert [entry["id"] for entry in page] == list(range(71, 121))
+    assert page[-1]["content"] == "Message 120"
+
+    seen: List[int] = [entry["id"] for entry in page]
+    cursor = response.headers.get("X-Next-Cursor")
+    while cursor:
+        response = await user_client.get(
+            "/chat/history/1", params={"before": cursor, "limit": 50}
+        )
+        page = response.json()
+        seen = [entry["id"] for entry in page] + seen
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert seen == list(range(1, MESSAGES + 1))
+
+
+@pytest.mark.anyio
+async def test_page_forward(user_client: AsyncClient) -> None:
+    response = await user_client.get(
+        "/chat/history/1", params={"after": 100, "limit": 15}
+    )
+    assert [entry["id"] for entry in response.json()] == list(range(101, 116))
+    assert response.headers["X-Next-Cursor"] == "115"
+
+    response = await user_client.get(
+        "/chat/history/1", params={"after": 115, "limit": 15}
+    )
+    assert [entry["id"] for entry in response.json()] == list(range(116, 121))
+    assert "X-Next-Cursor" not in response.headers
+
+    response = await user_client.get("/chat/history/1", params={"limit": 0})
+    assert response.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_page_query_uses_thread_index(async_db_session: AsyncSession) -> None:
+    statement = (
+        select(Message)
+        .where(Message.thread_id == 1, col(Message.id) < 100)
+        .order_by(col(Message.id).desc())
+        .limit(51)
+    )
+    connection = await async_db_session.connection()
+    compiled = statement.compile(connection.sync_connection)
+    plan = await connection.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {compiled}", tuple(compiled.params.values())
+    )
+    details = " ".join(row[-1] for row in plan)
+
+    # A range scan of the index, no sort
+    assert "USING INDEX ix_message_thread_id (thread_id=? AND rowid<?)" in details
+    assert "TEMP B-TREE" not in details
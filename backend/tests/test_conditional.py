@@ -0,0 +1,118 @@
+import pytest
+from httpx import AsyncClient
+from unittest.mock import patch
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.db.db_crud import update_record
+from backend.db.db_models import User, Character
+from backend.utils import conditional
+from backend.utils.conditional import accepted_encoding, etag_matches
+
+
+@pytest.fixture(scope="function")
+async def async_db_session(async_db_session: AsyncSession) -> AsyncSession:
+    async_db_session.add(User(username="Flash", email="flash@mongo.com"))
+    async_db_session.add_all(
+        Character(
+            image_prompt="A retro alien " * 20,
+            generated_by=1,
+            name=f"Alien {n}",
+            planet_name="Mongo",
+            planet_description="Cold",
+            personality_traits="Proud",
+            speech_style="Regal",
+            quirks="Laughs a lot",
+            human_relationship="Curious",
+        )
+        for n in range(10)
+    )
+    await async_db_session.commit()
+    return async_db_session
+
+
+def test_accepted_encoding() -> None:
+    with patch.object(conditional, "brotli", None):
+        assert accepted_encoding("gzip, deflate, br") == "gzip"
+        assert accepted_encoding("br") is None
+    assert accepted_encoding("deflate") is None
+    assert accepted_encoding("gzip;q=0, identity") is None
+    assert accepted_encoding("GZIP;q=0.5") == "gzip"
+    assert accepted_encoding("*") == "gzip"
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+@pytest.mark.anyio
+async def test_not_modified_until_character_changes(
+    user_client: AsyncClient, async_db_session: AsyncSession
+) -> None:
+    headers = {"Accept-Encoding": "identity"}
+    response = await user_client.get("/character/1", headers=headers)
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = await user_client.get(
+        "/character/1", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    await update_record(async_db_session, Character, 1, {"planet_name": "Barsoom"})
+    response = await user_client.get(
+        "/character/1", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.anyio
+async def test_list_compressed_above_threshold(user_client: AsyncClient) -> None:
+    response = await user_client.get(
+        "/character", headers={"Accept-Encoding": "identity"}
+    )
+    plain = response.content
+    assert len(plain) > conditional.settings.compress_min_bytes
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    with patch.object(conditional, "brotli", None):
+        response = await user_client.get(
+            "/character", headers={"Accept-Encoding": "gzip"}
+        )
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(plain) / 4
+    assert response.content == plain
+    assert response.headers["etag"].endswith('-gzip"')
+    # The cursor and count survive, and the 304 keeps them too
+    assert response.headers["X-Total-Count"] == "10"
+
+    with patch.object(conditional, "brotli", None):
+        response = await user_client.get(
+            "/character",
+            headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": response.headers["etag"],
+            },
+        )
+    assert response.status_code == 304
+    assert response.headers["X-Total-Count"] == "10"
+
+
+@pytest.mark.anyio
+async def test_small_and_failed_responses_untouched(user_client: AsyncClient) -> None:
+    response = await user_client.get(
+        "/character", params={"fields": "name", "limit": 1}
+    )
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert "etag" in response.headers
+
+    response = await user_client.get("/character/999")
+    assert response.status_code == 404
+    assert "etag" not in response.headers
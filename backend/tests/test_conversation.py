@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, AsyncIterator, List
+from sqlalchemy import event
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+)
+
+from backend.services.conversation import load_conversation, conversation_turn
+from backend.services.message_writer import MessageWriter
+from backend.db.data_mappers import message_mapper
+from backend.db.db_models import User, Character, Thread, Message
+
+
+@pytest.fixture(scope="function")
+async def async_db_session(async_db_session: AsyncSession) -> AsyncSession:
+    async_db_session.add(User(username="Flash", email="flash@mongo.com"))
+    async_db_session.add(
+        Character(
+            image_prompt="A retro alien",
+            generated_by=1,
+            name="Ming",
+            planet_name="Mongo",
+            planet_description="Cold",
+            personality_traits="Proud",
+            speech_style="Regal",
+            quirks="Laughs a lot",
+            human_relationship="Curious",
+        )
+    )
+    async_db_session.add(Thread(user_id=1, character_id=1, created_at=0))
+    await async_db_session.commit()
+    return async_db_session
+
+
+class QueryCounter:
+    """Records every statement the engine sends to SQLite."""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.statements: List[str] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self.record)
+
+    def record(self, conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        self.statements.append(statement.split()[0].upper())
+
+    def take(self) -> List[str]:
+        statements, self.statements = self.statements, []
+        return statements
+
+
+class StreamingOpenAI:
+    """Stands in for AsyncOpenAI's streaming Responses API."""
+
+    def __init__(self) -> None:
+        self.previous_response_ids: List[str | None] = []
+        self.responses = SimpleNamespace(create=self.create)
+
+    async def create(self, **kwargs: Any) -> AsyncIterator[Any]:
+        self.previous_response_ids.append(kwargs["previous_response_id"])
+        response_id = f"resp-{len(self.previous_response_ids)}"
+
+        async def stream() -> AsyncIterator[Any]:
+            for delta in ("Greetings, ", "Earthling"):
+                yield SimpleNamespace(type="response.output_text.delta", delta=delta)
+            output = SimpleNamespace(
+                role="assistant",
+                content=[SimpleNamespace(text="Greetings, Earthling")],
+            )
+            yield SimpleNamespace(
+                type="response.completed",
+                response=SimpleNamespace(id=response_id, output=[output], created_at=1),
+            )
+
+        return stream()
+
+
+@pytest.mark.anyio
+async def test_steady_state_turn_only_writes_messages(
+    async_db_engine: AsyncEngine, async_db_session: AsyncSession
+) -> None:
+    @asynccontextmanager
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    client = StreamingOpenAI()
+    writer = MessageWriter(
+        max_batch=100, max_delay=0.005, session_factory=get_test_session
+    )
+    queries = QueryCounter(async_db_engine)
+
+    context = await load_conversation(async_db_session, 1)
+    # Thread (with the last response id), username and character, once per
+    # socket
+    assert queries.take() == ["SELECT"] * 3
+
+    for turn in range(3):
+        deltas = [
+            delta
+            async for delta in conversation_turn(
+                client, context, "Hello", writer  # type: ignore[arg-type]
+            )
+        ]
+        assert "".join(deltas) == "Greetings, Earthling"
+        assert await writer.flush()
+        # Previously 7 statements: 2 INSERT + 2 refresh + 3 lookups. Now both
+        # messages of the turn go out in one batched INSERT, and the thread's
+        # summary in one UPDATE
+        assert queries.take() == ["INSERT", "UPDATE"]
+
+    # Each turn continued from the reply before it
+    assert client.previous_response_ids == [None, "resp-1", "resp-2"]
+    assert context.last_response_id == "resp-3"
+
+    result = await async_db_session.exec(select(Message))
+    assert len(result.all()) == 6
+
+    thread = await async_db_session.get(Thread, 1, populate_existing=True)
+    assert thread is not None
+    assert thread.message_count == 6
+    assert thread.last_response_id == "resp-3"
+    assert thread.last_message_at is not None
+
+    # What the next socket for the thread starts from
+    context = await load_conversation(async_db_session, 1)
+    assert context.last_response_id == "resp-3"
+
+
+@pytest.mark.anyio
+async def test_writer_groups_sockets_into_batches(
+    async_db_engine: AsyncEngine, async_db_session: AsyncSession
+) -> None:
+    sessions = async_sessionmaker(bind=async_db_engine, class_=AsyncSession)
+    writer = MessageWriter(max_batch=20, max_delay=0.01, session_factory=sessions)
+
+    async def socket(n: int) -> None:
+        for turn in range(4):
+            writer.write(message_mapper(1, "user", f"socket {n} turn {turn}"))
+            await asyncio.sleep(0)
+
+    # 25 sockets, 100 messages
+    await asyncio.gather(*(socket(n) for n in range(25)))
+    assert await writer.flush()
+
+    stats = writer.stats()
+    assert stats["messages"] == 100
+    assert stats["batches"] <= 6
+    assert stats["largest_batch"] <= 20
+
+    result = await async_db_session.exec(select(Message))
+    assert len(result.all()) == 100
+    await writer.stop()
+
+
+@pytest.mark.anyio
+async def test_writer_reports_failed_batches() -> None:
+    @asynccontextmanager
+    async def broken_session() -> AsyncGenerator[AsyncSession, None]:
+        raise RuntimeError("disk full")
+        yield
+
+    writer = MessageWriter(
+        max_batch=10, max_delay=0.001, retries=2, session_factory=broken_session
+    )
+    stored = writer.write(message_mapper(1, "user", "Hello"))
+
+    assert not await writer.flush()
+    assert await stored is False
+    assert writer.stats()["failures"] == 1
+    await writer.stop()
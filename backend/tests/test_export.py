@@ -0,0 +1,131 @@
+import json
+import pytest
+from contextlib import asynccontextmanager
+from functools import partial
+from httpx import AsyncClient, ASGITransport
+from typing import Any, AsyncGenerator, Dict, List
+from unittest.mock import patch
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+)
+from backend.main import app
+from backend.services.auth import assert_admin
+from backend.services.export import export_conversations
+from backend.db.db_models import User, Character, Thread, Message
+
+
+@pytest.fixture(scope="function")
+async def async_db_engine(async_db_engine: AsyncEngine) -> AsyncEngine:
+    async with AsyncSession(async_db_engine) as session:
+        session.add(User(username="Flash", email="flash@mongo.com"))
+        session.add_all(
+            Character(
+                image_prompt="A retro alien",
+                generated_by=1,
+                name=name,
+                planet_name="Mongo",
+                planet_description="Cold",
+                personality_traits="Proud",
+                speech_style="Regal",
+                quirks="Laughs a lot",
+                human_relationship="Curious",
+            )
+            for name in ("Ming", "Aura", "Vultan")
+        )
+        await session.commit()
+        session.add_all(
+            Thread(user_id=1, character_id=character, created_at=character)
+            for character in (1, 2, 3)
+        )
+        await session.commit()
+        connection = await session.connection()
+        # Thread 2 has no messages
+        await connection.execute(
+            insert(Message),
+            [
+                {
+                    "thread_id": thread_id,
+                    "role": "user",
+                    "content": f"Hello {n} ✨",
+                    "created_at": n,
+                }
+                for n, thread_id in enumerate((1, 3, 1, 3, 1))
+            ],
+        )
+        await session.commit()
+    return async_db_engine
+
+
+@pytest.fixture(scope="function")
+def session_factory(async_db_engine: AsyncEngine) -> Any:
+    sessions = async_sessionmaker(bind=async_db_engine, class_=AsyncSession)
+
+    @asynccontextmanager
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessions() as session:
+            yield session
+
+    return get_test_session
+
+
+def parse(body: bytes) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+@pytest.mark.anyio
+async def test_export_groups_messages_under_threads(session_factory: Any) -> None:
+    body = b"".join(
+        [chunk async for chunk in export_conversations(session_factory=session_factory)]
+    )
+    records = parse(body)
+
+    assert [(record["type"], record["id"]) for record in records] == [
+        ("thread", 1),
+        ("message", 1),
+        ("message", 3),
+        ("message", 5),
+        ("thread", 2),
+        ("thread", 3),
+        ("message", 2),
+        ("message", 4),
+    ]
+    assert records[1] == {
+        "type": "message",
+        "id": 1,
+        "thread_id": 1,
+        "role": "user",
+        "content": "Hello 0 ✨",
+        "created_at": 0,
+        "openai_response_id": None,
+    }
+
+
+@pytest.mark.anyio
+async def test_export_route_gzip(session_factory: Any) -> None:
+    async def get_test_admin() -> User:
+        return User(id=1, username="TestAdmin", email="admin@admin.com", role="admin")
+
+    app.dependency_overrides[assert_admin] = get_test_admin
+    exporter = partial(export_conversations, session_factory=session_factory)
+    try:
+        with patch("backend.routes.rt_export.export_conversations", exporter):
+            transport = ASGITransport(app=app)
+            async with AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                plain = await client.get("/export/conversations")
+                zipped = await client.get(
+                    "/export/conversations", params={"gzip": "true"}
+                )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert plain.status_code == 200
+    assert plain.headers["content-type"] == "application/x-ndjson"
+    assert zipped.headers["content-encoding"] == "gzip"
+    # httpx decodes the gzip body
+    assert parse(zipped.content) == parse(plain.content)
+    assert len(parse(plain.content)) == 8
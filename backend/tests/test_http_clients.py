@@ -0,0 +1,108 @@
+import asyncio
+import json
+import pytest
+from typing import AsyncGenerator, List
+from openai import AsyncOpenAI
+
+from backend.config.clients import http_clients
+from backend.config.settings import get_settings
+from backend.db.db_models import Character
+from backend.services.openai.chat import ai_response
+
+# More streams than the shared per-upstream default allows
+STREAMS = get_settings().http_max_connections + 5
+
+EVENT = {
+    "type": "response.output_text.delta",
+    "delta": "Greetings, Earthling",
+    "item_id": "msg_1",
+    "output_index": 0,
+    "content_index": 0,
+    "sequence_number": 1,
+}
+
+
+@pytest.fixture(scope="function")
+async def openai_server() -> AsyncGenerator[str, None]:
+    """
+    A local OpenAI stand-in that holds every stream open until STREAMS of
+    them are connected at once.
+    """
+    connected: List[int] = []
+    all_connected = asyncio.Event()
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = next(
+            int(line.split(b":")[1])
+            for line in head.lower().split(b"\r\n")
+            if line.startswith(b"content-length:")
+        )
+        await reader.readexactly(length)
+        connected.append(1)
+        if len(connected) >= STREAMS:
+            all_connected.set()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        await writer.drain()
+        await all_connected.wait()
+        writer.write(
+            b"event: response.output_text.delta\r\n"
+            b"data: " + json.dumps(EVENT).encode() + b"\r\n\r\n"
+        )
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        yield f"http://127.0.0.1:{port}/v1"
+    await http_clients.aclose()
+
+
+def test_openai_has_own_limits_and_timeout() -> None:
+    settings = get_settings()
+    client = http_clients.get("openai")
+    pool = client._transport._pool  # type: ignore[attr-defined]
+    assert pool._max_connections == settings.openai_max_connections
+    assert client.timeout.read == settings.openai_timeout
+    assert client.timeout.connect == settings.http_connect_timeout
+
+    leonardo = http_clients.get("leonardo")
+    pool = leonardo._transport._pool  # type: ignore[attr-defined]
+    assert pool._max_connections == settings.http_max_connections
+
+
+@pytest.mark.anyio
+async def test_concurrent_streams_not_capped_by_shared_limit(
+    openai_server: str,
+) -> None:
+    client = AsyncOpenAI(
+        api_key="test", base_url=openai_server, http_client=http_clients.get("openai")
+    )
+    character = Character(
+        image_prompt="A retro alien",
+        generated_by=1,
+        name="Ming",
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Proud",
+        speech_style="Regal",
+        quirks="Laughs a lot",
+        human_relationship="Curious",
+    )
+
+    async def turn() -> str:
+        stream = await ai_response(client, "flash", character, "Hello")
+        return "".join([event.delta async for event in stream])
+
+    # Each stream only finishes once all of them hold a connection
+    replies = await asyncio.wait_for(
+        asyncio.gather(*(turn() for _ in range(STREAMS))), timeout=10
+    )
+    assert replies == ["Greetings, Earthling"] * STREAMS
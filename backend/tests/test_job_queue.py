@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+from collections import Counter
+from pathlib import Path
+from typing import Any, AsyncGenerator, List
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.db.db_crud import extend_job_lease, finish_job, release_job
+from backend.db.db_excepts import DatabaseError
+from backend.db.db_models import User
+from backend.services.job_queue import JobQueue
+
+
+@pytest.fixture(scope="function")
+async def session_factory(
+    tmp_path: Path,
+) -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    # A file database, so every session gets its own connection like in prod
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+def make_queue(
+    session_factory: async_sessionmaker[AsyncSession], **options: Any
+) -> JobQueue:
+    settings: dict[str, Any] = {
+        "concurrency": 4,
+        "lease_seconds": 30.0,
+        "poll_interval": 0.05,
+        "max_attempts": 3,
+        "retry_delay": 0.0,
+    }
+    settings.update(options)
+    return JobQueue(session_factory=session_factory, **settings)
+
+
+@pytest.mark.anyio
+async def test_each_job_is_leased_once(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    leased: List[int] = []
+
+    async def record(payload: dict[str, Any]) -> None:
+        leased.append(payload["n"])
+
+    queues = [make_queue(session_factory) for _ in range(4)]
+    for n, queue in enumerate(queues):
+        queue.worker_id = f"worker-{n}"
+        queue.register("record", record)
+
+    for n in range(40):
+        await queues[0].enqueue("record", {"n": n})
+
+    async def drain(queue: JobQueue) -> None:
+        while await queue.run_once():
+            pass
+
+    await asyncio.gather(*(drain(queue) for queue in queues))
+
+    assert sorted(leased) == list(range(40))
+    assert (await queues[0].stats())["states"] == {}
+
+
+@pytest.mark.anyio
+async def test_expired_lease_is_leased_again(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async def noop(payload: dict[str, Any]) -> None:
+        pass
+
+    # The first worker "crashes" right after leasing, with an expired lease
+    crashed = make_queue(session_factory, lease_seconds=-1.0)
+    crashed.register("noop", noop)
+    await crashed.enqueue("noop", {})
+    job = await crashed._lease()
+    assert job is not None and job.attempts == 1
+
+    survivor = make_queue(session_factory)
+    survivor.register("noop", noop)
+    job = await survivor._lease()
+    assert job is not None and job.attempts == 2
+    # Leased for real this time, invisible to others
+    assert await crashed._lease() is None
+
+
+@pytest.mark.anyio
+async def test_failed_attempts_retry_then_give_up(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    attempts: Counter[str] = Counter()
+    failures: List[str] = []
+
+    async def flaky(payload: dict[str, Any]) -> None:
+        attempts[payload["name"]] += 1
+        if attempts[payload["name"]] < payload["succeed_on"]:
+            raise RuntimeError("Leonardo is down")
+
+    async def on_failure(payload: dict[str, Any], error: str) -> None:
+        failures.append(f"{payload['name']}: {error}")
+
+    queue = make_queue(session_factory)
+    queue.register("flaky", flaky, on_failure=on_failure)
+    await queue.enqueue("flaky", {"name": "recovers", "succeed_on": 2})
+    await queue.enqueue("flaky", {"name": "never", "succeed_on": 10})
+
+    while await queue.run_once():
+        pass
+
+    assert attempts == {"recovers": 2, "never": 3}
+    assert failures == ["never: RuntimeError: Leonardo is down"]
+    stats = await queue.stats()
+    assert stats["completed"] == 1
+    assert stats["failed"] == 1
+    assert stats["states"] == {"failed": 1}
+
+
+@pytest.mark.anyio
+async def test_worker_loop_runs_queued_jobs(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    running = 0
+    peak = 0
+    done: List[int] = []
+
+    async def slow(payload: dict[str, Any]) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        done.append(payload["n"])
+
+    queue = make_queue(session_factory, concurrency=2)
+    queue.register("slow", slow)
+    # Jobs queued before the worker starts, as after a restart
+    for n in range(6):
+        await queue.enqueue("slow", {"n": n})
+
+    queue.start()
+    for _ in range(100):
+        if len(done) == 6:
+            break
+        await asyncio.sleep(0.02)
+    await queue.stop()
+
+    assert sorted(done) == list(range(6))
+    assert peak == 2
+
+
+@pytest.mark.anyio
+async def test_job_helpers_raise_database_error(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    async with session_factory() as session:
+        connection = await session.connection()
+        await connection.execute(text("DROP TABLE job"))
+        await session.commit()
+
+        with pytest.raises(DatabaseError):
+            await extend_job_lease(session, 1, "worker", 0.0)
+        with pytest.raises(DatabaseError):
+            await finish_job(session, 1)
+        with pytest.raises(DatabaseError):
+            await release_job(session, 1, "boom", None)
+        # Rolled back, so the session is still usable
+        assert (await session.exec(select(User))).all() == []
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from typing import Dict
+
+from backend.services.leonardo.poller import GenerationPoller
+from backend.services.leonardo.leon_models import (
+    GenerationInfo,
+    GenerationByPk,
+    GeneratedImage,
+)
+
+
+class FakeLeonardo:
+    """Completes each generation after a fixed number of status checks."""
+
+    def __init__(self, checks_to_complete: int, status: str = "COMPLETE") -> None:
+        self.checks_to_complete = checks_to_complete
+        self.final_status = status
+        self.calls: Dict[str, int] = {}
+
+    async def get_img_info(self, generation_id: str) -> GenerationInfo:
+        self.calls[generation_id] = self.calls.get(generation_id, 0) + 1
+        if self.calls[generation_id] < self.checks_to_complete:
+            return GenerationInfo(
+                generations_by_pk=GenerationByPk(status="PENDING", generated_images=[])
+            )
+        return GenerationInfo(
+            generations_by_pk=GenerationByPk(
+                status=self.final_status,
+                generated_images=[
+                    GeneratedImage(url=f"https://cdn.leonardo.ai/{generation_id}.jpg")
+                ],
+            )
+        )
+
+
+@pytest.mark.anyio
+async def test_concurrent_generations_share_one_fetch_per_check() -> None:
+    leonardo = FakeLeonardo(checks_to_complete=3)
+    poller = GenerationPoller(
+        leonardo.get_img_info, initial_delay=0.01, max_delay=0.05, timeout=5.0
+    )
+
+    # Twenty portraits, each awaited by two callers
+    ids = [f"gen-{n}" for n in range(20)]
+    urls = await asyncio.gather(*(poller.wait_for(gid) for gid in ids + ids))
+
+    assert urls == [f"https://cdn.leonardo.ai/{gid}.jpg" for gid in ids + ids]
+    assert sum(leonardo.calls.values()) == 20 * 3
+    assert poller.stats()["completed"] == 20
+    assert poller.stats()["pending"] == 0
+
+
+@pytest.mark.anyio
+async def test_failed_generation_resolves_to_none() -> None:
+    leonardo = FakeLeonardo(checks_to_complete=1, status="FAILED")
+    poller = GenerationPoller(leonardo.get_img_info, initial_delay=0.01)
+
+    assert await poller.wait_for("gen-failed") is None
+    assert poller.stats()["failed"] == 1
+
+
+@pytest.mark.anyio
+async def test_generation_times_out() -> None:
+    leonardo = FakeLeonardo(checks_to_complete=1000)
+    poller = GenerationPoller(leonardo.get_img_info, initial_delay=0.01, max_delay=0.02)
+
+    assert await poller.wait_for("gen-slow", timeout=0.1) is None
+    assert poller.stats()["timeouts"] == 1
+    # Exponential backoff keeps the number of checks well below 0.1s / 0.01s
+    assert leonardo.calls["gen-slow"] < 10
+
+
+@pytest.mark.anyio
+async def test_resolve_from_outside_the_loop() -> None:
+    leonardo = FakeLeonardo(checks_to_complete=1000)
+    poller = GenerationPoller(leonardo.get_img_info, initial_delay=1.0)
+
+    waiter = asyncio.create_task(poller.wait_for("gen-pushed"))
+    await asyncio.sleep(0)
+    assert poller.resolve("gen-pushed", "https://cdn.leonardo.ai/pushed.jpg")
+
+    assert await waiter == "https://cdn.leonardo.ai/pushed.jpg"
+    assert leonardo.calls == {}
+    await poller.stop()
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from typing import Any, AsyncGenerator, Dict
+from httpx import AsyncClient, ASGITransport, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.main import app
+from backend.config.session import get_session
+from backend.config.settings import AppSettings, get_settings
+from backend.config.clients import leonardo_client
+from backend.db.db_models import Character
+
+WEBHOOK_KEY = "test-webhook-key"
+
+
+@pytest.fixture(scope="function")
+async def webhook_client(
+    async_db_session: AsyncSession,
+) -> AsyncGenerator[AsyncClient, None]:
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    def get_test_settings() -> AppSettings:
+        return get_settings().model_copy(update={"leonardo_webhook_key": WEBHOOK_KEY})
+
+    app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_settings] = get_test_settings
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+    await leonardo_client.poller.stop()
+
+
+class FakeLeonardoCallbacks:
+    """Local stand-in for Leonardo posting generation-complete callbacks."""
+
+    def __init__(self, client: AsyncClient, key: str) -> None:
+        self.client = client
+        self.key = key
+
+    def payload(self, generation_id: str, status: str) -> Dict[str, Any]:
+        images = [{"url": f"https://cdn.leonardo.ai/{generation_id}.jpg"}]
+        return {
+            "type": "image_generation.complete",
+            "object": "generation",
+            "data": {
+                "object": {
+                    "id": generation_id,
+                    "status": status,
+                    "images": images if status == "COMPLETE" else [],
+                }
+            },
+        }
+
+    async def complete(self, generation_id: str, status: str = "COMPLETE") -> Response:
+        return await self.client.post(
+            "/leonardo/webhook",
+            json=self.payload(generation_id, status),
+            headers={"Authorization": f"Bearer {self.key}"},
+        )
+
+
+@pytest.mark.anyio
+async def test_webhook_stores_url_and_wakes_waiter(
+    webhook_client: AsyncClient, async_db_session: AsyncSession
+) -> None:
+    character = Character(
+        image_prompt="A retro alien",
+        image_generation_id="gen-123",
+        generated_by=1,
+        name="Zarkov",
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Curious",
+        speech_style="Technical",
+        quirks="Counts in hexadecimal",
+        human_relationship="Fascinated",
+    )
+    async_db_session.add(character)
+    await async_db_session.commit()
+
+    waiter = asyncio.create_task(leonardo_client.get_img_url("gen-123"))
+    await asyncio.sleep(0)
+
+    leonardo = FakeLeonardoCallbacks(webhook_client, WEBHOOK_KEY)
+    response = await leonardo.complete("gen-123")
+
+    assert response.status_code == 200
+    assert response.json()["resolved"] is True
+    assert response.json()["character_id"] == character.id
+    assert await waiter == "https://cdn.leonardo.ai/gen-123.jpg"
+
+    await async_db_session.refresh(character)
+    assert character.image_url == "https://cdn.leonardo.ai/gen-123.jpg"
+    # Resolved before the fallback poller ever made a request
+    assert leonardo_client.poller.stats()["checks"] == 0
+
+
+@pytest.mark.anyio
+async def test_webhook_failed_generation(webhook_client: AsyncClient) -> None:
+    waiter = asyncio.create_task(leonardo_client.get_img_url("gen-failed"))
+    await asyncio.sleep(0)
+
+    leonardo = FakeLeonardoCallbacks(webhook_client, WEBHOOK_KEY)
+    response = await leonardo.complete("gen-failed", status="FAILED")
+
+    assert response.status_code == 200
+    assert await waiter is None
+
+
+@pytest.mark.anyio
+async def test_webhook_rejects_wrong_key(webhook_client: AsyncClient) -> None:
+    leonardo = FakeLeonardoCallbacks(webhook_client, "not-the-key")
+    response = await leonardo.complete("gen-456")
+
+    assert response.status_code == 401
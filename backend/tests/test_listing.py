@@ -0,0 +1,129 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from typing import AsyncGenerator, List
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from backend.main import app
+from backend.config.session import get_session
+from backend.services.auth import get_valid_user
+from backend.db.db_models import User, Character
+
+CHARACTERS = 120
+USERS = 5
+
+
+@pytest.fixture(scope="function")
+async def async_db_session(async_db_session: AsyncSession) -> AsyncSession:
+    connection = await async_db_session.connection()
+    await connection.execute(
+        insert(User),
+        [
+            {
+                "username": f"Flash {n}",
+                "email": f"flash{n}@mongo.com",
+                "role": "user",
+                "status": "active",
+                "login_token": f"secret-{n}",
+            }
+            for n in range(USERS)
+        ],
+    )
+    await connection.execute(
+        insert(Character),
+        [
+            {
+                "image_prompt": "A retro alien",
+                "generated_by": 1,
+                "name": f"Alien {n}",
+                "planet_name": "Mongo",
+                "planet_description": "Cold",
+                "personality_traits": "Proud",
+                "speech_style": "Regal",
+                "quirks": "Laughs a lot",
+                "human_relationship": "Curious",
+            }
+            for n in range(1, CHARACTERS + 1)
+        ],
+    )
+    await async_db_session.commit()
+    return async_db_session
+
+
+@pytest.fixture(scope="function")
+async def admin_client(
+    async_db_session: AsyncSession,
+) -> AsyncGenerator[AsyncClient, None]:
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    async def get_test_admin() -> User:
+        return User(id=1, username="Flash", email="flash@mongo.com", role="admin")
+
+    app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_valid_user] = get_test_admin
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.anyio
+async def test_page_through_characters(user_client: AsyncClient) -> None:
+    response = await user_client.get("/character")
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == str(CHARACTERS)
+    page = response.json()["characters"]
+    assert [character["id"] for character in page] == list(range(1, 51))
+
+    seen: List[int] = [character["id"] for character in page]
+    cursor = response.headers.get("X-Next-Cursor")
+    while cursor:
+        response = await user_client.get(
+            "/character", params={"after": cursor, "limit": 50}
+        )
+        # Only the first page pays for the count
+        assert "X-Total-Count" not in response.headers
+        seen += [character["id"] for character in response.json()["characters"]]
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert seen == list(range(1, CHARACTERS + 1))
+
+
+@pytest.mark.anyio
+async def test_character_fields(user_client: AsyncClient) -> None:
+    response = await user_client.get(
+        "/character", params={"fields": "name,image_url", "limit": 2}
+    )
+    assert response.json() == {
+        "characters": [
+            {"id": 1, "name": "Alien 1", "image_url": "PENDING"},
+            {"id": 2, "name": "Alien 2", "image_url": "PENDING"},
+        ]
+    }
+
+    response = await user_client.get("/character", params={"fields": "name,age"})
+    assert response.status_code == 422
+    assert "age" in response.json()
+
+    response = await user_client.get("/character", params={"limit": 500})
+    assert response.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_users_are_admin_only(user_client: AsyncClient) -> None:
+    response = await user_client.get("/user")
+    assert response.status_code == 403
+
+
+@pytest.mark.anyio
+async def test_users_hide_login_token(admin_client: AsyncClient) -> None:
+    response = await admin_client.get("/user", params={"limit": 3})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == str(USERS)
+    assert response.headers["X-Next-Cursor"] == "3"
+    users = response.json()["user"]
+    assert [user["username"] for user in users] == ["Flash 0", "Flash 1", "Flash 2"]
+    assert all("login_token" not in user for user in users)
+
+    response = await admin_client.get("/user", params={"fields": "login_token"})
+    assert response.status_code == 422
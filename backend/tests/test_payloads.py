@@ -0,0 +1,118 @@
+import json
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import insert, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+)
+from backend.db.db_crud import mark_character_served, read_record, update_record
+from backend.db.db_init import sync_schema
+from backend.db.db_models import User, Character
+from backend.db.payloads import PRIVATE_FIELDS, public_character
+
+CHARACTER = {
+    "image_prompt": "A retro alien",
+    "generated_by": 1,
+    "planet_name": "Mongo",
+    "planet_description": "Cold, with ice palaces ❄",
+    "personality_traits": "Proud",
+    "speech_style": "Regal",
+    "quirks": 'Says "Earthling" a lot',
+    "human_relationship": "Curious",
+}
+
+
+@pytest.fixture(scope="function")
+async def async_db_session(async_db_session: AsyncSession) -> AsyncSession:
+    async_db_session.add(User(username="Flash", email="flash@mongo.com"))
+    await async_db_session.commit()
+    async_db_session.add(Character(name="Ming", **CHARACTER))
+    await async_db_session.commit()
+    # Written with Core, so without public_json
+    connection = await async_db_session.connection()
+    await connection.execute(insert(Character), [{"name": "Aura", **CHARACTER}])
+    await async_db_session.commit()
+    return async_db_session
+
+
+async def dumped(session: AsyncSession, character_id: int) -> dict:
+    character = await read_record(session, Character, character_id)
+    assert character is not None
+    return public_character(character)
+
+
+@pytest.mark.anyio
+async def test_payload_kept_current(async_db_session: AsyncSession) -> None:
+    character = await read_record(async_db_session, Character, 1)
+    assert character is not None and character.public_json is not None
+    assert json.loads(character.public_json) == public_character(character)
+    assert not set(PRIVATE_FIELDS) & set(json.loads(character.public_json))
+
+    await update_record(async_db_session, Character, 1, {"planet_name": "Barsoom"})
+    character = await read_record(async_db_session, Character, 1)
+    assert character is not None and character.public_json is not None
+    assert json.loads(character.public_json)["planet_name"] == "Barsoom"
+
+
+@pytest.mark.anyio
+async def test_routes_send_payloads(
+    user_client: AsyncClient, async_db_session: AsyncSession
+) -> None:
+    response = await user_client.get("/character")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {
+        "characters": [
+            await dumped(async_db_session, 1),
+            await dumped(async_db_session, 2),
+        ]
+    }
+
+    # Aura has no stored payload and is serialized on the spot
+    response = await user_client.get("/character/2")
+    assert response.json() == {"character": await dumped(async_db_session, 2)}
+
+    for field in PRIVATE_FIELDS:
+        response = await user_client.get("/character", params={"fields": field})
+        assert response.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_backfill_matches_public_character(
+    async_db_engine: AsyncEngine, async_db_session: AsyncSession
+) -> None:
+    async with async_db_engine.begin() as conn:
+        await conn.execute(text("ALTER TABLE character DROP COLUMN public_json"))
+        await conn.run_sync(sync_schema)
+
+    character = await read_record(async_db_session, Character, 2)
+    await async_db_session.refresh(character)
+    assert character is not None and character.public_json is not None
+    assert json.loads(character.public_json) == public_character(character)
+
+
+@pytest.mark.anyio
+async def test_bookkeeping_writes_keep_payload(async_db_session: AsyncSession) -> None:
+    # A marker, so a rebuilt payload would show
+    connection = await async_db_session.connection()
+    await connection.execute(
+        text("UPDATE character SET public_json = CAST('stored' AS BLOB)")
+    )
+    await async_db_session.commit()
+
+    character = await read_record(async_db_session, Character, 1)
+    assert character is not None
+    await mark_character_served(async_db_session, character)
+    await async_db_session.commit()
+    await update_record(
+        async_db_session, Character, 1, {"image_generation_id": "gen-1"}
+    )
+    character = await read_record(async_db_session, Character, 1)
+    await async_db_session.refresh(character)
+    assert character is not None and character.last_served_at is not None
+    assert character.public_json == b"stored"
+
+    await update_record(async_db_session, Character, 1, {"quirks": "Sighs"})
+    await async_db_session.refresh(character)
+    assert character.public_json is not None
+    assert json.loads(character.public_json)["quirks"] == "Sighs"
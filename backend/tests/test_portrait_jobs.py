@@ -0,0 +1,158 @@
+import asyncio
+import json
+import pytest
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Iterator, List
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.main import app
+from backend.config.session import get_session
+from backend.config.clients import leonardo_client
+from backend.services.auth import get_valid_user
+from backend.services.job_queue import JobQueue
+from backend.services.portrait_jobs import (
+    PortraitEvents,
+    PortraitJobs,
+    portrait_events,
+)
+from backend.db.db_models import Character, User
+
+
+@pytest.fixture(scope="function")
+async def character(async_db_session: AsyncSession) -> Character:
+    character = Character(
+        image_prompt="A retro alien",
+        generated_by=1,
+        name="Zarkov",
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Curious",
+        speech_style="Technical",
+        quirks="Counts in hexadecimal",
+        human_relationship="Fascinated",
+    )
+    async_db_session.add(character)
+    await async_db_session.commit()
+    return character
+
+
+def drain(queue: "asyncio.Queue[dict[str, Any]]") -> List[str]:
+    statuses = []
+    while not queue.empty():
+        statuses.append(queue.get_nowait()["status"])
+    return statuses
+
+
+@pytest.fixture(scope="function")
+def test_queue(async_db_session: AsyncSession) -> Iterator[JobQueue]:
+    @asynccontextmanager
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    queue = JobQueue(
+        concurrency=1,
+        lease_seconds=30.0,
+        poll_interval=1.0,
+        max_attempts=2,
+        retry_delay=0.0,
+        session_factory=get_test_session,
+    )
+    with patch("backend.services.portrait_jobs.get_async_session", get_test_session):
+        yield queue
+
+
+@pytest.mark.anyio
+async def test_portrait_job_publishes_ready(
+    test_queue: JobQueue, character: Character
+) -> None:
+    assert isinstance(character.id, int)
+    events = PortraitEvents()
+    jobs = PortraitJobs(leonardo_client, events, test_queue)
+    queue = events.subscribe(character.id)
+
+    with patch(
+        "backend.services.portrait_jobs.generate_portrait",
+        return_value="/api/portraits/1/medium.webp?v=abc",
+    ):
+        await jobs.schedule(character.id)
+        assert await test_queue.run_once()
+
+    assert drain(queue) == ["GENERATING", "READY"]
+    # Finished jobs are removed from the queue
+    assert (await test_queue.stats())["states"] == {}
+    events.unsubscribe(character.id, queue)
+    assert events.subscriber_count() == 0
+
+
+@pytest.mark.anyio
+async def test_portrait_job_retries_then_fails(
+    test_queue: JobQueue, async_db_session: AsyncSession, character: Character
+) -> None:
+    assert isinstance(character.id, int)
+    character.image_generation_id = "gen-failed"
+    await async_db_session.commit()
+
+    events = PortraitEvents()
+    jobs = PortraitJobs(leonardo_client, events, test_queue)
+    queue = events.subscribe(character.id)
+
+    with patch(
+        "backend.services.portrait_jobs.generate_portrait", return_value=None
+    ) as generate:
+        await jobs.schedule(character.id)
+        assert await test_queue.run_once()
+        assert await test_queue.run_once()
+        assert not await test_queue.run_once()
+
+    # The first attempt resumed the recorded generation, the retry started over
+    assert generate.call_args_list[0].kwargs["generation_id"] == "gen-failed"
+    assert generate.call_args_list[1].kwargs["generation_id"] is None
+    assert drain(queue) == ["GENERATING", "GENERATING", "FAILED"]
+    await async_db_session.refresh(character)
+    assert character.image_status == "FAILED"
+    assert (await test_queue.stats())["states"] == {"failed": 1}
+
+
+@pytest.mark.anyio
+async def test_portrait_events_stream(
+    async_db_session: AsyncSession, character: Character
+) -> None:
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        yield async_db_session
+
+    async def get_test_user() -> User:
+        return User(id=2, username="TestUser", email="user@user.com")
+
+    app.dependency_overrides[get_session] = get_test_session
+    app.dependency_overrides[get_valid_user] = get_test_user
+
+    assert isinstance(character.id, int)
+    character_id = character.id
+
+    async def finish_portrait() -> None:
+        while not portrait_events.subscriber_count():
+            await asyncio.sleep(0.01)
+        portrait_events.publish(character_id, "GENERATING")
+        portrait_events.publish(character_id, "READY", "/api/portraits/1/medium.webp")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        publisher = asyncio.create_task(finish_portrait())
+        response = await client.get(f"/character/{character_id}/portrait/events")
+        await publisher
+    app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["x-accel-buffering"] == "no"
+
+    events = [
+        json.loads(line.removeprefix("data: "))
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert [event["status"] for event in events] == ["PENDING", "GENERATING", "READY"]
+    assert events[-1]["image_url"] == "/api/portraits/1/medium.webp"
+    assert portrait_events.subscriber_count() == 0
@@ -0,0 +1,108 @@
+import asyncio
+import io
+import httpx
+import pytest
+from pathlib import Path
+from typing import AsyncGenerator
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from PIL import Image
+
+from backend.main import app
+from backend.services.portraits import PortraitStore
+from backend.utils.images import render_portrait_variants
+
+
+def make_png(width: int = 1024, height: int = 1024) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (120, 40, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class FakeHttpClients:
+    """Serves a fixed image for every CDN request and counts them."""
+
+    def __init__(self, data: bytes) -> None:
+        self.requests = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests += 1
+            return httpx.Response(200, content=data)
+
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        return self.client
+
+
+@pytest.fixture(scope="function")
+async def store(tmp_path: Path) -> AsyncGenerator[PortraitStore, None]:
+    store = PortraitStore(str(tmp_path), "/api/portraits")
+    with patch("backend.routes.rt_portraits.portrait_store", store):
+        yield store
+    store.close()
+
+
+def test_render_portrait_variants(tmp_path: Path) -> None:
+    render_portrait_variants(make_png(1024, 768), str(tmp_path))
+
+    with Image.open(tmp_path / "thumb.webp") as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (128, 96)
+    with Image.open(tmp_path / "full.jpg") as full:
+        assert full.format == "JPEG"
+        assert full.size == (800, 600)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.anyio
+async def test_mirror_shares_one_download(store: PortraitStore) -> None:
+    cdn = FakeHttpClients(make_png())
+    with patch("backend.services.portraits.http_clients", cdn):
+        urls = await asyncio.gather(
+            store.mirror(7, "https://cdn.leonardo.ai/7.jpg"),
+            store.mirror(7, "https://cdn.leonardo.ai/7.jpg"),
+        )
+
+    version = store.version(7)
+    assert version is not None
+    assert urls == [f"/api/portraits/7/medium.webp?v={version}"] * 2
+    assert cdn.requests == 1
+    await cdn.client.aclose()
+
+
+@pytest.mark.anyio
+async def test_portrait_route_is_cacheable(store: PortraitStore) -> None:
+    render_portrait_variants(make_png(), store.directory(3))
+    (Path(store.directory(3)) / "version").write_text("abc123")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/portraits/3/thumb.webp")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert response.headers["etag"] == '"abc123-thumb-webp"'
+        assert "immutable" in response.headers["cache-control"]
+
+        cached = await client.get(
+            "/portraits/3/thumb.webp", headers={"If-None-Match": '"abc123-thumb-webp"'}
+        )
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        # The If-None-Match list is parsed, not searched for the tag
+        for if_none_match, status in (
+            ('"other", "abc123-thumb-webp"', 304),
+            ("*", 304),
+            ('"xabc123-thumb-webpx"', 200),
+            ('"abc123-thumb-webp-old"', 200),
+        ):
+            response = await client.get(
+                "/portraits/3/thumb.webp", headers={"If-None-Match": if_none_match}
+            )
+            assert response.status_code == status
+
+        missing = await client.get("/portraits/4/thumb.webp")
+        assert missing.status_code == 404
+        unknown = await client.get("/portraits/3/huge.gif")
+        assert unknown.status_code == 404
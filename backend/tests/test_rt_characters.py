@@ -154,14 +154,13 @@ async def test_generate_character(
             "backend.routes.rt_characters.generate_character",
             return_value=mock_character1,
         ),
-        patch(
-            "backend.routes.rt_characters.generate_portrait",
-            return_value="https://leonardo.com/alienportrait.png",
-        ),
+        patch("backend.routes.rt_characters.portrait_jobs.schedule") as schedule,
     ):
         response = await user_client.post("/character/generate")
         assert response.status_code == 201
         assert "created and stored" in response.text
+        # The portrait is left to a background job
+        schedule.assert_called_once()
 
 
 @pytest.mark.order(2)
@@ -0,0 +1,172 @@
+import pytest
+from pathlib import Path
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import patch
+from sqlalchemy import func, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlmodel import SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.main import app
+from backend.config import session as db_session
+from backend.config.session import create_engines, create_session_factory
+from backend.config.settings import get_settings
+from backend.config.sqlite import (
+    RoutingSession,
+    apply_sqlite_profile,
+    can_split_engines,
+    sqlite_pragmas,
+)
+from backend.db.db_models import User, Character, Job, Message
+from backend.schemas import NewCharacter
+from backend.services.auth import get_valid_user
+from backend.services.message_writer import message_writer
+
+
+@pytest.mark.anyio
+async def test_profile_applies_to_every_connection(tmp_path: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fast.db'}")
+    apply_sqlite_profile(engine, "fast", {"cache_size": -64000})
+
+    async with engine.connect() as conn:
+        journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+        cache_size = (await conn.execute(text("PRAGMA cache_size"))).scalar()
+        foreign_keys = (await conn.execute(text("PRAGMA foreign_keys"))).scalar()
+    await engine.dispose()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert cache_size == -64000
+    assert foreign_keys == 1
+
+
+def test_unknown_profile() -> None:
+    assert sqlite_pragmas("default") == {}
+    with pytest.raises(ValueError):
+        sqlite_pragmas("turbo")
+
+
+def test_split_needs_a_wal_file() -> None:
+    assert can_split_engines("sqlite+aiosqlite:////data/app.db", "fast", None)
+    assert not can_split_engines("sqlite+aiosqlite:///:memory:", "fast", None)
+    assert not can_split_engines("sqlite+aiosqlite:////data/app.db", "default", None)
+    assert not can_split_engines(
+        "sqlite+aiosqlite:////data/app.db", "fast", {"journal_mode": "DELETE"}
+    )
+    assert not can_split_engines("postgresql+asyncpg://db/app", "fast", None)
+
+
+@pytest.mark.anyio
+async def test_routing_session(tmp_path: Path) -> None:
+    url = f"sqlite+aiosqlite:///{tmp_path / 'split.db'}"
+    writer = create_async_engine(url, pool_size=1, max_overflow=0)
+    reader = create_async_engine(url, pool_size=2)
+    apply_sqlite_profile(writer, "fast")
+    apply_sqlite_profile(reader, "fast", {"query_only": "ON"})
+    async with writer.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    sessions = async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        writer=writer,
+        reader=reader,
+        expire_on_commit=False,
+    )
+
+    async with sessions() as session:
+        routing = session.sync_session
+        assert isinstance(routing, RoutingSession)
+
+        # Reads go to the read-only pool
+        assert (await session.exec(select(User))).all() == []
+        assert not routing.writing
+        assert writer.pool.checkedout() == 0  # type: ignore[attr-defined]
+
+        # A flush goes to the writer, and reads follow it until the commit
+        session.add(User(username="Flash", email="flash@mongo.com"))
+        await session.flush()
+        assert routing.writing
+        assert len((await session.exec(select(User))).all()) == 1
+        await session.commit()
+        assert not routing.writing
+
+        # So does Core DML on the session's connection
+        connection = await session.connection()
+        await connection.execute(
+            update(User).where(col(User.id) == 1).values(username="Gordon")
+        )
+        await session.commit()
+        assert not routing.writing
+
+        user = (await session.exec(select(User))).one()
+        assert user.username == "Gordon"
+
+    async with reader.connect() as conn:
+        with pytest.raises(OperationalError):
+            await conn.execute(text("DELETE FROM user"))
+
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.anyio
+async def test_requests_through_split_engines(tmp_path: Path) -> None:
+    # A nested write waiting on the request's own would time out quickly
+    settings = get_settings().model_copy(update={"sqlite_write_timeout": 2.0})
+    writer, reader = create_engines(
+        f"sqlite+aiosqlite:///{tmp_path / 'app.db'}", settings
+    )
+    assert writer is not reader
+    async with writer.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    sessions = create_session_factory(writer, reader)
+    async with sessions() as session:
+        session.add(User(username="Flash", email="flash@mongo.com"))
+        await session.commit()
+
+    async def get_test_user() -> User:
+        return User(id=1, username="Flash", email="flash@mongo.com", role="user")
+
+    generated = NewCharacter(
+        image_prompt="A retro alien",
+        name="Ming",
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Proud",
+        speech_style="Regal",
+        quirks="Laughs a lot",
+        human_relationship="Curious",
+    )
+    app.dependency_overrides[get_valid_user] = get_test_user
+    transport = ASGITransport(app=app)
+    with (
+        patch.object(db_session, "async_session_factory", sessions),
+        patch(
+            "backend.services.chat_builder.generate_character",
+            return_value=generated,
+        ),
+    ):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            # Stores the character, queues its portrait job and the thread
+            response = await client.get("/character/chat")
+            assert response.status_code == 200
+            thread_id = response.json()["thread_id"]
+
+            # Flushes the write-behind messages before reading them
+            message_writer.write(
+                Message(thread_id=thread_id, role="user", content="Hi", created_at=1)
+            )
+            response = await client.get(f"/chat/history/{thread_id}")
+            assert [entry["content"] for entry in response.json()] == ["Hi"]
+        await message_writer.stop()
+    app.dependency_overrides.clear()
+
+    async with sessions() as session:
+        character = (await session.exec(select(Character))).one()
+        assert character.last_served_at is not None
+        jobs = (await session.exec(select(func.count()).select_from(Job))).one()
+        assert jobs == 1
+    await writer.dispose()
+    await reader.dispose()
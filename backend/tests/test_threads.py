@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from pathlib import Path
+from typing import AsyncGenerator
+
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+)
+
+from backend.db.db_crud import fetch_thread
+from backend.db.db_init import sync_schema
+from backend.db.db_models import Character, Message, Thread, User
+
+CALLERS = 20
+
+
+@pytest.fixture(scope="function")
+async def engine(tmp_path: Path) -> AsyncGenerator[AsyncEngine, None]:
+    # A file database, so every caller gets a connection of its own
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'threads.db'}",
+        pool_size=CALLERS,
+        connect_args={"timeout": 30},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add(User(username="Flash", email="flash@mongo.com"))
+        session.add(
+            Character(
+                image_prompt="A retro alien",
+                generated_by=1,
+                name="Ming",
+                planet_name="Mongo",
+                planet_description="Cold",
+                personality_traits="Proud",
+                speech_style="Regal",
+                quirks="Laughs a lot",
+                human_relationship="Curious",
+            )
+        )
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+async def count_threads(engine: AsyncEngine) -> int:
+    async with AsyncSession(engine) as session:
+        result = await session.exec(select(func.count()).select_from(Thread))
+        return result.one()
+
+
+@pytest.mark.anyio
+async def test_concurrent_get_or_create(engine: AsyncEngine) -> None:
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+
+    async def get_thread() -> Thread:
+        async with sessions() as session:
+            return await fetch_thread(session, 1, 1)
+
+    threads = await asyncio.gather(*(get_thread() for _ in range(CALLERS)))
+
+    assert {thread.id for thread in threads} == {1}
+    assert await count_threads(engine) == 1
+
+
+@pytest.mark.anyio
+async def test_one_thread_per_pair(engine: AsyncEngine) -> None:
+    async with AsyncSession(engine) as session:
+        await fetch_thread(session, 1, 1)
+        session.add(Thread(user_id=1, character_id=1, created_at=0))
+        with pytest.raises(IntegrityError):
+            await session.commit()
+
+
+@pytest.mark.anyio
+async def test_sync_schema_merges_duplicates(engine: AsyncEngine) -> None:
+    # A table from before the unique index, with duplicate threads
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP INDEX uq_thread_user_id_character_id"))
+        await conn.execute(
+            insert(Thread),
+            [{"user_id": 1, "character_id": 1, "created_at": n} for n in range(3)],
+        )
+        await conn.execute(
+            insert(Message),
+            [
+                {
+                    "thread_id": thread_id,
+                    "role": "user",
+                    "content": "Hi",
+                    "created_at": 0,
+                }
+                for thread_id in (1, 2, 3)
+            ],
+        )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(sync_schema)
+        indexes = await conn.run_sync(
+            lambda sync_conn: inspect(sync_conn).get_indexes("thread")
+        )
+
+    assert await count_threads(engine) == 1
+    async with AsyncSession(engine) as session:
+        messages = (await session.exec(select(Message))).all()
+    assert [message.thread_id for message in messages] == [1, 1, 1]
+    async with AsyncSession(engine) as session:
+        thread = await session.get(Thread, 1)
+    assert thread is not None and thread.message_count == 3
+    assert any(
+        index["name"] == "uq_thread_user_id_character_id" and index["unique"]
+        for index in indexes
+    )
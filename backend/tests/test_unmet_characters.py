@@ -0,0 +1,180 @@
+import pytest
+from unittest.mock import patch
+
+from sqlalchemy import case, insert, update
+from sqlmodel import col
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.db.db_crud import fetch_unmet_character, update_record
+from backend.db.met_index import MetIndex
+from backend.db.db_models import Character, Thread, User
+
+
+def make_character(
+    n: int, last_served_at: int | None, image_status: str = "READY"
+) -> Character:
+    return Character(
+        image_prompt="A retro alien",
+        generated_by=1,
+        name=f"Alien {n}",
+        planet_name="Mongo",
+        planet_description="Cold",
+        personality_traits="Proud",
+        speech_style="Regal",
+        quirks="Laughs a lot",
+        human_relationship="Curious",
+        last_served_at=last_served_at,
+        image_status=image_status,
+    )
+
+
+@pytest.fixture(scope="function")
+async def catalog(async_db_session: AsyncSession) -> AsyncSession:
+    # Characters 1-6, Flash (user 1) has met 1, 2 and 5
+    session = async_db_session
+    session.add(User(username="Flash", email="flash@mongo.com"))
+    session.add(User(username="Dale", email="dale@mongo.com"))
+    served = [100, 200, 300, 50, None, 400]
+    session.add_all(make_character(n, at) for n, at in enumerate(served, 1))
+    await session.commit()
+    session.add_all(
+        Thread(user_id=1, character_id=character, created_at=0)
+        for character in (1, 2, 5)
+    )
+    await session.commit()
+    return session
+
+
+@pytest.mark.anyio
+async def test_lowest(catalog: AsyncSession) -> None:
+    character = await fetch_unmet_character(catalog, 1, "lowest")
+    assert character is not None and character.id == 3
+
+
+@pytest.mark.anyio
+async def test_least_served(catalog: AsyncSession) -> None:
+    # Character 5 was never served, but Flash already met it
+    character = await fetch_unmet_character(catalog, 1, "least_served")
+    assert character is not None and character.id == 4
+
+    character = await fetch_unmet_character(catalog, 2, "least_served")
+    assert character is not None and character.id == 5
+
+
+@pytest.mark.anyio
+async def test_random_only_picks_unmet(catalog: AsyncSession) -> None:
+    picked = set()
+    for _ in range(200):
+        character = await fetch_unmet_character(catalog, 1, "random")
+        assert character is not None
+        picked.add(character.id)
+    assert picked == {3, 4, 6}
+
+
+@pytest.mark.anyio
+async def test_all_met(catalog: AsyncSession) -> None:
+    catalog.add_all(
+        Thread(user_id=1, character_id=character, created_at=0)
+        for character in (3, 4, 6)
+    )
+    await catalog.commit()
+    for order in ("lowest", "random", "least_served"):
+        assert await fetch_unmet_character(catalog, 1, order) is None
+
+    with pytest.raises(ValueError):
+        await fetch_unmet_character(catalog, 1, "newest")
+
+
+@pytest.mark.anyio
+async def test_met_index_picks(catalog: AsyncSession) -> None:
+    index = MetIndex(max_bytes=1024 * 1024)
+    await index.build(catalog)
+    assert index.stats()["characters"] == 6
+    assert index.stats()["users"] == 1  # Dale has no threads yet
+
+    for order, user_id, expected in (
+        ("lowest", 1, {3}),
+        ("least_served", 1, {4}),
+        ("least_served", 2, {5}),
+        ("random", 1, {3, 4, 6}),
+    ):
+        character = await fetch_unmet_character(catalog, user_id, order, index)
+        assert character is not None and character.id in expected
+
+    stats = index.stats()
+    assert stats["loads"] == 1  # Dale, on first use
+    assert stats["hits"] == 3
+
+
+@pytest.mark.anyio
+async def test_met_index_follows_writes(catalog: AsyncSession) -> None:
+    index = MetIndex(max_bytes=1024 * 1024)
+    await index.build(catalog)
+
+    with patch("backend.db.met_index.met_index", index):
+        catalog.add(Thread(user_id=1, character_id=3, created_at=0))
+        catalog.add(make_character(7, None))
+        await catalog.commit()
+    assert await index.pick(catalog, 1, "lowest") == 4
+    assert await index.pick(catalog, 2, "least_served") == 5
+    # Never served, so it comes before 4 and 6
+    assert await index.pick(catalog, 1, "least_served") == 7
+
+    # Core inserts go around the index, the database check catches them
+    connection = await catalog.connection()
+    await connection.execute(
+        insert(Thread), [{"user_id": 1, "character_id": 4, "created_at": 0}]
+    )
+    await catalog.commit()
+    character = await fetch_unmet_character(catalog, 1, "lowest", index)
+    assert character is not None and character.id == 6
+    assert await index.pick(catalog, 1, "lowest") == 6
+
+
+@pytest.mark.anyio
+async def test_met_index_evicts_past_budget(catalog: AsyncSession) -> None:
+    index = MetIndex(max_bytes=40)
+    await index.build(catalog)
+    await index.pick(catalog, 2, "lowest")
+
+    stats = index.stats()
+    assert stats["users"] == 1
+    assert stats["evictions"] == 1
+    assert stats["user_bytes"] <= 40
+    assert stats["bytes_per_10k_users"] == stats["user_bytes"] * 10_000
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("indexed", [False, True])
+async def test_ready_portraits_first(catalog: AsyncSession, indexed: bool) -> None:
+    # Of Flash's unmet 3, 4 and 6, only 6 has its portrait
+    connection = await catalog.connection()
+    await connection.execute(
+        update(Character)
+        .where(col(Character.id).in_([3, 4]))
+        .values(image_status=case((col(Character.id) == 3, "PENDING"), else_="FAILED"))
+    )
+    await catalog.commit()
+    index = MetIndex(max_bytes=1024 * 1024) if indexed else None
+    if index is not None:
+        await index.build(catalog)
+        assert index.stats()["unready_portraits"] == 2
+
+    for order in ("lowest", "random", "least_served"):
+        character = await fetch_unmet_character(catalog, 1, order, index)
+        assert character is not None and character.id == 6
+
+    # With every ready one met, the unready ones are still served
+    with patch("backend.db.met_index.met_index", index or MetIndex(0)):
+        catalog.add(Thread(user_id=1, character_id=6, created_at=0))
+        await catalog.commit()
+    character = await fetch_unmet_character(catalog, 1, "lowest", index)
+    assert character is not None and character.id == 3
+
+    # A finished portrait moves the character up again
+    with patch("backend.db.met_index.met_index", index or MetIndex(0)):
+        await update_record(catalog, Character, 4, {"image_status": "READY"})
+    character = await fetch_unmet_character(catalog, 1, "lowest", index)
+    assert character is not None and character.id == 4
+    if index is not None:
+        assert await index.pick(catalog, 1, "lowest", ready_only=True) == 4
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncGenerator, List
+from unittest.mock import patch
+from fastapi import WebSocketDisconnect
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+)
+
+from backend.routes.chat_websocket import chat_with_character
+from backend.db.db_models import User, Character, Thread
+
+SOCKETS = 40
+
+
+@pytest.fixture(scope="function")
+async def engine(tmp_path: Path) -> AsyncGenerator[AsyncEngine, None]:
+    # A file database gets a real connection pool, unlike :memory:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'soak.db'}",
+        pool_size=5,
+        max_overflow=SOCKETS,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add(User(username="Flash", email="flash@mongo.com"))
+        session.add(
+            Character(
+                image_prompt="A retro alien",
+                generated_by=1,
+                name="Ming",
+                planet_name="Mongo",
+                planet_description="Cold",
+                personality_traits="Proud",
+                speech_style="Regal",
+                quirks="Laughs a lot",
+                human_relationship="Curious",
+            )
+        )
+        session.add(Thread(user_id=1, character_id=1, created_at=0))
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+class IdleWebSocket:
+    """A client that connects and then never says a word until hung up on."""
+
+    def __init__(self, waiting: List["IdleWebSocket"]) -> None:
+        self.waiting = waiting
+        self.hang_up = asyncio.Event()
+        self.client_state = type("State", (), {"name": "CONNECTED"})()
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive_text(self) -> str:
+        self.waiting.append(self)
+        await self.hang_up.wait()
+        raise WebSocketDisconnect()
+
+    async def send_text(self, text: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.client_state.name = "DISCONNECTED"
+
+
+@pytest.mark.anyio
+async def test_idle_sockets_hold_no_connections(engine: AsyncEngine) -> None:
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+
+    @asynccontextmanager
+    async def get_test_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessions() as session:
+            yield session
+
+    # A session kept around after a query, as the handler used to do,
+    # keeps its connection checked out
+    async with sessions() as session:
+        await session.exec(select(Thread))
+        assert engine.pool.checkedout() == 1  # type: ignore[attr-defined]
+
+    waiting: List[IdleWebSocket] = []
+    with patch("backend.routes.chat_websocket.get_async_session", get_test_session):
+        sockets = [IdleWebSocket(waiting) for _ in range(SOCKETS)]
+        handlers = [
+            asyncio.create_task(chat_with_character(socket, 1))  # type: ignore[arg-type]
+            for socket in sockets
+        ]
+
+        while len(waiting) < SOCKETS:
+            await asyncio.sleep(0.01)
+
+        # Every socket loaded its context and now sits idle without a connection
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            assert engine.pool.checkedout() == 0  # type: ignore[attr-defined]
+
+        for socket in sockets:
+            socket.hang_up.set()
+        await asyncio.gather(*handlers)
+
+    assert all(socket.client_state.name == "DISCONNECTED" for socket in sockets)
+    assert engine.pool.checkedout() == 0  # type: ignore[attr-defined]
@@ -0,0 +1,231 @@
+import itertools
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Protocol, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from backend.config.settings import get_settings
+
+settings = get_settings()
+
+# Namespaces the routes cache responses under, and the writes invalidate
+CHARACTER_LIST = "characters"
+
+
+def character_namespace(character_id: int) -> str:
+    return f"character:{character_id}"
+
+
+def history_namespace(thread_id: int) -> str:
+    return f"history:{thread_id}"
+
+
+class CacheBackend(Protocol):
+    """
+    Where ResponseCache keeps its bytes. The calls mirror Redis's GET, SET with
+    an expiry and DEL, so a Redis client can stand in for MemoryCache.
+    """
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class MemoryCache:
+    """
+    In-process backend: entries expire after their TTL, and the least recently
+    used ones are evicted once the values take more than `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, Tuple[bytes, float | None]] = OrderedDict()
+        self._bytes = 0
+
+        # Metrics
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._pop(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        self._pop(key)
+        if len(value) > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisCache:
+    """
+    Backend over a redis.asyncio.Redis client, or anything with the same get,
+    set(px=) and delete, for a cache shared between processes.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.client.get(key)
+        return bytes(value) if value is not None else None
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        px = int(ttl * 1000) if ttl is not None else None
+        await self.client.set(key, value, px=px)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+def request_key(request: Request) -> str:
+    """A request's path and query parameters, in an order that doesn't matter."""
+    return f"{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+
+
+class ResponseCache:
+    """
+    Read-through cache of whole JSON responses, grouped in namespaces such as
+    "character:1" or "history:7" that writes invalidate as a unit.
+
+    Every namespace has a version in the backend and its entries are stored
+    under the current one. Invalidating sets a new version, so the old entries
+    are never read again and are left for the TTL or LRU to drop. Versions
+    come from the clock rather than a counter: one that is evicted and set
+    again can't bring back entries stored under an earlier value. The version
+    is read before the database, so a write that lands while a response is
+    being built leaves that response under a stale version.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, enabled: bool = True) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        # Tells apart versions made within the same clock tick
+        self._serial = itertools.count()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def fetch(
+        self,
+        namespace: str,
+        key: str,
+        build: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """
+        The cached response for `key` in `namespace`, or the one `build` makes.
+        Only 200 responses are kept.
+        """
+        if not self.enabled:
+            return await build()
+
+        version = await self._version(namespace)
+        entry_key = f"{namespace}@{version.decode()}:{key}"
+        cached = await self.backend.get(entry_key)
+        if cached is not None:
+            self.hits += 1
+            meta_line, body = cached.split(b"\n", 1)
+            meta = json.loads(meta_line)
+            return Response(
+                content=body,
+                status_code=meta["status"],
+                headers=meta["headers"],
+                media_type=meta["media_type"],
+            )
+
+        self.misses += 1
+        response = await build()
+        if response.status_code == 200:
+            head = json.dumps(
+                {
+                    "status": response.status_code,
+                    "media_type": response.media_type,
+                    # Content-Length and -Type are set again from the body
+                    "headers": {
+                        name: value
+                        for name, value in response.headers.items()
+                        if name not in ("content-length", "content-type")
+                    },
+                }
+            )
+            await self.backend.set(
+                entry_key, head.encode() + b"\n" + bytes(response.body), self.ttl
+            )
+        return response
+
+    async def invalidate(self, *namespaces: str) -> None:
+        if not self.enabled:
+            return
+        for namespace in namespaces:
+            await self._new_version(namespace)
+            self.invalidations += 1
+
+    async def _version(self, namespace: str) -> bytes:
+        version = await self.backend.get(f"version:{namespace}")
+        return version if version is not None else await self._new_version(namespace)
+
+    async def _new_version(self, namespace: str) -> bytes:
+        version = f"{time.time_ns()}.{next(self._serial)}".encode()
+        await self.backend.set(f"version:{namespace}", version)
+        return version
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        backend_stats: Dict[str, Any] = getattr(self.backend, "stats", dict)()
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            **backend_stats,
+        }
+
+
+response_cache = ResponseCache(
+    MemoryCache(settings.response_cache_max_bytes),
+    ttl=settings.response_cache_ttl,
+    enabled=settings.response_cache_enabled,
+)
@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import importlib
+import importlib.util
+from typing import Any, Callable, Coroutine
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from backend.config.settings import get_settings
+
+settings = get_settings()
+
+# Brotli is optional, responses are only gzipped without it
+brotli: Any = (
+    importlib.import_module("brotli") if importlib.util.find_spec("brotli") else None
+)
+
+
+def accepted_encoding(accept_encoding: str) -> str | None:
+    """The encoding to send for an Accept-Encoding header: br, gzip or None."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match uses the weak comparison, W/ prefixes don't count."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def conditional_response(request: Request, response: Response) -> Response:
+    """
+    Give a 200 response a strong ETag hashed from its body, answer a matching
+    If-None-Match with 304 Not Modified, and compress bodies of at least
+    `compress_min_bytes` for clients that accept it.
+
+    Each encoding is a representation of its own, so the encoding is part of
+    the ETag: a gzipped body and a plain one never share a validator.
+    """
+    body = bytes(response.body)
+    compressible = len(body) >= settings.compress_min_bytes
+    encoding = (
+        accepted_encoding(request.headers.get("accept-encoding", ""))
+        if compressible
+        else None
+    )
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+    response.headers["etag"] = etag
+    if "cache-control" not in response.headers:
+        # Browsers may keep it but must check back before using it
+        response.headers["cache-control"] = "private, no-cache"
+    if compressible:
+        response.headers["vary"] = "Accept-Encoding"
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        not_modified = Response(status_code=304)
+        not_modified.raw_headers = [
+            (name, value)
+            for name, value in response.raw_headers
+            if name not in (b"content-length", b"content-type")
+        ]
+        return not_modified
+
+    if encoding == "br":
+        response.body = brotli.compress(body, quality=4)
+    elif encoding == "gzip":
+        response.body = gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding:
+        response.headers["content-encoding"] = encoding
+        response.headers["content-length"] = str(len(response.body))
+    return response
+
+
+class ConditionalRoute(APIRoute):
+    """
+    Route class for routers of JSON reads: their successful GET responses go
+    through conditional_response. Streamed responses are left alone.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def conditional_handler(request: Request) -> Response:
+            response = await handler(request)
+            if (
+                request.method not in ("GET", "HEAD")
+                or response.status_code != 200
+                or getattr(response, "body", None) is None
+            ):
+                return response
+            return conditional_response(request, response)
+
+        return conditional_handler
@@ -0,0 +1,29 @@
+import io
+import os
+from PIL import Image
+
+# Longest side in pixels for each portrait variant
+PORTRAIT_SIZES = {"thumb": 128, "medium": 400, "full": 800}
+# File extension -> Pillow format
+PORTRAIT_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+
+
+def render_portrait_variants(data: bytes, directory: str) -> None:
+    """
+    Decode a portrait once and write every size in every format to directory.
+
+    Meant to run in a worker process, since resizing and encoding are CPU bound.
+    Files are written to a temporary name first so readers never see a partial
+    image.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with Image.open(io.BytesIO(data)) as original:
+        image = original.convert("RGB")
+
+    for variant, size in PORTRAIT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for extension, image_format in PORTRAIT_FORMATS.items():
+            path = os.path.join(directory, f"{variant}.{extension}")
+            resized.save(f"{path}.tmp", image_format, quality=82)
+            os.replace(f"{path}.tmp", path)
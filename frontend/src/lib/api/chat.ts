@@ -1,6 +1,7 @@
 import { array, object, string, number, parse } from 'valibot';
 
 const ChatMessageSchema = object({
+  id: number(),
   role: string(),
   content: string(),
   created_at: number(), // Change from string() to number()
@@ -8,18 +9,26 @@ const ChatMessageSchema = object({
 
 const ChatMessagesSchema = array(ChatMessageSchema);
 
-export async function fetchChatHistory(threadId: number) {
-  const response = await fetch(`/api/chat/history/${threadId}`, {
+// One page of a thread's history, oldest message first. Without `before` it
+// is the latest page; nextCursor, when set, loads the page before it.
+export async function fetchChatHistory(threadId: number, before?: number) {
+  const params = new URLSearchParams();
+  if (before !== undefined) params.set('before', String(before));
+  const query = params.toString() ? `?${params}` : '';
+  const response = await fetch(`/api/chat/history/${threadId}${query}`, {
     credentials: 'include',
   });
   if (!response.ok) {
     throw new Error(`Failed to fetch chat history: ${response.statusText}`);
   }
   const data = await response.json();
-  console.log('API response:', data); // Debugging
   // Validate that the response is an array
   if (!Array.isArray(data)) {
     throw new Error('Invalid API response: Expected an array');
   }
-  return parse(ChatMessagesSchema, data);
+  const cursor = response.headers.get('X-Next-Cursor');
+  return {
+    messages: parse(ChatMessagesSchema, data),
+    nextCursor: cursor ? Number(cursor) : null,
+  };
 }
@@ -6,6 +6,7 @@ interface Character {
   name: string;
   planet_name: string;
   image_url: string;
+  image_status?: 'PENDING' | 'READY' | 'FAILED';
 }
 
 type CharacterState = {